@@ -0,0 +1,77 @@
+"""
+Benchmark full-video analysis against frame-sampled analysis.
+
+Runs both analysis modes on the given videos (bypassing the analysis
+cache) and reports wall-clock latency and Gemini token usage.
+
+Usage:
+    python benchmark_analysis.py video1.mp4 [video2.mp4 ...] [--runs N]
+"""
+import argparse
+import os
+import time
+from services.ai_service import AIService
+from services.drive_download import file_md5
+
+MODES = ('video', 'frames')
+
+def run_mode(ai_service, mode, video_path, content_hash):
+    start = time.time()
+    if mode == 'video':
+        analysis = ai_service._analyze_with_gemini(video_path, content_hash)
+    else:
+        analysis = ai_service._analyze_frames(video_path)
+    elapsed = time.time() - start
+
+    usage = ai_service.last_usage
+    return {
+        'seconds': elapsed,
+        'prompt_tokens': getattr(usage, 'prompt_token_count', 0) or 0,
+        'output_tokens': getattr(usage, 'candidates_token_count', 0) or 0,
+        'title': analysis.get('title', ''),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare video and frame-sampled analysis.")
+    parser.add_argument('videos', nargs='+', help="Local video files to analyze")
+    parser.add_argument('--runs', type=int, default=1, help="Runs per video and mode")
+    args = parser.parse_args()
+
+    ai_service = AIService()
+    totals = {mode: {'seconds': 0.0, 'prompt_tokens': 0, 'output_tokens': 0, 'runs': 0} for mode in MODES}
+
+    print(f"{'Video':30} {'Mode':8} {'Seconds':>9} {'Prompt tok':>11} {'Output tok':>11}  Title")
+    print("="*100)
+    for video_path in args.videos:
+        content_hash = file_md5(video_path)
+        for _ in range(args.runs):
+            for mode in MODES:
+                try:
+                    result = run_mode(ai_service, mode, video_path, content_hash)
+                except Exception as e:
+                    print(f"{os.path.basename(video_path)[:30]:30} {mode:8} FAILED: {e}")
+                    continue
+                print(f"{os.path.basename(video_path)[:30]:30} {mode:8} {result['seconds']:9.1f} "
+                      f"{result['prompt_tokens']:11} {result['output_tokens']:11}  {result['title']}")
+                for key in ('seconds', 'prompt_tokens', 'output_tokens'):
+                    totals[mode][key] += result[key]
+                totals[mode]['runs'] += 1
+
+    print("\nAverages")
+    print("="*100)
+    for mode in MODES:
+        runs = totals[mode]['runs']
+        if not runs:
+            continue
+        print(f"{mode:8} {totals[mode]['seconds'] / runs:9.1f}s "
+              f"{totals[mode]['prompt_tokens'] / runs:11.0f} prompt tokens "
+              f"{totals[mode]['output_tokens'] / runs:11.0f} output tokens")
+
+    if totals['video']['runs'] and totals['frames']['runs']:
+        video_avg = totals['video']['seconds'] / totals['video']['runs']
+        frames_avg = totals['frames']['seconds'] / totals['frames']['runs']
+        if frames_avg > 0:
+            print(f"\nFrame sampling is {video_avg / frames_avg:.1f}x faster than full-video analysis")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Benchmark x264 presets and thread counts on this machine and write an
+encoder profile that compress_video picks up automatically.
+
+Synthetic clips are generated with ffmpeg's testsrc2 source, so no real
+footage is needed. Each clip is encoded with every preset and thread
+count at a bitrate scaled to its resolution, and the encode fps, output
+size and SSIM against the clip are measured. The profile uses the
+fastest preset whose SSIM stays within --tolerance of the slowest preset
+tested, with the thread count that ran it fastest.
+
+Usage:
+    python benchmark_encoder.py [--presets veryfast,medium] [--threads 0,4]
+                                [--resolutions 720,1080] [--seconds 10]
+                                [--tolerance 0.005] [--dry-run]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from config import Config
+from utils import media_tools
+from utils.video_compressor import _encode_cmd
+
+PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium')
+RESOLUTIONS = (720, 1080)
+FRAME_RATE = 30
+# Video bitrate for 1080p; other resolutions are scaled by pixel count
+BITRATE_1080P_K = 4000
+
+
+def make_clip(path, height, seconds):
+    """Generates a test clip with moving patterns and a tone, encoded near-losslessly."""
+    width = height * 16 // 9 // 2 * 2
+    cmd = [
+        media_tools.ffmpeg_path(),
+        '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={FRAME_RATE}:duration={seconds}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '12',
+        '-c:a', 'aac',
+        '-y', path
+    ]
+    media_tools.run_ffmpeg(cmd, timeout=600)
+
+
+def measure_ssim(encoded_path, reference_path):
+    cmd = [
+        media_tools.ffmpeg_path(), '-i', encoded_path, '-i', reference_path,
+        '-lavfi', 'ssim', '-f', 'null', '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+    match = re.search(r'All:([0-9.]+)', result.stderr)
+    return float(match.group(1)) if match else None
+
+
+def run_benchmark(clip_path, height, seconds, preset, threads, work_dir):
+    bitrate = max(300, int(BITRATE_1080P_K * (height / 1080) ** 2))
+    output_path = os.path.join(work_dir, f'{height}p_{preset}_{threads}.mp4')
+    start = time.time()
+    media_tools.run_ffmpeg(_encode_cmd(clip_path, output_path, bitrate, threads=threads, preset=preset),
+                           timeout=1800)
+    elapsed = time.time() - start
+
+    result = {
+        'height': height,
+        'preset': preset,
+        'threads': threads,
+        'fps': seconds * FRAME_RATE / elapsed,
+        'seconds_per_second': elapsed / seconds,
+        'size_mb': os.path.getsize(output_path) / (1024 * 1024),
+        'ssim': measure_ssim(output_path, clip_path),
+    }
+    os.remove(output_path)
+    return result
+
+
+def choose_profile(results, tolerance=0.005):
+    """
+    Picks the fastest preset whose average SSIM is within `tolerance` of
+    the best-quality preset tested, and the thread count it ran fastest
+    with. Speeds are compared at the highest resolution benchmarked.
+
+    Returns:
+        dict with 'preset', 'threads' and 'seconds_per_second', or None
+        if there were no usable results
+    """
+    results = [r for r in results if r.get('ssim') is not None]
+    if not results:
+        return None
+    height = max(r['height'] for r in results)
+
+    by_preset = {}
+    for r in results:
+        by_preset.setdefault(r['preset'], []).append(r)
+
+    def mean_ssim(preset):
+        return sum(r['ssim'] for r in by_preset[preset]) / len(by_preset[preset])
+
+    best_ssim = max(mean_ssim(preset) for preset in by_preset)
+    candidates = []
+    for preset, runs in by_preset.items():
+        if mean_ssim(preset) < best_ssim - tolerance:
+            continue
+        # Presets that failed at the highest resolution can't be compared on speed
+        fastest = min((r for r in runs if r['height'] == height), key=lambda r: r['seconds_per_second'],
+                      default=None)
+        if fastest is not None:
+            candidates.append(fastest)
+    if not candidates:
+        return None
+
+    chosen = min(candidates, key=lambda r: r['seconds_per_second'])
+    return {
+        'preset': chosen['preset'],
+        'threads': chosen['threads'],
+        'seconds_per_second': chosen['seconds_per_second'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the x264 preset and thread count for this machine.")
+    parser.add_argument('--presets', default=','.join(PRESETS), help="Comma-separated x264 presets")
+    parser.add_argument('--threads', default=f"0,{os.cpu_count() or 1}",
+                        help="Comma-separated thread counts (0 = ffmpeg's default)")
+    parser.add_argument('--resolutions', default=','.join(str(r) for r in RESOLUTIONS),
+                        help="Comma-separated clip heights")
+    parser.add_argument('--seconds', type=int, default=10, help="Length of each test clip")
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help="SSIM a faster preset may lose against the best one")
+    parser.add_argument('--output', default=getattr(Config, 'ENCODER_PROFILE_FILE', 'encoder_profile.json'),
+                        help="Where to write the profile")
+    parser.add_argument('--dry-run', action='store_true', help="Print the results without writing a profile")
+    args = parser.parse_args()
+
+    presets = args.presets.split(',')
+    thread_counts = sorted({int(t) for t in args.threads.split(',')})
+    heights = [int(h) for h in args.resolutions.split(',')]
+
+    versions = media_tools.check_versions()
+    print(f"Using {versions['ffmpeg']}")
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix='encoder_benchmark_')
+    try:
+        print(f"{'Res':>6} {'Preset':10} {'Threads':>7} {'FPS':>8} {'x realtime':>10} {'MB':>7} {'SSIM':>7}")
+        print("="*62)
+        for height in heights:
+            clip_path = os.path.join(work_dir, f'clip_{height}p.mp4')
+            make_clip(clip_path, height, args.seconds)
+            for preset in presets:
+                for threads in thread_counts:
+                    try:
+                        r = run_benchmark(clip_path, height, args.seconds, preset, threads, work_dir)
+                    except Exception as e:
+                        print(f"{height:>5}p {preset:10} {threads:>7} FAILED: {e}")
+                        continue
+                    results.append(r)
+                    ssim = f"{r['ssim']:.4f}" if r['ssim'] is not None else '?'
+                    print(f"{height:>5}p {preset:10} {threads:>7} {r['fps']:8.1f} "
+                          f"{1 / r['seconds_per_second']:10.2f} {r['size_mb']:7.2f} {ssim:>7}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    chosen = choose_profile(results, tolerance=args.tolerance)
+    if chosen is None:
+        print("\nNo usable results. Profile not written.")
+        return
+
+    print(f"\nBest for this machine: preset '{chosen['preset']}', "
+          f"threads {chosen['threads'] or 'default'}, "
+          f"{1 / chosen['seconds_per_second']:.2f}x realtime")
+    if args.dry_run:
+        return
+
+    profile = dict(chosen, host=platform.node(), ffmpeg=versions['ffmpeg'],
+                   created=datetime.datetime.now().isoformat(timespec='seconds'), results=results)
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, args.output)
+    print(f"Profile written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
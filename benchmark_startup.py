@@ -0,0 +1,126 @@
+"""
+Measure how long the workflow takes to start, and which imports cost the
+most.
+
+Each measurement runs in a fresh interpreter. The import breakdown comes
+from `python -X importtime`, and wall-clock times are the median of
+several runs. With --services the API services are constructed too,
+which needs valid tokens.
+
+Usage:
+    python benchmark_startup.py [--module main] [--runs 5] [--top 15]
+                                [--services] [--budget 2.0]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds `import main` may take before the benchmark (and the startup test) fails
+DEFAULT_BUDGET_SECONDS = 2.0
+
+# Slow to import and only needed on some paths, so startup must not import them
+LAZY_MODULES = (
+    'google.generativeai',
+    'googleapiclient.discovery',
+    'googleapiclient.http',
+    'google_auth_oauthlib.flow',
+    'google.auth.transport.requests',
+    'requests',
+    'openai',
+    'PIL',
+)
+
+SERVICES_CODE = """
+from services.drive_service import DriveService
+from services.ai_service import AIService
+from services.youtube_service import YouTubeService
+from services.sheets_service import SheetsService
+DriveService(); AIService(); YouTubeService(); SheetsService()
+"""
+
+
+def _run(args, env=None):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, env=env, check=True)
+
+
+def import_times(module='main'):
+    """
+    Imports a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        dict of module name to (self, cumulative) import time in seconds
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    result = _run(['-X', 'importtime', '-c', f'import {module}'], env=env)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except (IndexError, ValueError):
+            # The header line
+            continue
+        times[fields[2].strip()] = (self_us / 1_000_000, cumulative_us / 1_000_000)
+    return times
+
+
+def lazy_modules_imported(times):
+    """Returns the LAZY_MODULES (or their submodules) that were imported at startup."""
+    return sorted(name for name in times
+                  if any(name == lazy or name.startswith(lazy + '.') for lazy in LAZY_MODULES))
+
+
+def startup_seconds(code, runs=5):
+    """Median wall-clock seconds to run `code` in a fresh interpreter."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run(['-c', code])
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure startup time and import costs.")
+    parser.add_argument('--module', default='main', help="Module to import")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    parser.add_argument('--services', action='store_true',
+                        help="Also time constructing the API services (needs valid tokens)")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Fail if importing the module takes longer than this many seconds")
+    args = parser.parse_args()
+
+    times = import_times(args.module)
+    print(f"{'Cumulative':>10} {'Self':>8}  Module")
+    print("="*50)
+    for name, (self_s, cumulative_s) in sorted(times.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{cumulative_s * 1000:8.1f}ms {self_s * 1000:6.1f}ms  {name}")
+
+    eager = lazy_modules_imported(times)
+    if eager:
+        print(f"\nImported at startup but only needed later: {', '.join(eager)}")
+
+    baseline = startup_seconds('pass', args.runs)
+    imported = startup_seconds(f'import {args.module}', args.runs)
+    print(f"\nInterpreter start:    {baseline:.3f}s")
+    print(f"import {args.module}:{' ' * max(1, 14 - len(args.module))}{imported:.3f}s "
+          f"({imported - baseline:.3f}s over the interpreter)")
+    if args.services:
+        constructed = startup_seconds(SERVICES_CODE, args.runs)
+        print(f"Services constructed: {constructed:.3f}s")
+
+    if imported > args.budget:
+        print(f"\nOver budget: import {args.module} took {imported:.3f}s (budget {args.budget:.3f}s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
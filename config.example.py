@@ -4,6 +4,8 @@ class Config:
     # Google Cloud Credentials
     CREDENTIALS_FILE = os.environ.get('CREDENTIALS_FILE', 'credentials.json')
     TOKEN_FILE = os.environ.get('TOKEN_FILE', 'token.json')
+    # Tokens are refreshed in the background this many seconds before they expire
+    CREDENTIAL_REFRESH_MARGIN_SECONDS = 300
     
     # Drive Settings
     # The ID of the folder to monitor. 
@@ -14,12 +16,88 @@ class Config:
     # Gemini AI Settings
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', 'YOUR_GEMINI_API_KEY_HERE')
     
+    # Analysis Mode
+    # 'video' uploads the (proxy) video; 'frames' sends sampled frames and audio inline instead
+    ANALYSIS_MODE = 'video'
+    # Frame sampling for 'frames' mode: 'scene' (scene changes) or 'uniform'
+    FRAME_SAMPLE_MODE = 'scene'
+    FRAME_SAMPLE_COUNT = 16
+    FRAME_SCENE_THRESHOLD = 0.3
+    FRAME_WIDTH = 640
+    FRAME_AUDIO_BITRATE_K = 32
+    FRAME_MAX_AUDIO_MB = 12
+    
+    # FFmpeg Settings
+    # Leave blank to use the FFMPEG_PATH / FFPROBE_PATH environment variables or PATH
+    FFMPEG_PATH = ''
+    FFPROBE_PATH = ''
+    # Kill an ffmpeg run whose output hasn't advanced for this long (0 = never)
+    FFMPEG_STALL_SECONDS = 120
+    
+    # Long-Video Analysis Settings ('video' mode)
+    # Videos longer than this are analyzed in chunks concurrently, then merged (0 = never)
+    ANALYSIS_CHUNK_THRESHOLD_MINUTES = 60
+    ANALYSIS_CHUNK_MINUTES = 15
+    ANALYSIS_CHUNK_WORKERS = 4
+    
+    # Analysis Proxy Settings
+    # Gemini analyzes a small low-resolution copy; YouTube still gets the original
+    ANALYSIS_PROXY_ENABLED = True
+    ANALYSIS_PROXY_HEIGHT = 360
+    ANALYSIS_PROXY_FPS = 5
+    ANALYSIS_PROXY_VIDEO_BITRATE_K = 300
+    ANALYSIS_PROXY_AUDIO_BITRATE_K = 48
+    
+    # Compression Settings (used when a video has to be re-encoded to fit Gemini's limit)
+    # Long videos are split into segments of this length and encoded in parallel
+    COMPRESS_SEGMENT_SECONDS = 120
+    # Parallel ffmpeg processes (0 = one per CPU core)
+    COMPRESS_WORKERS = 0
+    # Encoding time allowed per second of video before giving up (at least 10 minutes)
+    COMPRESS_TIMEOUT_FACTOR = 2.0
+    # Short clips encoded first to calibrate the bitrate (0 to skip)
+    COMPRESS_RATE_SAMPLES = 3
+    COMPRESS_RATE_SAMPLE_SECONDS = 10
+    # Preset and threads tuned for this machine by benchmark_encoder.py (ignored if missing)
+    ENCODER_PROFILE_FILE = os.environ.get('ENCODER_PROFILE_FILE', 'encoder_profile.json')
+    
+    # Gemini Files API Settings
+    # Uploaded videos are reused across retries until they expire (Gemini keeps them 48 hours)
+    GEMINI_FILE_POOL_FILE = os.environ.get('GEMINI_FILE_POOL_FILE', 'gemini_files.json')
+    GEMINI_FILE_TTL_HOURS = 47
+    # Oldest unused uploads are deleted once the pool grows past this (project quota is 20 GB)
+    GEMINI_FILE_POOL_MAX_GB = 10
+    
+    # Analysis Cache Settings
+    # Reuse Gemini results when the same video (by checksum) shows up again
+    ENABLE_ANALYSIS_CACHE = True
+    ANALYSIS_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', 'analysis_cache')
+    ANALYSIS_CACHE_MAX_ENTRIES = 1000
+    ANALYSIS_CACHE_MAX_MB = 100
+    
     # OpenAI Settings (for DALL-E 3 thumbnail generation)
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', 'YOUR_OPENAI_API_KEY_HERE')
     
     # YouTube Settings
     YOUTUBE_PRIVACY_STATUS = 'public'
     YOUTUBE_CATEGORY_ID = '22' # People & Blogs
+    # Channels each video is uploaded to, all at once. The first one is the primary
+    # account above. Leave empty to use the primary (and secondary, with dual upload).
+    # YOUTUBE_CHANNELS = [
+    #     {'name': 'primary', 'credentials_file': 'credentials.json', 'token_file': 'token.json'},
+    #     {'name': 'secondary', 'credentials_file': 'credentials_second.json', 'token_file': 'token_second.json'},
+    # ]
+    YOUTUBE_CHANNELS = []
+    # Uploads are sent in chunks (a multiple of 256 KB) and resume after a crash
+    YOUTUBE_UPLOAD_CHUNK_MB = 32
+    # Retries per chunk for server errors and dropped connections
+    YOUTUBE_UPLOAD_RETRIES = 5
+    # Daily YouTube Data API quota per channel (an upload with thumbnail costs ~1650 units).
+    # Files that would go over it wait for the next quota day (midnight Pacific). 0 = don't track.
+    YOUTUBE_DAILY_QUOTA = 10000
+    QUOTA_DB_FILE = os.environ.get('QUOTA_DB_FILE', 'youtube_quota.db')
+    # Files whose names contain these words are uploaded first (higher goes first)
+    UPLOAD_PRIORITY_KEYWORDS = {}
     
     # Sheets Settings
     SPREADSHEET_ID = os.environ.get('SPREADSHEET_ID', 'YOUR_SPREADSHEET_ID_HERE')
@@ -28,6 +106,52 @@ class Config:
     MAX_RETRIES = 2
     RETRY_DELAY_SECONDS = 5
 
+    # Job Ledger Settings
+    # SQLite database that records which Drive files have been processed
+    LEDGER_DB_FILE = os.environ.get('LEDGER_DB_FILE', 'jobs.db')
+    # A file that fails this many times (with the same content) is no longer picked up
+    MAX_JOB_ATTEMPTS = 3
+    # How long to wait between folder checks when there is nothing to do
+    POLL_INTERVAL_SECONDS = 60
+
+    # Drive Change Feed Settings
+    # Watch the folder through the Drive Changes API instead of listing it every poll
+    USE_DRIVE_CHANGES = False
+    DRIVE_PAGE_TOKEN_FILE = os.environ.get('DRIVE_PAGE_TOKEN_FILE', 'drive_page_token.json')
+    # Polling backs off from the min to the max interval while the folder is idle
+    DRIVE_POLL_MIN_SECONDS = 10
+    DRIVE_POLL_MAX_SECONDS = 300
+
+    # Pipeline Settings
+    # Process several files at once, with a separate worker pool per stage
+    ENABLE_PIPELINE = False
+    PIPELINE_WORKERS = {
+        'download': 2,
+        'analyze': 2,
+        'thumbnail': 1,
+        'upload': 2,
+        'log': 1,
+    }
+    # Max files waiting between two stages (caps disk and memory use)
+    PIPELINE_QUEUE_SIZE = 2
+
+    # Folder Scan Settings
+    # Also pick up videos in subfolders of DRIVE_FOLDER_ID (with or without USE_DRIVE_CHANGES)
+    DRIVE_SCAN_RECURSIVE = False
+    # Max subfolders listed at the same time when scanning recursively
+    DRIVE_SCAN_WORKERS = 4
+
+    # Download Settings
+    # Videos are fetched as byte ranges over several connections and resume after a crash
+    DOWNLOAD_CONNECTIONS = 4
+    DOWNLOAD_CHUNK_SIZE_MB = 32
+
+    # Workspace Settings
+    # Each job downloads into its own directory under WORKSPACE_DIR
+    WORKSPACE_DIR = os.environ.get('WORKSPACE_DIR', 'workspace')
+    # New downloads wait until at least this much disk would stay free
+    WORKSPACE_MIN_FREE_MB = 2048
+
     # Supported Video Extensions
     VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v')
 
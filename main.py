@@ -1,11 +1,19 @@
 import time
-import os
 import sys
 from config import Config
 from services.drive_service import DriveService
 from services.ai_service import AIService
 from services.youtube_service import YouTubeService
 from services.sheets_service import SheetsService
+from services.drive_watcher import DriveChangeWatcher, FolderListingPoller
+from utils import job_ledger
+from utils.job_ledger import JobLedger
+from utils.workspace import WorkspaceManager
+from utils.upload_scheduler import UploadScheduler
+from utils import media_tools
+from pipeline import (Pipeline, Services, Job, STAGES, run_stage, release_failed_job,
+                      defer_for_quota, refund_unused_quota)
+from services.youtube_service import QuotaExceededError
 
 def main():
     print("Starting Video Automation Workflow...")
@@ -20,97 +28,165 @@ def main():
         print(f"Failed to initialize services: {e}")
         return
 
+    try:
+        for name, version in media_tools.check_versions().items():
+            print(f"Using {name}: {version}")
+    except media_tools.MediaToolError as e:
+        print(f"Warning: {e} Large videos cannot be compressed or proxied.")
+
+    ledger = JobLedger(
+        getattr(Config, 'LEDGER_DB_FILE', 'jobs.db'),
+        max_attempts=getattr(Config, 'MAX_JOB_ATTEMPTS', 3)
+    )
+    source = make_file_source(drive_service)
+
+    workspace = WorkspaceManager(
+        getattr(Config, 'WORKSPACE_DIR', 'workspace'),
+        min_free_bytes=getattr(Config, 'WORKSPACE_MIN_FREE_MB', 2048) * 1024 * 1024
+    )
+    workspace.cleanup_orphans(keep=ledger.active_file_ids())
+    scheduler = make_upload_scheduler()
+
+    if getattr(Config, 'ENABLE_PIPELINE', False):
+        run_pipeline(source, ledger, workspace, scheduler)
+        return
+
     # Main Loop
     while True:
         try:
             print(f"Checking for new files in folder {Config.DRIVE_FOLDER_ID}...")
-            new_files = drive_service.monitor_folder(Config.DRIVE_FOLDER_ID)
+            new_files = source.poll()
+            if scheduler is not None:
+                pending, _ = scheduler.schedule(new_files, keep=ledger.should_process)
+            else:
+                pending = [f for f in new_files if ledger.should_process(f)]
             
-            if not new_files:
+            if not pending:
                 print("No new files found. Waiting...")
-                time.sleep(60) # Check every minute
+                time.sleep(source.interval)
                 continue
 
-            for file in new_files:
+            for file in pending:
+                if ledger.get_state(file) is None:
+                    ledger.mark(file, job_ledger.DISCOVERED)
                 print(f"Processing file: {file['name']} (ID: {file['id']})")
-                process_file(file, drive_service, ai_service, youtube_service, sheets_service)
-                
-                # For this MVP, we might want to stop after one file or mark it as processed.
-                # Since we don't have a database, we'll just sleep for a bit to avoid re-processing immediately
-                # In a real app, we'd move the file or store its ID.
-                # For now, let's assume the user removes the file or we just wait a long time.
-                print("File processed. Waiting before next check...")
-                time.sleep(60)
+                process_file(file, drive_service, ai_service, youtube_service, sheets_service,
+                             ledger=ledger, workspace=workspace, scheduler=scheduler)
 
         except KeyboardInterrupt:
             print("Stopping workflow...")
             break
         except Exception as e:
             print(f"Global error: {e}")
-            time.sleep(60)
+            time.sleep(source.interval)
+
+    ledger.close()
+    if scheduler is not None:
+        scheduler.close()
+
+def make_file_source(drive_service):
+    """
+    Returns the object the main loop polls for new files: a Drive Changes
+    API watcher if enabled, otherwise a full folder listing every minute.
+    """
+    poll_interval = getattr(Config, 'POLL_INTERVAL_SECONDS', 60)
+    if not getattr(Config, 'USE_DRIVE_CHANGES', False):
+        return FolderListingPoller(drive_service, Config.DRIVE_FOLDER_ID, interval=poll_interval)
+
+    return DriveChangeWatcher(
+        drive_service.service,
+        Config.DRIVE_FOLDER_ID,
+        getattr(Config, 'DRIVE_PAGE_TOKEN_FILE', 'drive_page_token.json'),
+        initial_scan=lambda: drive_service.monitor_folder(Config.DRIVE_FOLDER_ID),
+        min_interval=getattr(Config, 'DRIVE_POLL_MIN_SECONDS', 10),
+        max_interval=getattr(Config, 'DRIVE_POLL_MAX_SECONDS', 300),
+        recursive=getattr(Config, 'DRIVE_SCAN_RECURSIVE', False)
+    )
+
+def make_upload_scheduler():
+    """
+    Returns an UploadScheduler for the configured YouTube channels, or
+    None if quota tracking is turned off (YOUTUBE_DAILY_QUOTA = 0).
+    """
+    daily_quota = getattr(Config, 'YOUTUBE_DAILY_QUOTA', 10000)
+    if not daily_quota:
+        return None
+    return UploadScheduler(
+        getattr(Config, 'QUOTA_DB_FILE', 'youtube_quota.db'),
+        [channel['name'] for channel in YouTubeService.channel_profiles()],
+        daily_limit=daily_quota,
+        priorities=getattr(Config, 'UPLOAD_PRIORITY_KEYWORDS', {})
+    )
+
+def run_pipeline(source, ledger, workspace, scheduler=None):
+    """
+    Polls the folder and feeds new files into the concurrent pipeline.
+    Each pipeline worker builds its own service clients.
+    """
+    def services_factory():
+        return Services(DriveService(), AIService(), YouTubeService(), SheetsService(), workspace)
+
+    pipeline = Pipeline(services_factory, ledger=ledger, scheduler=scheduler).start()
+    print(f"Pipeline mode enabled. Workers per stage: {pipeline.workers}")
+
+    try:
+        while True:
+            try:
+                print(f"Checking for new files in folder {Config.DRIVE_FOLDER_ID}...")
+                new_files = source.poll()
+                keep = lambda f: ledger.should_process(f) and not pipeline.contains(f)
+                if scheduler is not None:
+                    new_files, _ = scheduler.schedule(new_files, keep=keep)
+                submitted = 0
+                for file in new_files:
+                    if not keep(file):
+                        continue
+                    if ledger.get_state(file) is None:
+                        ledger.mark(file, job_ledger.DISCOVERED)
+                    if pipeline.submit(file):
+                        print(f"Queued file: {file['name']} (ID: {file['id']})")
+                        submitted += 1
 
-def process_file(file, drive_service, ai_service, youtube_service, sheets_service):
+                if not submitted:
+                    print("No new files found. Waiting...")
+                time.sleep(source.interval)
+
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                print(f"Global error: {e}")
+                time.sleep(source.interval)
+    except KeyboardInterrupt:
+        print("Stopping workflow... waiting for in-flight files to finish.")
+        pipeline.shutdown()
+    finally:
+        ledger.close()
+        if scheduler is not None:
+            scheduler.close()
+
+def process_file(file, drive_service, ai_service, youtube_service, sheets_service, ledger=None, workspace=None,
+                 scheduler=None):
+    services = Services(drive_service, ai_service, youtube_service, sheets_service, workspace)
+    # Retries resume from the first stage that has not completed yet
+    job = Job.load(file, ledger)
+    try:
+        _process_job(job, services, ledger, scheduler)
+    finally:
+        refund_unused_quota(job, scheduler)
+
+def _process_job(job, services, ledger=None, scheduler=None):
+    file = job.file
     retries = Config.MAX_RETRIES
     for attempt in range(retries + 1):
         try:
-            # 1. Download Video
-            video_path = os.path.join(os.getcwd(), file['name'])
-            print(f"Downloading {file['name']}...")
-            drive_service.download_file(file['id'], video_path)
-            
-            # 2. Analyze Video
-            print("Analyzing video...")
-            analysis = ai_service.analyze_video(video_path)
-            title = analysis.get('title', 'Untitled Video')
-            description = analysis.get('description', 'No description.')
-            thumbnail_prompt = analysis.get('thumbnail_prompt', 'A cool video thumbnail')
-            
-            # 3. Generate Thumbnail
-            print("Generating thumbnail...")
-            thumbnail_path = os.path.join(os.getcwd(), 'thumbnail.png')
-            ai_service.generate_thumbnail(thumbnail_prompt, thumbnail_path, title=title)
-            # thumbnail_path = None
-            
-            # 4. Upload to YouTube (both accounts if enabled)
-            print("Uploading to YouTube...")
-            video_ids = youtube_service.upload_to_both_accounts(video_path, title, description, thumbnail_path)
-            
-            # Build YouTube links
-            youtube_links = []
-            if video_ids.get('primary'):
-                youtube_links.append(f"Primary: https://youtu.be/{video_ids['primary']}")
-            if video_ids.get('secondary'):
-                youtube_links.append(f"Secondary: https://youtu.be/{video_ids['secondary']}")
-            
-            youtube_link = " | ".join(youtube_links) if youtube_links else "Upload failed"
-            
-            # 5. Log to Sheets
-            print("Logging to Sheets...")
-            sheets_service.log_run(file['name'], title, description, youtube_link)
-            
-            # 6. Confirmation
-            print("\n" + "="*30)
-            print("SUCCESS! Video Uploaded.")
-            print(f"Title: {title}")
-            print(f"Links: {youtube_link}")
-            print(f"Summary: {description[:100]}...")
-            print("="*30 + "\n")
-            
-            # 7. Move to Done Folder
-            if Config.DRIVE_DONE_FOLDER_ID and Config.DRIVE_DONE_FOLDER_ID != 'YOUR_DONE_FOLDER_ID_HERE':
-                print(f"Moving file to Done folder ({Config.DRIVE_DONE_FOLDER_ID})...")
-                drive_service.move_file_to_folder(file['id'], Config.DRIVE_DONE_FOLDER_ID)
-            else:
-                print("No Done folder configured. Skipping move.")
-            
-            # Cleanup
-            if os.path.exists(video_path):
-                os.remove(video_path)
-            if thumbnail_path and os.path.exists(thumbnail_path):
-                os.remove(thumbnail_path)
-                
+            for stage in STAGES:
+                run_stage(stage, job, services, ledger)
             return # Success
 
+        except QuotaExceededError as e:
+            defer_for_quota(job, services, scheduler, e, ledger)
+            return
+
         except Exception as e:
             print(f"Error processing file (Attempt {attempt + 1}/{retries + 1}): {e}")
             if attempt < retries:
@@ -119,6 +195,9 @@ def process_file(file, drive_service, ai_service, youtube_service, sheets_servic
                 print("Max retries reached. Skipping file.")
                 # Send error notification (console for now)
                 print(f"FAILED to process {file['name']}. Please check logs.")
+                if ledger is not None:
+                    ledger.mark(file, job_ledger.FAILED, error=str(e))
+                release_failed_job(job, services)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,379 @@
+import os
+import queue
+import threading
+import time
+from config import Config
+from utils import job_ledger
+from utils.media_plan import plan_media
+
+# Stage names, in processing order
+STAGES = ('download', 'analyze', 'thumbnail', 'upload', 'log')
+
+# Default worker count per stage. Downloads and uploads are network bound,
+# thumbnails hit the DALL-E rate limit, and logging is a single API call.
+DEFAULT_STAGE_WORKERS = {
+    'download': 2,
+    'analyze': 2,
+    'thumbnail': 1,
+    'upload': 2,
+    'log': 1,
+}
+
+_STOP = object()
+
+
+class Services:
+    """The set of API clients a stage needs to run a job."""
+
+    def __init__(self, drive, ai, youtube, sheets, workspace=None):
+        self.drive = drive
+        self.ai = ai
+        self.youtube = youtube
+        self.sheets = sheets
+        # Shared WorkspaceManager; without one, files go in the current directory
+        self.workspace = workspace
+
+
+class Job:
+    """Everything the stages produce for a single Drive file."""
+
+    # Attributes saved in a checkpoint after each stage
+    CHECKPOINT_FIELDS = ('video_path', 'analysis', 'thumbnail_path', 'video_ids',
+                         'youtube_link', 'logged', 'completed_stages')
+
+    def __init__(self, file, checkpoint=None):
+        self.file = file
+        self.video_path = None
+        self.analysis = None
+        self.thumbnail_path = None
+        self.video_ids = None
+        self.youtube_link = None
+        self.logged = False
+        self.completed_stages = []
+        # Whether this run got as far as uploading (not checkpointed)
+        self.upload_started = False
+        # Decided from the Drive listing, before the download starts
+        self.media_plan = plan_media(file, analysis_proxy_kbps=_analysis_proxy_kbps()) if file.get('size') else None
+
+        for field, value in (checkpoint or {}).items():
+            if field in self.CHECKPOINT_FIELDS:
+                setattr(self, field, value)
+
+    @classmethod
+    def load(cls, file, ledger=None):
+        """Creates a job, resuming from the ledger's checkpoint if there is one."""
+        checkpoint = ledger.load_checkpoint(file) if ledger is not None else None
+        return cls(file, checkpoint)
+
+    def checkpoint(self):
+        return {field: getattr(self, field) for field in self.CHECKPOINT_FIELDS}
+
+    def is_complete(self, stage):
+        """
+        Returns True if a stage's outputs can be reused. Local files count
+        only while they still exist, unless every stage that reads them is
+        already done.
+        """
+        if stage not in self.completed_stages:
+            return False
+        if stage == 'download':
+            return bool(self.video_path and os.path.exists(self.video_path)) or \
+                ('analyze' in self.completed_stages and 'upload' in self.completed_stages)
+        if stage == 'thumbnail':
+            return bool(self.thumbnail_path and os.path.exists(self.thumbnail_path)) or \
+                'upload' in self.completed_stages
+        return True
+
+    @property
+    def title(self):
+        return self.analysis.get('title', 'Untitled Video')
+
+    @property
+    def description(self):
+        return self.analysis.get('description', 'No description.')
+
+    @property
+    def thumbnail_prompt(self):
+        return self.analysis.get('thumbnail_prompt', 'A cool video thumbnail')
+
+
+def _analysis_proxy_kbps():
+    if not getattr(Config, 'ANALYSIS_PROXY_ENABLED', True):
+        return None
+    return getattr(Config, 'ANALYSIS_PROXY_VIDEO_BITRATE_K', 300) + getattr(Config, 'ANALYSIS_PROXY_AUDIO_BITRATE_K', 48)
+
+
+def _mark(ledger, file, state, error=None):
+    """Records a job state if a ledger is in use."""
+    if ledger is not None:
+        ledger.mark(file, state, error=error)
+
+
+def _save_checkpoint(ledger, job):
+    if ledger is not None:
+        ledger.save_checkpoint(job.file, job.checkpoint())
+
+
+def run_stage(stage, job, services, ledger=None):
+    """
+    Runs one stage unless a checkpoint shows it already completed, then
+    checkpoints its outputs so retries and restarts resume after it.
+    """
+    if job.is_complete(stage):
+        print(f"Skipping {stage} for {job.file['name']} (already completed)")
+        return
+    STAGE_FUNCTIONS[stage](job, services, ledger)
+    if stage not in job.completed_stages:
+        job.completed_stages.append(stage)
+    _save_checkpoint(ledger, job)
+
+
+def _job_dir(job, services):
+    """Returns the job's scratch directory, waiting for disk space if needed."""
+    if services.workspace is None:
+        return os.getcwd()
+    reserve_bytes = job.media_plan['reserve_bytes'] if job.media_plan else 0
+    return services.workspace.acquire(job.file['id'], reserve_bytes)
+
+
+def download_stage(job, services, ledger=None):
+    file = job.file
+    job.video_path = os.path.join(_job_dir(job, services), file['name'])
+    print(f"Downloading {file['name']}...")
+    _mark(ledger, file, job_ledger.DOWNLOADING)
+    services.drive.download_file(
+        file['id'], job.video_path, size=file.get('size'), md5_checksum=file.get('md5Checksum'))
+
+
+def analyze_stage(job, services, ledger=None):
+    print(f"Analyzing video {job.file['name']}...")
+    job.analysis = services.ai.analyze_video(
+        job.video_path, media_plan=job.media_plan, content_hash=job.file.get('md5Checksum'))
+    _mark(ledger, job.file, job_ledger.ANALYZED)
+
+
+def thumbnail_stage(job, services, ledger=None):
+    print(f"Generating thumbnail for {job.file['name']}...")
+    job.thumbnail_path = os.path.join(_job_dir(job, services), f"thumbnail_{job.file['id']}.png")
+    services.ai.generate_thumbnail(job.thumbnail_prompt, job.thumbnail_path, title=job.title)
+
+
+def upload_stage(job, services, ledger=None):
+    from services.youtube_service import YouTubeService, UploadError
+
+    # Upload to every configured YouTube channel at once, skipping channels
+    # an earlier attempt already uploaded to
+    profiles = YouTubeService.channel_profiles()
+    video_ids = dict(job.video_ids or {})
+    channels = [c for c in profiles if not video_ids.get(c['name'])]
+    print(f"Uploading {job.file['name']} to YouTube...")
+    job.upload_started = True
+    try:
+        if channels:
+            video_ids.update(YouTubeService.upload_to_channels(
+                job.video_path, job.title, job.description, job.thumbnail_path,
+                channels=channels, clients={profiles[0]['name']: services.youtube}))
+    except UploadError as e:
+        # Keep the channels that did upload, so a retry only repeats the failed ones
+        job.video_ids = dict(video_ids, **{name: vid for name, vid in e.video_ids.items() if vid})
+        _save_checkpoint(ledger, job)
+        raise
+    job.video_ids = {c['name']: video_ids.get(c['name']) for c in profiles}
+    _mark(ledger, job.file, job_ledger.UPLOADED)
+
+    # Build YouTube links
+    youtube_links = [f"{name[:1].upper()}{name[1:]}: https://youtu.be/{video_id}"
+                     for name, video_id in job.video_ids.items() if video_id]
+
+    job.youtube_link = " | ".join(youtube_links) if youtube_links else "Upload failed"
+
+
+def log_stage(job, services, ledger=None):
+    file = job.file
+
+    # Checkpoint the Sheets row on its own so a failed move does not log twice
+    if not job.logged:
+        print("Logging to Sheets...")
+        services.sheets.log_run(file['name'], job.title, job.description, job.youtube_link)
+        job.logged = True
+        _save_checkpoint(ledger, job)
+        _mark(ledger, file, job_ledger.LOGGED)
+
+    # Confirmation
+    print("\n" + "="*30)
+    print("SUCCESS! Video Uploaded.")
+    print(f"Title: {job.title}")
+    print(f"Links: {job.youtube_link}")
+    print(f"Summary: {job.description[:100]}...")
+    print("="*30 + "\n")
+
+    # Move to Done Folder
+    if Config.DRIVE_DONE_FOLDER_ID and Config.DRIVE_DONE_FOLDER_ID != 'YOUR_DONE_FOLDER_ID_HERE':
+        print(f"Moving file to Done folder ({Config.DRIVE_DONE_FOLDER_ID})...")
+        services.drive.move_file_to_folder(file['id'], Config.DRIVE_DONE_FOLDER_ID)
+    else:
+        print("No Done folder configured. Skipping move.")
+
+    cleanup_job(job, services)
+    _mark(ledger, file, job_ledger.DONE)
+
+
+def cleanup_job(job, services):
+    """Removes the local files a job created and frees its disk reservation."""
+    for path in (job.video_path, job.thumbnail_path):
+        if path and os.path.exists(path):
+            os.remove(path)
+    if services.workspace is not None:
+        services.workspace.release(job.file['id'])
+
+
+def release_failed_job(job, services):
+    """
+    Frees a failed job's disk reservation but keeps its files, so the next
+    attempt can resume from them. Leftovers are removed at startup by
+    WorkspaceManager.cleanup_orphans once the job can no longer resume.
+    """
+    if services.workspace is not None:
+        services.workspace.release(job.file['id'], remove=False)
+
+
+def defer_for_quota(job, services, scheduler, error, ledger=None):
+    """
+    Holds a job whose channels ran out of YouTube quota until the next
+    quota window, without counting it as a failed attempt. Uploads that
+    did succeed are in the checkpoint and are not repeated.
+    """
+    print(f"{error}. Deferring {job.file['name']} to the next quota window.")
+    if scheduler is None:
+        _mark(ledger, job.file, job_ledger.FAILED, error=str(error))
+    else:
+        for channel in error.channels:
+            scheduler.exhaust(channel)
+        scheduler.defer(job.file)
+    release_failed_job(job, services)
+
+
+def refund_unused_quota(job, scheduler):
+    """Returns a job's reserved upload quota if this run never started uploading."""
+    if scheduler is not None and not job.upload_started:
+        scheduler.refund()
+
+
+STAGE_FUNCTIONS = {
+    'download': download_stage,
+    'analyze': analyze_stage,
+    'thumbnail': thumbnail_stage,
+    'upload': upload_stage,
+    'log': log_stage,
+}
+
+
+class Pipeline:
+    """
+    Runs jobs through the stages concurrently.
+
+    Each stage has its own pool of worker threads, and stages are connected
+    by bounded queues, so a slow stage applies back-pressure upstream
+    instead of letting downloaded videos pile up on disk. Every worker
+    thread gets its own Services from services_factory, because the Google
+    API clients are not safe to share between threads.
+    """
+
+    def __init__(self, services_factory, ledger=None, workers=None, queue_size=None, scheduler=None):
+        self.services_factory = services_factory
+        self.ledger = ledger
+        # UploadScheduler whose quota reservations jobs settle when they finish
+        self.scheduler = scheduler
+        self.workers = dict(DEFAULT_STAGE_WORKERS)
+        self.workers.update(workers if workers is not None else getattr(Config, 'PIPELINE_WORKERS', {}))
+        self.queue_size = queue_size or getattr(Config, 'PIPELINE_QUEUE_SIZE', 2)
+        self.max_retries = Config.MAX_RETRIES
+
+        self._queues = {stage: queue.Queue(maxsize=self.queue_size) for stage in STAGES}
+        self._threads = []
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        for stage in STAGES:
+            for i in range(max(1, self.workers[stage])):
+                thread = threading.Thread(
+                    target=self._worker, args=(stage,), name=f"{stage}-{i}", daemon=True)
+                thread.start()
+                self._threads.append((stage, thread))
+        return self
+
+    def submit(self, file):
+        """
+        Queues a file for processing. Blocks while the download queue is
+        full. Returns False if the file is already in the pipeline.
+        """
+        key = job_ledger.JobLedger.key(file)
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+        self._queues[STAGES[0]].put(Job.load(file, self.ledger))
+        return True
+
+    def contains(self, file):
+        """Returns True if the file is queued or being processed."""
+        with self._lock:
+            return job_ledger.JobLedger.key(file) in self._in_flight
+
+    def is_busy(self):
+        with self._lock:
+            return bool(self._in_flight)
+
+    def shutdown(self):
+        """Waits for all queued jobs to finish, then stops the workers."""
+        for stage in STAGES:
+            for worker_stage, _ in self._threads:
+                if worker_stage == stage:
+                    self._queues[stage].put(_STOP)
+            for worker_stage, thread in self._threads:
+                if worker_stage == stage:
+                    thread.join()
+        self._threads = []
+
+    def _worker(self, stage):
+        services = self.services_factory()
+        next_index = STAGES.index(stage) + 1
+        next_queue = self._queues[STAGES[next_index]] if next_index < len(STAGES) else None
+
+        while True:
+            job = self._queues[stage].get()
+            if job is _STOP:
+                return
+
+            if self._run_with_retries(stage, job, services):
+                if next_queue is not None:
+                    next_queue.put(job)
+                    continue
+            self._finish(job)
+
+    def _run_with_retries(self, stage, job, services):
+        from services.youtube_service import QuotaExceededError
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                run_stage(stage, job, services, self.ledger)
+                return True
+            except QuotaExceededError as e:
+                defer_for_quota(job, services, self.scheduler, e, self.ledger)
+                return False
+            except Exception as e:
+                print(f"Error in {stage} stage for {job.file['name']} "
+                      f"(Attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                if attempt < self.max_retries:
+                    time.sleep(Config.RETRY_DELAY_SECONDS)
+                else:
+                    print(f"FAILED to process {job.file['name']}. Please check logs.")
+                    _mark(self.ledger, job.file, job_ledger.FAILED, error=str(e))
+                    release_failed_job(job, services)
+        return False
+
+    def _finish(self, job):
+        refund_unused_quota(job, self.scheduler)
+        with self._lock:
+            self._in_flight.discard(job_ledger.JobLedger.key(job.file))
@@ -1,33 +1,209 @@
-import google.generativeai as genai
 from config import Config
+from utils.analysis_cache import AnalysisCache
+from services.gemini_files import shared_file_pool
+from services.gemini_poller import shared_poller
+from services.gemini_client import gemini
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+MODEL_NAME = 'gemini-2.0-flash'
+
+ANALYSIS_PROMPT = """
+            Analyze this video and generate the following outputs in JSON format:
+            1. "title": A YouTube title, 60 chars or less, engaging, no clickbait.
+            2. "description": 2-3 SEO-optimized paragraphs summarizing the video, including 5-10 hashtags.
+            3. "thumbnail_prompt": A detailed prompt for generating a unique, eye-catching thumbnail image.
+            
+            The JSON should look like:
+            {
+                "title": "...",
+                "description": "...",
+                "thumbnail_prompt": "..."
+            }
+            """
+
+FRAMES_PROMPT = """
+            The images are frames sampled in order from a video, followed by its audio track if available.
+            Analyze the video they come from and generate the following outputs in JSON format:
+            1. "title": A YouTube title, 60 chars or less, engaging, no clickbait.
+            2. "description": 2-3 SEO-optimized paragraphs summarizing the video, including 5-10 hashtags.
+            3. "thumbnail_prompt": A detailed prompt for generating a unique, eye-catching thumbnail image.
+            
+            The JSON should look like:
+            {
+                "title": "...",
+                "description": "...",
+                "thumbnail_prompt": "..."
+            }
+            """
+
+CHUNK_PROMPT = """
+            This video is part {index} of {count} of a longer recording, covering {start} to {end}.
+            Describe this part in JSON format:
+            1. "summary": One paragraph on what happens in this part.
+            2. "topics": A list of the main topics, people or places shown.
+            3. "visual": The most visually striking moment in this part.
+            
+            The JSON should look like:
+            {{
+                "summary": "...",
+                "topics": ["..."],
+                "visual": "..."
+            }}
+            """
+
+MERGE_PROMPT = """
+            Below are JSON descriptions of consecutive parts of one long video, in order.
+            Using them, generate the following outputs for the whole video in JSON format:
+            1. "title": A YouTube title, 60 chars or less, engaging, no clickbait.
+            2. "description": 2-3 SEO-optimized paragraphs summarizing the video, including 5-10 hashtags.
+            3. "thumbnail_prompt": A detailed prompt for generating a unique, eye-catching thumbnail image.
+            
+            The JSON should look like:
+            {
+                "title": "...",
+                "description": "...",
+                "thumbnail_prompt": "..."
+            }
+            
+            Parts:
+            """
 
 class AIService:
     def __init__(self):
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self._model = None
+        # Token usage of the most recent analysis response
+        self.last_usage = None
+        self.file_pool = shared_file_pool(
+            getattr(Config, 'GEMINI_FILE_POOL_FILE', 'gemini_files.json'),
+            ttl_seconds=getattr(Config, 'GEMINI_FILE_TTL_HOURS', 47) * 3600,
+            max_bytes=getattr(Config, 'GEMINI_FILE_POOL_MAX_GB', 10) * 1024 ** 3
+        )
+        self.cache = None
+        if getattr(Config, 'ENABLE_ANALYSIS_CACHE', True):
+            self.cache = AnalysisCache(
+                getattr(Config, 'ANALYSIS_CACHE_DIR', 'analysis_cache'),
+                max_entries=getattr(Config, 'ANALYSIS_CACHE_MAX_ENTRIES', 1000),
+                max_bytes=getattr(Config, 'ANALYSIS_CACHE_MAX_MB', 100) * 1024 * 1024
+            )
+
+    @property
+    def model(self):
+        """The Gemini model, created on first use so startup doesn't import the Gemini SDK."""
+        if self._model is None:
+            self._model = gemini().GenerativeModel(MODEL_NAME)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
 
-    def analyze_video(self, video_path):
+    def analyze_video(self, video_path, media_plan=None, content_hash=None):
         """
-        Uploads video to Gemini and generates metadata.
+        Returns title, description and thumbnail prompt for a video.
+
+        Results are cached by content hash (Drive's md5Checksum if given,
+        otherwise computed locally), prompt and model, so re-uploads of the
+        same footage skip Gemini entirely.
+
+        In 'video' mode, videos longer than ANALYSIS_CHUNK_THRESHOLD_MINUTES
+        are analyzed in chunks (see _analyze_chunked).
+        """
+        if not content_hash:
+            from services.drive_download import file_md5
+            content_hash = file_md5(video_path)
+
+        duration = None
+        if getattr(Config, 'ANALYSIS_CHUNK_THRESHOLD_MINUTES', 60):
+            duration = self._duration(video_path, media_plan)
+
+        if getattr(Config, 'ANALYSIS_MODE', 'video') == 'frames':
+            prompt = FRAMES_PROMPT
+            analyze = lambda: self._analyze_frames(video_path, media_plan)
+        elif self._chunk_seconds(duration):
+            prompt = CHUNK_PROMPT + MERGE_PROMPT
+            analyze = lambda: self._analyze_chunked(video_path, content_hash, duration)
+        else:
+            prompt = ANALYSIS_PROMPT
+            analyze = lambda: self._analyze_with_gemini(video_path, content_hash, media_plan)
+
+        if self.cache is None:
+            return analyze()
+
+        key = AnalysisCache.key(content_hash, prompt, MODEL_NAME)
+        cached = self.cache.get(key)
+        if cached:
+            print(f"Using cached analysis for {os.path.basename(video_path)}")
+            return cached
+
+        analysis = analyze()
+        self.cache.put(key, analysis, source=os.path.basename(video_path), model=MODEL_NAME)
+        return analysis
+
+    def _analyze_with_gemini(self, video_path, content_hash, media_plan=None, prompt=ANALYSIS_PROMPT):
+        """
+        Uploads video to Gemini and generates metadata (or whatever JSON
+        `prompt` asks for).
         Automatically compresses videos >500 MB.
+
+        media_plan (from utils.media_plan.plan_media) lets the size check and
+        the compression settings come from the Drive listing instead of
+        the local file and ffprobe.
+
+        The upload is kept in the file pool if analysis fails, so a retry
+        reuses it instead of compressing and uploading again.
         """
-        from utils.video_compressor import compress_video
+        from utils.video_compressor import compress_video, create_analysis_proxy
         
         # Check file size
-        file_size_mb = os.path.getsize(video_path) / (1024 * 1024)
+        if media_plan:
+            file_size_mb = media_plan['size_mb']
+            needs_proxy = media_plan['needs_proxy']
+            duration = media_plan['duration']
+        else:
+            file_size_mb = os.path.getsize(video_path) / (1024 * 1024)
+            needs_proxy = file_size_mb > 500
+            duration = None
         print(f"Video file size: {file_size_mb:.2f} MB")
+
+        proxy_settings = self._proxy_settings()
+        if proxy_settings:
+            variant = "proxy-{height}p{fps}-{video_bitrate_k}k-{audio_bitrate_k}k".format(**proxy_settings)
+        else:
+            variant = 'compressed' if needs_proxy else 'original'
+        pool_key = f"{content_hash}:{variant}"
+        video_file = self.file_pool.lookup(pool_key)
+        if video_file is not None:
+            print(f"Reusing Gemini file {video_file.name} from an earlier attempt")
         
-        # Compress if too large
         compressed_path = None
         analysis_path = video_path
+        base_path = os.path.splitext(video_path)[0]
+
+        # Analyze a small low-resolution proxy instead of the original
+        if video_file is None and proxy_settings:
+            compressed_path = f"{base_path}_proxy.mp4"
+            if not create_analysis_proxy(video_path, compressed_path, duration=duration, **proxy_settings):
+                print("Analysis proxy failed. Falling back to the original video.")
+            elif os.path.getsize(compressed_path) / (1024 * 1024) > 500:
+                # Very long videos outgrow the limit even at proxy bitrates
+                print("Analysis proxy exceeds 500 MB. Falling back to the original video.")
+            else:
+                analysis_path = compressed_path
+                needs_proxy = False
+            if analysis_path == video_path:
+                if os.path.exists(compressed_path):
+                    os.remove(compressed_path)
+                compressed_path = None
+                pool_key = f"{content_hash}:{'compressed' if needs_proxy else 'original'}"
         
-        if file_size_mb > 500:
+        # Compress if too large
+        if video_file is None and needs_proxy:
             print(f"Video exceeds 500 MB limit. Compressing...")
             compressed_path = video_path.replace('.mp4', '_compressed.mp4').replace('.mov', '_compressed.mov').replace('.m4v', '_compressed.m4v')
             
-            result = compress_video(video_path, compressed_path, target_size_mb=450)
+            result = compress_video(video_path, compressed_path, target_size_mb=450, duration=duration)
             
             if result:
                 analysis_path = compressed_path
@@ -36,67 +212,187 @@ class AIService:
             else:
                 raise Exception("Failed to compress video. Cannot process files >500 MB.")
         
+        succeeded = False
         try:
-            print(f"Uploading {analysis_path} to Gemini...")
-            video_file = genai.upload_file(path=analysis_path)
-            
-            # Wait for processing with timeout
-            import time
-            max_wait_time = 600
-            start_time = time.time()
+            if video_file is None:
+                video_file = self.file_pool.acquire(analysis_path, pool_key)
             
-            while video_file.state.name == "PROCESSING":
-                elapsed = time.time() - start_time
-                if elapsed > max_wait_time:
-                    raise Exception(f"Video processing timeout after {max_wait_time} seconds")
-                print(f"Waiting for video processing... ({elapsed:.0f}s elapsed)")
-                time.sleep(10)
-                video_file = genai.get_file(video_file.name)
+            # Wait for processing with timeout (one shared poller watches all uploads)
+            video_file = shared_poller().wait(video_file)
 
             if video_file.state.name == "FAILED":
                 raise Exception("Video processing failed.")
 
-            prompt = """
-            Analyze this video and generate the following outputs in JSON format:
-            1. "title": A YouTube title, 60 chars or less, engaging, no clickbait.
-            2. "description": 2-3 SEO-optimized paragraphs summarizing the video, including 5-10 hashtags.
-            3. "thumbnail_prompt": A detailed prompt for generating a unique, eye-catching thumbnail image.
-            
-            The JSON should look like:
-            {
-                "title": "...",
-                "description": "...",
-                "thumbnail_prompt": "..."
-            }
-            """
-            
             print("Generating analysis...")
             response = self.model.generate_content(
                 [video_file, prompt],
                 generation_config={"response_mime_type": "application/json"}
             )
             
-            text_response = response.text.strip()
-            print(f"DEBUG: Raw AI Response: {text_response}")
-
-            if text_response.startswith('```json'):
-                text_response = text_response[7:-3]
-            elif text_response.startswith('```'):
-                 text_response = text_response[3:-3]
-            
-            parsed_response = json.loads(text_response)
-            
-            if isinstance(parsed_response, list) and len(parsed_response) > 0:
-                parsed_response = parsed_response[0]
-            
+            parsed_response = self._parse_response(response)
+            succeeded = True
             return parsed_response
             
         finally:
+            if video_file is not None:
+                # Done with the upload on success; keep it for the retry otherwise
+                self.file_pool.release(pool_key, delete=succeeded or video_file.state.name == "FAILED")
+
             # Clean up compressed file
             if compressed_path and os.path.exists(compressed_path):
                 print(f"Cleaning up compressed file: {compressed_path}")
                 os.remove(compressed_path)
 
+    def _analyze_chunked(self, video_path, content_hash, duration):
+        """
+        Analyzes a long video as consecutive chunks, several at a time,
+        then merges the per-chunk descriptions into the final metadata
+        with one text-only request.
+
+        Chunks are cut at keyframes without re-encoding, and each goes
+        through _analyze_with_gemini (proxy, upload, reuse on retry) on
+        its own, so no single upload or request has to cover hours of video.
+        """
+        from utils import media_tools
+        from utils.video_compressor import chunk_boundaries, cut_segment
+
+        keyframes = media_tools.probe(video_path, keyframes=True).get('keyframes')
+        chunks = chunk_boundaries(duration, self._chunk_seconds(duration), keyframes)
+        workers = max(1, getattr(Config, 'ANALYSIS_CHUNK_WORKERS', 4))
+        base_path, ext = os.path.splitext(video_path)
+        print(f"Analyzing {duration / 60:.0f} minute video as {len(chunks)} chunks, {workers} at a time")
+
+        def analyze_chunk(index):
+            start, end = chunks[index]
+            chunk_path = f"{base_path}_chunk{index:03d}{ext}"
+            prompt = CHUNK_PROMPT.format(index=index + 1, count=len(chunks),
+                                         start=_timestamp(start), end=_timestamp(end))
+            try:
+                cut_segment(video_path, chunk_path, start, end if index < len(chunks) - 1 else None)
+                description = self._analyze_with_gemini(chunk_path, f"{content_hash}:{start:.3f}-{end:.3f}",
+                                                        prompt=prompt)
+            finally:
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+            return dict(description, start=_timestamp(start), end=_timestamp(end))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            descriptions = list(pool.map(analyze_chunk, range(len(chunks))))
+
+        print("Merging chunk analyses...")
+        response = self.model.generate_content(
+            MERGE_PROMPT + json.dumps(descriptions, indent=2),
+            generation_config={"response_mime_type": "application/json"}
+        )
+        return self._parse_response(response)
+
+    @staticmethod
+    def _duration(video_path, media_plan=None):
+        """Duration in seconds from the media plan or the shared probe, or None if unknown."""
+        if media_plan and media_plan.get('duration'):
+            return media_plan['duration']
+        try:
+            from utils import media_tools
+            return media_tools.duration(video_path)
+        except Exception as e:
+            print(f"Could not probe duration of {video_path}: {e}")
+            return None
+
+    @staticmethod
+    def _chunk_seconds(duration):
+        """Chunk length for a video of this duration, or None if it should be analyzed whole."""
+        threshold = getattr(Config, 'ANALYSIS_CHUNK_THRESHOLD_MINUTES', 60) * 60
+        if not threshold or not duration or duration <= threshold:
+            return None
+        return getattr(Config, 'ANALYSIS_CHUNK_MINUTES', 15) * 60
+
+    def _analyze_frames(self, video_path, media_plan=None):
+        """
+        Generates metadata from sampled frames and a compressed audio track,
+        sent inline with the request. Skips the Gemini file upload and the
+        PROCESSING wait entirely, which matters most for long videos.
+        """
+        from utils.frame_sampler import sample_frames, extract_audio
+        import shutil
+
+        base_path = os.path.splitext(video_path)[0]
+        frames_dir = f"{base_path}_frames"
+        audio_path = f"{base_path}_audio.aac"
+        duration = media_plan['duration'] if media_plan else None
+
+        try:
+            frames = sample_frames(
+                video_path, frames_dir,
+                count=getattr(Config, 'FRAME_SAMPLE_COUNT', 16),
+                mode=getattr(Config, 'FRAME_SAMPLE_MODE', 'scene'),
+                scene_threshold=getattr(Config, 'FRAME_SCENE_THRESHOLD', 0.3),
+                width=getattr(Config, 'FRAME_WIDTH', 640),
+                duration=duration
+            )
+            if not frames:
+                raise Exception("No frames could be extracted from the video.")
+            print(f"Sampled {len(frames)} frames")
+
+            parts = []
+            for frame_path in frames:
+                with open(frame_path, 'rb') as f:
+                    parts.append({'mime_type': 'image/jpeg', 'data': f.read()})
+
+            # Inline requests are limited to 20 MB, so long audio is left out
+            max_audio_mb = getattr(Config, 'FRAME_MAX_AUDIO_MB', 12)
+            if extract_audio(video_path, audio_path, bitrate_k=getattr(Config, 'FRAME_AUDIO_BITRATE_K', 32)):
+                audio_mb = os.path.getsize(audio_path) / (1024 * 1024)
+                if audio_mb <= max_audio_mb:
+                    with open(audio_path, 'rb') as f:
+                        parts.append({'mime_type': 'audio/aac', 'data': f.read()})
+                else:
+                    print(f"Audio track is {audio_mb:.1f} MB (limit {max_audio_mb} MB). Analyzing frames only.")
+
+            parts.append(FRAMES_PROMPT)
+
+            print("Generating analysis from frames...")
+            response = self.model.generate_content(
+                parts,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            return self._parse_response(response)
+
+        finally:
+            shutil.rmtree(frames_dir, ignore_errors=True)
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+
+    def _parse_response(self, response):
+        """Parses the JSON metadata out of a generate_content response."""
+        self.last_usage = getattr(response, 'usage_metadata', None)
+
+        text_response = response.text.strip()
+        print(f"DEBUG: Raw AI Response: {text_response}")
+
+        if text_response.startswith('```json'):
+            text_response = text_response[7:-3]
+        elif text_response.startswith('```'):
+             text_response = text_response[3:-3]
+        
+        parsed_response = json.loads(text_response)
+        
+        if isinstance(parsed_response, list) and len(parsed_response) > 0:
+            parsed_response = parsed_response[0]
+        
+        return parsed_response
+
+    @staticmethod
+    def _proxy_settings():
+        """Returns keyword arguments for create_analysis_proxy, or None if proxies are disabled."""
+        if not getattr(Config, 'ANALYSIS_PROXY_ENABLED', True):
+            return None
+        return {
+            'height': getattr(Config, 'ANALYSIS_PROXY_HEIGHT', 360),
+            'fps': getattr(Config, 'ANALYSIS_PROXY_FPS', 5),
+            'video_bitrate_k': getattr(Config, 'ANALYSIS_PROXY_VIDEO_BITRATE_K', 300),
+            'audio_bitrate_k': getattr(Config, 'ANALYSIS_PROXY_AUDIO_BITRATE_K', 48),
+        }
+
     def generate_thumbnail(self, prompt, output_path, title=""):
         """
         Generates a UNIQUE thumbnail using DALL-E 3 with completely randomized styling.
@@ -384,3 +680,9 @@ Make this thumbnail visually distinct and unique."""
             quality -= 10
         
         print(f"Warning: Could not compress below {max_size_mb} MB")
+
+
+def _timestamp(seconds):
+    """Formats seconds as H:MM:SS."""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
@@ -0,0 +1,214 @@
+import os
+import datetime
+import threading
+import httplib2
+import google_auth_httplib2
+from google.oauth2.credentials import Credentials
+from config import Config
+
+# Refresh tokens this many seconds before they expire
+DEFAULT_REFRESH_MARGIN = 300
+# Wait before trying again after a failed background refresh
+REFRESH_RETRY_SECONDS = 60
+
+
+class CredentialManager:
+    """
+    Shares OAuth credentials and API clients between every service.
+
+    Each token file is loaded (or refreshed, or authorized in the browser)
+    once per process. A background thread refreshes every token shortly
+    before it expires and writes it back atomically, so API calls never
+    wait on a refresh and concurrent services don't race to rewrite the
+    same token file.
+
+    httplib2 is not thread-safe, so API clients are cached per thread.
+    Clients are built on first use from the discovery documents bundled
+    with google-api-python-client, so creating a service makes no network
+    call; other threads then reuse the first client's parsed document.
+    The discovery, transport and OAuth flow modules are imported only
+    when first needed, keeping them out of startup.
+    """
+
+    def __init__(self, scopes=None, refresh_margin=None):
+        self.scopes = scopes or Config.SCOPES
+        if refresh_margin is None:
+            refresh_margin = getattr(Config, 'CREDENTIAL_REFRESH_MARGIN_SECONDS', DEFAULT_REFRESH_MARGIN)
+        self.refresh_margin = refresh_margin
+
+        self._creds = {}
+        self._documents = {}
+        self._lock = threading.RLock()
+        self._cond = threading.Condition(self._lock)
+        self._retry_at = {}
+        self._local = threading.local()
+        self._thread = None
+
+    def credentials(self, token_file, credentials_file=None):
+        """
+        Returns the shared Credentials for a token file, loading it the
+        first time. If the token is missing or can't be refreshed, runs the
+        browser authorization flow with credentials_file.
+        """
+        with self._lock:
+            creds = self._creds.get(token_file)
+            if creds is None:
+                creds = self._load(token_file, credentials_file or Config.CREDENTIALS_FILE)
+                self._creds[token_file] = creds
+                self._ensure_thread()
+                self._cond.notify()
+            return creds
+
+    def _load(self, token_file, credentials_file):
+        creds = None
+        if os.path.exists(token_file):
+            creds = Credentials.from_authorized_user_file(token_file, self.scopes)
+        if creds and creds.valid:
+            return creds
+
+        if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
+            creds.refresh(Request())
+        elif os.path.exists(credentials_file):
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            flow = InstalledAppFlow.from_client_secrets_file(credentials_file, self.scopes)
+            creds = flow.run_local_server(port=0)
+        else:
+            raise FileNotFoundError(f"Credentials file {credentials_file} not found.")
+        self._save(token_file, creds)
+        return creds
+
+    @staticmethod
+    def _save(token_file, creds):
+        tmp_path = token_file + '.tmp'
+        with open(tmp_path, 'w') as token:
+            token.write(creds.to_json())
+        os.replace(tmp_path, token_file)
+
+    def refresh(self, token_file):
+        """Refreshes a token now and writes it back to its file."""
+        from google.auth.transport.requests import Request
+        with self._lock:
+            creds = self._creds[token_file]
+            creds.refresh(Request())
+            self._save(token_file, creds)
+
+    def http(self, token_file, credentials_file=None):
+        """Returns an authorized HTTP client for the calling thread."""
+        clients = self._thread_clients()
+        http = clients.get(token_file)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials(token_file, credentials_file),
+                                                       http=httplib2.Http())
+            clients[token_file] = http
+        return http
+
+    def client(self, api, version, token_file, credentials_file=None):
+        """
+        Returns an API client that can be shared between threads. Every
+        call made through it uses the calling thread's own client.
+        """
+        self.credentials(token_file, credentials_file)
+        return ThreadLocalClient(self, api, version, token_file, credentials_file)
+
+    def thread_client(self, api, version, token_file, credentials_file=None):
+        """Returns the calling thread's client for an API, building it on first use."""
+        clients = self._thread_clients()
+        key = (api, version, token_file)
+        client = clients.get(key)
+        if client is not None:
+            return client
+
+        from googleapiclient.discovery import build, build_from_document
+        http = self.http(token_file, credentials_file)
+        with self._lock:
+            document = self._documents.get((api, version))
+        if document is not None:
+            client = build_from_document(document, http=http)
+        else:
+            client = build(api, version, http=http, static_discovery=True, cache_discovery=False)
+            document = getattr(client, '_rootDesc', None)
+            if document is not None:
+                with self._lock:
+                    self._documents.setdefault((api, version), document)
+        clients[key] = client
+        return client
+
+    def _thread_clients(self):
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        return clients
+
+    def seconds_until_refresh(self, creds, now=None):
+        """Seconds until a token is due for refresh, or None if it doesn't expire."""
+        expiry = creds.expiry
+        if expiry is None:
+            return None
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        # google-auth keeps expiry as naive UTC
+        if expiry.tzinfo is None:
+            now = now.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return (expiry - now).total_seconds() - self.refresh_margin
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="credential-refresher", daemon=True)
+            self._thread.start()
+
+    def _next_due(self):
+        """Returns (token_file, seconds until due) for the token to refresh next, or (None, None)."""
+        due = None
+        for token_file, creds in self._creds.items():
+            if not creds.refresh_token:
+                continue
+            delay = self.seconds_until_refresh(creds)
+            if delay is None:
+                continue
+            retry_at = self._retry_at.get(token_file)
+            if retry_at is not None:
+                delay = max(delay, retry_at - datetime.datetime.now().timestamp())
+            if due is None or delay < due[1]:
+                due = (token_file, delay)
+        return due or (None, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                token_file, delay = self._next_due()
+                if token_file is None or delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+                try:
+                    self.refresh(token_file)
+                    self._retry_at.pop(token_file, None)
+                except Exception as e:
+                    print(f"Error refreshing {token_file}: {e}")
+                    self._retry_at[token_file] = datetime.datetime.now().timestamp() + REFRESH_RETRY_SECONDS
+
+
+class ThreadLocalClient:
+    """
+    Stands in for a googleapiclient Resource. Attribute lookups go to the
+    calling thread's client, so one object can be used from any thread.
+    """
+
+    def __init__(self, manager, api, version, token_file, credentials_file=None):
+        self._manager = manager
+        self._key = (api, version, token_file, credentials_file)
+
+    def __getattr__(self, name):
+        return getattr(self._manager.thread_client(*self._key), name)
+
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+
+def shared_credentials():
+    """Returns the process-wide credential manager, creating it on first use."""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = CredentialManager()
+        return _shared_manager
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class DownloadError(Exception):
+    pass
+
+
+class RangeNotSupported(DownloadError):
+    """The server ignored the Range header and sent the whole file."""
+
+
+def file_md5(path, block_size=8 * 1024 * 1024):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+class ParallelDownloader:
+    """
+    Downloads a file as byte ranges over several connections.
+
+    Chunks are written in place into <output>.part, and the indexes of the
+    finished chunks are recorded in <output>.part.json as they land. If the
+    process dies, the next download of the same file (same ID, size and
+    checksum) only fetches the chunks that are missing. The finished file
+    is checked against the expected md5 before it is renamed into place.
+
+    http_factory is called from each worker thread and must return an
+    authorized httplib2-style client for that thread.
+
+    The first missing chunk is fetched on its own. If the server answers
+    it with the whole file (200 instead of 206), RangeNotSupported is
+    raised before any other worker starts, so callers can fall back to a
+    single download instead of every chunk transferring the full file.
+    Once any chunk fails for good, the chunks not yet started are
+    cancelled and in-flight ones stop retrying.
+    """
+
+    def __init__(self, uri, http_factory, size, md5_checksum=None, file_id=None,
+                 chunk_size=32 * 1024 * 1024, connections=4, chunk_retries=3):
+        self.uri = uri
+        self.http_factory = http_factory
+        self.size = int(size)
+        self.md5_checksum = md5_checksum
+        self.file_id = file_id
+        self.chunk_size = chunk_size
+        self.connections = connections
+        self.chunk_retries = chunk_retries
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def download(self, output_path):
+        part_path = output_path + '.part'
+        progress_path = part_path + '.json'
+        self._cancelled.clear()
+
+        done = self._load_progress(part_path, progress_path)
+        if not done:
+            # Allocate the whole file up front so chunks can be written at any offset
+            with open(part_path, 'wb') as f:
+                f.truncate(self.size)
+
+        chunk_count = (self.size + self.chunk_size - 1) // self.chunk_size
+        missing = [i for i in range(chunk_count) if i not in done]
+        if done:
+            print(f"Resuming download: {len(done)}/{chunk_count} chunks already on disk")
+
+        if missing:
+            try:
+                self._fetch_chunk(missing[0], part_path, progress_path, done)
+            except RangeNotSupported:
+                for path in (part_path, progress_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+            self._fetch_chunks(missing[1:], part_path, progress_path, done)
+
+        if self.md5_checksum:
+            actual = file_md5(part_path)
+            if actual != self.md5_checksum:
+                os.remove(part_path)
+                os.remove(progress_path)
+                raise DownloadError(
+                    f"Checksum mismatch for {output_path}: expected {self.md5_checksum}, got {actual}")
+
+        os.replace(part_path, output_path)
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        return output_path
+
+    def _fetch_chunks(self, indexes, part_path, progress_path, done):
+        if not indexes:
+            return
+        workers = max(1, min(self.connections, len(indexes)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._fetch_chunk, i, part_path, progress_path, done) for i in indexes]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                self._cancelled.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _load_progress(self, part_path, progress_path):
+        """Returns the set of finished chunks from a previous run, if it can be reused."""
+        if not (os.path.exists(part_path) and os.path.exists(progress_path)):
+            return set()
+        try:
+            with open(progress_path, 'r') as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return set()
+
+        expected = {
+            'file_id': self.file_id,
+            'size': self.size,
+            'md5': self.md5_checksum,
+            'chunk_size': self.chunk_size,
+        }
+        if any(progress.get(key) != value for key, value in expected.items()):
+            return set()
+        if os.path.getsize(part_path) != self.size:
+            return set()
+        return set(progress.get('done', []))
+
+    def _save_progress(self, progress_path, done):
+        tmp_path = progress_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'file_id': self.file_id,
+                'size': self.size,
+                'md5': self.md5_checksum,
+                'chunk_size': self.chunk_size,
+                'done': sorted(done),
+            }, f)
+        os.replace(tmp_path, progress_path)
+
+    def _fetch_chunk(self, index, part_path, progress_path, done):
+        start = index * self.chunk_size
+        end = min(start + self.chunk_size, self.size) - 1
+        http = self.http_factory()
+
+        for attempt in range(self.chunk_retries + 1):
+            if self._cancelled.is_set():
+                raise DownloadError(f"Chunk {index} cancelled after another chunk failed")
+            try:
+                resp, content = http.request(
+                    self.uri, 'GET', headers={'Range': f'bytes={start}-{end}'})
+                if resp.status == 200:
+                    raise RangeNotSupported(f"Server ignored the range for bytes {start}-{end}")
+                if resp.status != 206:
+                    raise DownloadError(f"HTTP {resp.status} for bytes {start}-{end}")
+                if len(content) != end - start + 1:
+                    raise DownloadError(
+                        f"Short read for bytes {start}-{end}: got {len(content)} bytes")
+                break
+            except Exception as e:
+                if isinstance(e, RangeNotSupported) or attempt >= self.chunk_retries or self._cancelled.is_set():
+                    # Stop the other workers before they start another request
+                    self._cancelled.set()
+                    raise
+                delay = 2 ** attempt
+                print(f"Chunk {index} failed ({e}). Retrying in {delay}s...")
+                time.sleep(delay)
+
+        with open(part_path, 'r+b') as f:
+            f.seek(start)
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            done.add(index)
+            self._save_progress(progress_path, done)
@@ -1,59 +1,126 @@
-import os
 import io
 import time
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from config import Config
+from services.drive_download import ParallelDownloader, RangeNotSupported
+from services.credentials import shared_credentials
 
 # SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# Everything later stages need from a listing, so they don't have to fetch it again
+FILE_FIELDS = "id, name, createdTime, mimeType, md5Checksum, size, parents, videoMediaMetadata"
+
 class DriveService:
-    def __init__(self):
-        self.creds = self._authenticate()
-        self.service = build('drive', 'v3', credentials=self.creds)
-
-    def _authenticate(self):
-        creds = None
-        if os.path.exists(Config.TOKEN_FILE):
-            creds = Credentials.from_authorized_user_file(Config.TOKEN_FILE, Config.SCOPES)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if os.path.exists(Config.CREDENTIALS_FILE):
-                     flow = InstalledAppFlow.from_client_secrets_file(
-                        Config.CREDENTIALS_FILE, Config.SCOPES)
-                     creds = flow.run_local_server(port=0)
-                else:
-                    raise FileNotFoundError(f"Credentials file {Config.CREDENTIALS_FILE} not found.")
-            with open(Config.TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
-        return creds
+    def __init__(self, credentials=None):
+        self.credentials = credentials or shared_credentials()
+        self.creds = self.credentials.credentials(Config.TOKEN_FILE, Config.CREDENTIALS_FILE)
+        self.service = self.credentials.client('drive', 'v3', Config.TOKEN_FILE, Config.CREDENTIALS_FILE)
 
     def monitor_folder(self, folder_id):
         """
-        Checks for new files in the specified folder.
-        This is a simplified version that checks for files created after a certain time 
-        or just lists recent files. For a robust trigger, we'd need to store state.
-        For this MVP, we'll list files that match the criteria.
+        Returns every video in the specified folder (and its subfolders if
+        DRIVE_SCAN_RECURSIVE is set).
         """
-        query = f"'{folder_id}' in parents and trashed = false"
-        results = self.service.files().list(
-            q=query, pageSize=10, fields="nextPageToken, files(id, name, createdTime, mimeType)").execute()
-        items = results.get('files', [])
-        
-        valid_files = []
-        for item in items:
-            name = item['name']
-            if any(name.lower().endswith(ext) for ext in Config.VIDEO_EXTENSIONS):
-                valid_files.append(item)
-        
-        return valid_files
+        return list(self.scan_folder(
+            folder_id,
+            recursive=getattr(Config, 'DRIVE_SCAN_RECURSIVE', False),
+            max_workers=getattr(Config, 'DRIVE_SCAN_WORKERS', 4)
+        ))
+
+    def scan_folder(self, folder_id, recursive=False, max_workers=4):
+        """
+        Yields every video in a folder, following nextPageToken until the
+        listing is exhausted. Filtering happens in the Drive query, so only
+        videos (and subfolders, when recursive) come back over the wire.
+
+        When recursive, subfolders are listed in parallel by up to
+        max_workers threads.
+        """
+        if not recursive:
+            yield from self._list_folder(folder_id)
+            return
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = {pool.submit(self._list_folder_all, folder_id)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for item in future.result():
+                        if item['mimeType'] == FOLDER_MIME_TYPE:
+                            pending.add(pool.submit(self._list_folder_all, item['id']))
+                        else:
+                            yield item
+
+    def _list_folder(self, folder_id, include_folders=False):
+        """Yields the videos (and optionally subfolders) directly in a folder."""
+        mime_filter = "mimeType contains 'video/'"
+        if include_folders:
+            mime_filter = f"({mime_filter} or mimeType = '{FOLDER_MIME_TYPE}')"
+        query = f"'{folder_id}' in parents and trashed = false and {mime_filter}"
+
+        page_token = None
+        while True:
+            results = self.service.files().list(
+                q=query,
+                pageSize=1000,
+                pageToken=page_token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                fields=f"nextPageToken, files({FILE_FIELDS})"
+            ).execute(http=self._thread_http())
+            yield from results.get('files', [])
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+    def _list_folder_all(self, folder_id):
+        return list(self._list_folder(folder_id, include_folders=True))
+
+    def _thread_http(self):
+        """
+        Returns an authorized HTTP client for the calling thread. httplib2
+        is not thread-safe, so worker threads must not share the one the
+        service was built with.
+        """
+        return self.credentials.http(Config.TOKEN_FILE, Config.CREDENTIALS_FILE)
+
+    def download_file(self, file_id, file_name, size=None, md5_checksum=None):
+        """
+        Downloads a file using parallel ranged requests, resuming from a
+        partial .part file if a previous download was interrupted.
+        size and md5_checksum are fetched from Drive if not given.
+        """
+        if size is None:
+            meta = self.service.files().get(
+                fileId=file_id, fields='size, md5Checksum', supportsAllDrives=True).execute()
+            size = meta.get('size')
+            md5_checksum = md5_checksum or meta.get('md5Checksum')
+
+        if size is None:
+            # Google-native files have no size and can't be fetched by range
+            return self._download_single(file_id, file_name)
+
+        request = self.service.files().get_media(fileId=file_id, supportsAllDrives=True)
+        downloader = ParallelDownloader(
+            request.uri,
+            self._thread_http,
+            size,
+            md5_checksum=md5_checksum,
+            file_id=file_id,
+            chunk_size=int(getattr(Config, 'DOWNLOAD_CHUNK_SIZE_MB', 32) * 1024 * 1024),
+            connections=getattr(Config, 'DOWNLOAD_CONNECTIONS', 4)
+        )
+        try:
+            return downloader.download(file_name)
+        except RangeNotSupported:
+            print("Drive ignored the byte range. Downloading in a single request instead.")
+            return self._download_single(file_id, file_name)
 
-    def download_file(self, file_id, file_name):
+    def _download_single(self, file_id, file_name):
+        from googleapiclient.http import MediaIoBaseDownload
         request = self.service.files().get_media(fileId=file_id)
         fh = io.FileIO(file_name, 'wb')
         downloader = MediaIoBaseDownload(fh, request)
@@ -0,0 +1,205 @@
+import os
+import json
+from config import Config
+from services.drive_service import FOLDER_MIME_TYPE, FILE_FIELDS
+
+CHANGE_FIELDS = (
+    "nextPageToken, newStartPageToken, changes(fileId, removed, "
+    "file(id, name, createdTime, mimeType, md5Checksum, size, parents, trashed, videoMediaMetadata))"
+)
+
+
+def is_video(file):
+    name = file.get('name', '').lower()
+    return file.get('mimeType', '').startswith('video/') or \
+        any(name.endswith(ext) for ext in Config.VIDEO_EXTENSIONS)
+
+
+class FolderListingPoller:
+    """Lists the whole folder on every poll, at a fixed interval."""
+
+    def __init__(self, drive_service, folder_id, interval=60):
+        self.drive_service = drive_service
+        self.folder_id = folder_id
+        self.interval = interval
+
+    def poll(self):
+        return self.drive_service.monitor_folder(self.folder_id)
+
+
+class DriveChangeWatcher:
+    """
+    Watches a folder through the Drive Changes API.
+
+    Only files added or modified since the last poll are returned, so an
+    idle folder costs one changes().list call per poll instead of a full
+    listing. The page token is saved to token_file after every poll and
+    picked up again on restart.
+
+    The poll interval backs off while nothing changes and drops back to
+    min_interval as soon as a new video shows up.
+
+    With recursive=True, videos anywhere under the folder count. The IDs
+    of every folder in the tree are listed once and kept up to date from
+    the folder changes in the feed. When a folder is moved or created
+    under the tree, the videos already in it are returned too, since
+    moving a folder doesn't show up as a change to its contents.
+    """
+
+    def __init__(self, service, folder_id, token_file, initial_scan=None,
+                 min_interval=10, max_interval=300, backoff=2.0, recursive=False):
+        self.service = service
+        self.folder_id = folder_id
+        self.recursive = recursive
+        # Folders whose videos are watched; the whole tree is loaded on first use when recursive
+        self._folders = None if recursive else {folder_id}
+        self.token_file = token_file
+        self.initial_scan = initial_scan
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.page_token = self._load_token()
+        self._scanned = False
+
+    def _load_token(self):
+        if not os.path.exists(self.token_file):
+            return None
+        try:
+            with open(self.token_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # A token saved for another folder still works, but its history is
+        # unrelated, so start fresh from a full scan instead.
+        if data.get('folder_id') != self.folder_id:
+            return None
+        return data.get('page_token')
+
+    def _save_token(self):
+        tmp_path = self.token_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'folder_id': self.folder_id, 'page_token': self.page_token}, f)
+        os.replace(tmp_path, self.token_file)
+
+    def poll(self):
+        """Returns the videos in the folder that are new or changed."""
+        if self.page_token is None:
+            # Take the token before scanning so nothing added during the scan is missed
+            self.page_token = self.service.changes().getStartPageToken(
+                supportsAllDrives=True).execute()['startPageToken']
+            self._save_token()
+
+        if not self._scanned:
+            # Always scan once per process, so files found before a crash
+            # but never finished are picked up again
+            self._scanned = True
+            files = self.initial_scan() if self.initial_scan else []
+        else:
+            files = self._list_changes()
+
+        self._adjust_interval(bool(files))
+        return files
+
+    def _list_changes(self):
+        if self._folders is None:
+            self._folders, _ = self._scan_tree(self.folder_id)
+        files = {}
+        page_token = self.page_token
+        while page_token is not None:
+            response = self.service.changes().list(
+                pageToken=page_token,
+                spaces='drive',
+                includeRemoved=False,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                pageSize=1000,
+                fields=CHANGE_FIELDS
+            ).execute()
+
+            changes = response.get('changes', [])
+            if self.recursive:
+                # Folders first, so videos in a folder created on the same page are kept
+                for video in self._update_folders(changes):
+                    files[video['id']] = video
+
+            for change in changes:
+                file = change.get('file')
+                if change.get('removed') or not file or file.get('trashed'):
+                    continue
+                if self._folders.isdisjoint(file.get('parents', [])) or not is_video(file):
+                    continue
+                # The same file can appear several times; keep the latest
+                files[file['id']] = file
+
+            if 'newStartPageToken' in response:
+                self.page_token = response['newStartPageToken']
+                self._save_token()
+            page_token = response.get('nextPageToken')
+
+        return list(files.values())
+
+    def _update_folders(self, changes):
+        """
+        Applies folder changes to the set of watched folders. Returns the
+        videos in folders that joined the tree.
+        """
+        videos = []
+        rebuild = False
+        for change in changes:
+            file = change.get('file')
+            if file is not None and file.get('mimeType') != FOLDER_MIME_TYPE:
+                continue
+            folder_id = change.get('fileId') or file['id']
+            if folder_id == self.folder_id:
+                continue
+            inside = bool(file) and not change.get('removed') and not file.get('trashed') and \
+                not self._folders.isdisjoint(file.get('parents', []))
+            if inside and folder_id not in self._folders:
+                folders, found = self._scan_tree(folder_id)
+                self._folders |= folders
+                videos.extend(found)
+            elif not inside and folder_id in self._folders:
+                # Its subfolders left with it; listing the tree again is simplest
+                rebuild = True
+        if rebuild:
+            self._folders, _ = self._scan_tree(self.folder_id)
+        return videos
+
+    def _scan_tree(self, folder_id):
+        """Returns the IDs of a folder and every folder under it, and the videos in them."""
+        folders, videos = {folder_id}, []
+        pending = [folder_id]
+        while pending:
+            for item in self._list_children(pending.pop()):
+                if item['mimeType'] == FOLDER_MIME_TYPE:
+                    if item['id'] not in folders:
+                        folders.add(item['id'])
+                        pending.append(item['id'])
+                elif is_video(item):
+                    videos.append(item)
+        return folders, videos
+
+    def _list_children(self, folder_id):
+        query = (f"'{folder_id}' in parents and trashed = false and "
+                 f"(mimeType contains 'video/' or mimeType = '{FOLDER_MIME_TYPE}')")
+        page_token = None
+        while True:
+            response = self.service.files().list(
+                q=query,
+                pageSize=1000,
+                pageToken=page_token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                fields=f"nextPageToken, files({FILE_FIELDS})"
+            ).execute()
+            yield from response.get('files', [])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    def _adjust_interval(self, active):
+        if active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
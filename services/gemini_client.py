@@ -0,0 +1,20 @@
+import threading
+from config import Config
+
+_configured = False
+_lock = threading.Lock()
+
+
+def gemini():
+    """
+    Returns the google.generativeai module, configured with the API key.
+    It is imported on first use rather than at startup: it takes longer
+    to import than the rest of the app and only analysis needs it.
+    """
+    global _configured
+    import google.generativeai as genai
+    with _lock:
+        if not _configured:
+            genai.configure(api_key=Config.GEMINI_API_KEY)
+            _configured = True
+    return genai
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import threading
+from services.gemini_client import gemini
+
+
+class GeminiFilePool:
+    """
+    Tracks files uploaded to the Gemini Files API so they can be reused.
+
+    Uploads are registered under a content key (the source video's hash
+    plus which copy of it was uploaded). As long as a registered file is
+    still ACTIVE or PROCESSING and younger than ttl_seconds, acquire()
+    hands it back instead of uploading the same bytes again, so a retry
+    after a bad response skips the upload and the processing wait.
+
+    Files are deleted with release() once a job no longer needs them.
+    Expired entries are dropped, and the oldest idle files are deleted
+    whenever a new upload would push the pool over max_bytes. The
+    registry is saved to registry_file so uploads survive a restart.
+
+    Use shared_file_pool() rather than creating pools directly: each pool
+    rewrites the whole registry, so two pools on one file would erase
+    each other's entries.
+    """
+
+    def __init__(self, registry_file, ttl_seconds=47 * 3600, max_bytes=10 * 1024 ** 3, client=None):
+        self.registry_file = registry_file
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._client = client
+        self._lock = threading.Lock()
+        self._in_use = {}
+        self._files = self._load()
+
+    @property
+    def client(self):
+        return self._client or gemini()
+
+    def _load(self):
+        if not os.path.exists(self.registry_file):
+            return {}
+        try:
+            with open(self.registry_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        tmp_path = self.registry_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._files, f, indent=2)
+        os.replace(tmp_path, self.registry_file)
+
+    def lookup(self, content_key):
+        """Returns a reusable uploaded file for content_key, or None."""
+        with self._lock:
+            entry = self._files.get(content_key)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.time():
+                self._forget(content_key)
+                return None
+
+        try:
+            video_file = self.client.get_file(entry['name'])
+        except Exception as e:
+            print(f"Gemini file {entry['name']} is no longer available: {e}")
+            with self._lock:
+                self._forget(content_key)
+            return None
+
+        if video_file.state.name not in ("ACTIVE", "PROCESSING"):
+            self.release(content_key)
+            return None
+
+        with self._lock:
+            self._in_use[content_key] = self._in_use.get(content_key, 0) + 1
+        return video_file
+
+    def acquire(self, path, content_key):
+        """Returns the uploaded file for content_key, uploading path only if needed."""
+        video_file = self.lookup(content_key)
+        if video_file is not None:
+            print(f"Reusing Gemini file {video_file.name} for {os.path.basename(path)}")
+            return video_file
+
+        size_bytes = os.path.getsize(path)
+        self._make_room(size_bytes)
+
+        print(f"Uploading {path} to Gemini...")
+        video_file = self.client.upload_file(path=path)
+        with self._lock:
+            self._files[content_key] = {
+                'name': video_file.name,
+                'size_bytes': size_bytes,
+                'uploaded_at': time.time(),
+                'expires_at': time.time() + self.ttl_seconds,
+            }
+            self._in_use[content_key] = self._in_use.get(content_key, 0) + 1
+            self._save()
+        return video_file
+
+    def release(self, content_key, delete=True):
+        """Marks a file as no longer needed by a job, deleting it by default."""
+        with self._lock:
+            count = self._in_use.get(content_key, 0) - 1
+            if count > 0:
+                self._in_use[content_key] = count
+                return
+            self._in_use.pop(content_key, None)
+            entry = self._files.get(content_key)
+            if not delete or entry is None:
+                return
+            self._forget(content_key)
+        self._delete_remote(entry['name'])
+
+    def _forget(self, content_key):
+        self._files.pop(content_key, None)
+        self._in_use.pop(content_key, None)
+        self._save()
+
+    def _delete_remote(self, name):
+        try:
+            self.client.delete_file(name)
+            print(f"Deleted Gemini file {name}")
+        except Exception as e:
+            print(f"Warning: could not delete Gemini file {name}: {e}")
+
+    def _make_room(self, size_bytes):
+        """Deletes expired and then the oldest idle files until size_bytes fits under max_bytes."""
+        to_delete = []
+        with self._lock:
+            now = time.time()
+            for key, entry in list(self._files.items()):
+                if entry['expires_at'] <= now:
+                    self._files.pop(key)
+
+            idle = sorted(
+                (key for key in self._files if not self._in_use.get(key)),
+                key=lambda key: self._files[key]['uploaded_at']
+            )
+            total = sum(entry['size_bytes'] for entry in self._files.values())
+            while idle and total + size_bytes > self.max_bytes:
+                key = idle.pop(0)
+                entry = self._files.pop(key)
+                total -= entry['size_bytes']
+                to_delete.append(entry['name'])
+            self._save()
+
+        for name in to_delete:
+            self._delete_remote(name)
+
+
+_shared_pools = {}
+_shared_lock = threading.Lock()
+
+
+def shared_file_pool(registry_file, **kwargs):
+    """Returns the process-wide pool for a registry file, creating it on first use."""
+    key = os.path.abspath(registry_file)
+    with _shared_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            pool = _shared_pools[key] = GeminiFilePool(registry_file, **kwargs)
+        return pool
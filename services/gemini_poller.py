@@ -0,0 +1,138 @@
+import time
+import heapq
+import random
+import threading
+from concurrent.futures import Future
+from services.gemini_client import gemini
+
+
+class GeminiPoller:
+    """
+    Waits for uploaded Gemini files to finish PROCESSING.
+
+    One background thread checks every watched file. Each file is checked
+    after initial_interval, then at intervals that grow by backoff up to
+    max_interval, with some jitter so files uploaded together don't poll
+    in lockstep. Short clips resolve within a second or two, and dozens
+    of uploads can be watched without tying up a thread each.
+    """
+
+    def __init__(self, client=None, initial_interval=1.0, max_interval=15.0, backoff=1.6,
+                 jitter=0.2, timeout=600):
+        self._client = client
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._heap = []
+        self._watches = {}
+        self._thread = None
+
+    @property
+    def client(self):
+        return self._client or gemini()
+
+    def watch(self, video_file, callback=None):
+        """
+        Starts watching an uploaded file. Returns a Future that resolves to
+        the file once its state is no longer PROCESSING, or fails after the
+        timeout. callback, if given, is called with the Future when done.
+        """
+        with self._cond:
+            watch = self._watches.get(video_file.name)
+            if watch is None:
+                future = Future()
+                if video_file.state.name != "PROCESSING":
+                    future.set_result(video_file)
+                    if callback:
+                        future.add_done_callback(callback)
+                    return future
+
+                now = time.monotonic()
+                watch = {
+                    'future': future,
+                    'started': now,
+                    'interval': self.initial_interval,
+                }
+                self._watches[video_file.name] = watch
+                heapq.heappush(self._heap, (now + self.initial_interval, video_file.name))
+                self._ensure_thread()
+                self._cond.notify()
+
+        if callback:
+            watch['future'].add_done_callback(callback)
+        return watch['future']
+
+    def wait(self, video_file):
+        """Blocks until the file is ACTIVE or FAILED and returns it."""
+        return self.watch(video_file).result()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="gemini-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due, name = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+                heapq.heappop(self._heap)
+                watch = self._watches.get(name)
+
+            if watch is not None:
+                self._check(name, watch)
+
+    def _check(self, name, watch):
+        elapsed = time.monotonic() - watch['started']
+        try:
+            video_file = self.client.get_file(name)
+        except Exception as e:
+            # Treat API errors like a file that is still processing, until the timeout
+            print(f"Error checking Gemini file {name}: {e}")
+            video_file = None
+
+        if video_file is not None and video_file.state.name != "PROCESSING":
+            self._resolve(name, result=video_file)
+            return
+
+        if elapsed > self.timeout:
+            self._resolve(name, error=Exception(f"Video processing timeout after {self.timeout} seconds"))
+            return
+
+        print(f"Waiting for video processing... ({elapsed:.0f}s elapsed)")
+        interval = watch['interval'] * random.uniform(1 - self.jitter, 1 + self.jitter)
+        watch['interval'] = min(self.max_interval, watch['interval'] * self.backoff)
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + interval, name))
+
+    def _resolve(self, name, result=None, error=None):
+        with self._cond:
+            watch = self._watches.pop(name, None)
+        if watch is None:
+            return
+        if error is not None:
+            watch['future'].set_exception(error)
+        else:
+            watch['future'].set_result(result)
+
+
+_shared_poller = None
+_shared_lock = threading.Lock()
+
+
+def shared_poller(timeout=600):
+    """Returns the process-wide poller, creating it on first use."""
+    global _shared_poller
+    with _shared_lock:
+        if _shared_poller is None:
+            _shared_poller = GeminiPoller(timeout=timeout)
+        return _shared_poller
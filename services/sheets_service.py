@@ -1,35 +1,14 @@
-import os
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from config import Config
+from services.credentials import shared_credentials
 import datetime
 
 # SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
 class SheetsService:
-    def __init__(self):
-        self.creds = self._authenticate()
-        self.service = build('sheets', 'v4', credentials=self.creds)
-
-    def _authenticate(self):
-        creds = None
-        if os.path.exists(Config.TOKEN_FILE):
-            creds = Credentials.from_authorized_user_file(Config.TOKEN_FILE, Config.SCOPES)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if os.path.exists(Config.CREDENTIALS_FILE):
-                     flow = InstalledAppFlow.from_client_secrets_file(
-                        Config.CREDENTIALS_FILE, Config.SCOPES)
-                     creds = flow.run_local_server(port=0)
-                else:
-                    raise FileNotFoundError(f"Credentials file {Config.CREDENTIALS_FILE} not found.")
-            with open(Config.TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
-        return creds
+    def __init__(self, credentials=None):
+        self.credentials = credentials or shared_credentials()
+        self.creds = self.credentials.credentials(Config.TOKEN_FILE, Config.CREDENTIALS_FILE)
+        self.service = self.credentials.client('sheets', 'v4', Config.TOKEN_FILE, Config.CREDENTIALS_FILE)
 
     def log_run(self, video_file, title, description, youtube_link):
         values = [
@@ -1,42 +1,66 @@
 import os
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httplib2
+from googleapiclient.errors import HttpError
 from config import Config
+from services.credentials import shared_credentials
+
+# HTTP statuses worth retrying a chunk for
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# 403 reasons meaning the channel can't upload again until its quota resets
+QUOTA_REASONS = ('quotaExceeded', 'dailyLimitExceeded', 'uploadLimitExceeded')
+
+
+class UploadError(Exception):
+    """Raised when uploads to some channels fail. video_ids has the uploads that did succeed."""
+
+    message = "YouTube upload failed for"
+
+    def __init__(self, channels, video_ids):
+        super().__init__(f"{self.message} {', '.join(channels)}")
+        self.channels = channels
+        self.video_ids = video_ids
+
+
+class QuotaExceededError(UploadError):
+    """Raised when channels run out of YouTube quota. video_ids has the uploads that did succeed."""
+
+    message = "YouTube quota exceeded for"
+
+
+def is_quota_error(error):
+    if not isinstance(error, HttpError) or error.resp.status != 403:
+        return False
+    content = error.content.decode(errors='replace') if isinstance(error.content, bytes) else str(error.content)
+    return any(reason in content for reason in QUOTA_REASONS)
 
 class YouTubeService:
-    def __init__(self, credentials_file=None, token_file=None):
+    def __init__(self, credentials_file=None, token_file=None, credentials=None):
         """
         Initialize YouTube service with optional custom credentials.
-        If not provided, uses default from Config.
+        If not provided, uses default from Config. Tokens and API clients
+        come from the shared CredentialManager, so creating another
+        service for the same account is cheap.
         """
         self.credentials_file = credentials_file or Config.CREDENTIALS_FILE
         self.token_file = token_file or Config.TOKEN_FILE
-        self.creds = self._authenticate()
-        self.service = build('youtube', 'v3', credentials=self.creds)
-
-    def _authenticate(self):
-        creds = None
-        if os.path.exists(self.token_file):
-            creds = Credentials.from_authorized_user_file(self.token_file, Config.SCOPES)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if os.path.exists(self.credentials_file):
-                     flow = InstalledAppFlow.from_client_secrets_file(
-                        self.credentials_file, Config.SCOPES)
-                     creds = flow.run_local_server(port=0)
-                else:
-                    raise FileNotFoundError(f"Credentials file {self.credentials_file} not found.")
-            with open(self.token_file, 'w') as token:
-                token.write(creds.to_json())
-        return creds
+        self.credentials = credentials or shared_credentials()
+        self.creds = self.credentials.credentials(self.token_file, self.credentials_file)
+        self.service = self.credentials.client('youtube', 'v3', self.token_file, self.credentials_file)
 
     def upload_video(self, file_path, title, description, thumbnail_path=None):
-        """Upload video to YouTube"""
+        """
+        Upload video to YouTube.
+
+        The video is sent in chunks of YOUTUBE_UPLOAD_CHUNK_MB. The
+        resumable session URI and the bytes the server has confirmed are
+        saved next to the file after every chunk, so after a crash the
+        next attempt asks YouTube how far it got and continues from there.
+        Server errors and dropped connections are retried per chunk, up to
+        YOUTUBE_UPLOAD_RETRIES times in a row.
+        """
         body = {
             'snippet': {
                 'title': title,
@@ -49,76 +73,243 @@ class YouTubeService:
             }
         }
 
-        media = MediaFileUpload(file_path, chunksize=-1, resumable=True)
-        
+        session_path = self._session_path(file_path)
+        session = self._load_session(session_path, file_path)
+
         print(f"Uploading {file_path} to YouTube...")
-        request = self.service.videos().insert(
-            part=','.join(body.keys()),
-            body=body,
-            media_body=media
-        )
-        
-        response = None
-        while response is None:
-            status, response = request.next_chunk()
-            if status:
-                print(f"Uploaded {int(status.progress() * 100)}%")
+        try:
+            response = self._upload(file_path, body, session_path, session)
+        except HttpError as e:
+            if session is None or e.resp.status not in (404, 410):
+                raise
+            # The session expired (YouTube keeps them about a week)
+            print("Saved upload session has expired. Starting the upload again.")
+            os.remove(session_path)
+            response = self._upload(file_path, body, session_path, None)
 
         video_id = response.get('id')
         print(f"Upload Complete! Video ID: {video_id}")
 
         if thumbnail_path and os.path.exists(thumbnail_path):
+            from googleapiclient.http import MediaFileUpload
             print(f"Uploading thumbnail...")
             self.service.thumbnails().set(
                 videoId=video_id,
                 media_body=MediaFileUpload(thumbnail_path)
             ).execute()
-            
+
+        # Kept until now so a retry after a failed thumbnail finds the finished upload
+        if os.path.exists(session_path):
+            os.remove(session_path)
         return video_id
 
+    def _upload(self, file_path, body, session_path, session=None):
+        from googleapiclient.http import MediaFileUpload
+        chunk_size = getattr(Config, 'YOUTUBE_UPLOAD_CHUNK_MB', 32) * 1024 * 1024
+        max_retries = getattr(Config, 'YOUTUBE_UPLOAD_RETRIES', 5)
+        file_size = os.path.getsize(file_path)
+
+        media = MediaFileUpload(file_path, chunksize=chunk_size, resumable=True)
+        request = self.service.videos().insert(
+            part=','.join(body.keys()),
+            body=body,
+            media_body=media
+        )
+        if session:
+            print(f"Resuming upload from {session['offset'] / (1024 * 1024):.0f} MB...")
+            request.resumable_uri = session['uri']
+
+        # The only retry layer: each failed chunk is retried here, after asking
+        # the server how many bytes it kept
+        response = None
+        query_status = session is not None
+        failures = 0
+        while response is None:
+            try:
+                status = None
+                if query_status:
+                    response = self._query_upload_status(request, file_size)
+                    query_status = False
+                if response is None:
+                    status, response = request.next_chunk(num_retries=0)
+            except HttpError as e:
+                if e.resp.status not in RETRYABLE_STATUSES:
+                    raise
+                error = e
+            except (OSError, httplib2.HttpLib2Error) as e:
+                error = e
+            else:
+                failures = 0
+                if status:
+                    self._save_session(session_path, file_path, file_size, request)
+                    print(f"Uploaded {int(status.progress() * 100)}%")
+                continue
+
+            failures += 1
+            if failures > max_retries:
+                raise error
+            delay = min(60, 2 ** failures)
+            print(f"Upload chunk failed ({error}). Retrying in {delay}s...")
+            time.sleep(delay)
+            query_status = True
+
+        return response
+
+    @staticmethod
+    def _query_upload_status(request, file_size):
+        """
+        Asks the server how much of a resumable upload it has, with an empty
+        PUT and 'Content-Range: bytes */<size>', and moves the request's
+        progress there.
+
+        Returns:
+            The finished upload's response if the server already has every
+            byte, else None
+
+        Raises:
+            HttpError for any other status; 404 or 410 means the session expired
+        """
+        resp, content = request.http.request(request.resumable_uri, method='PUT', headers={
+            'Content-Length': '0',
+            'Content-Range': f'bytes */{file_size}',
+        })
+        if resp.status in (200, 201):
+            return request.postproc(resp, content)
+        if resp.status != 308:
+            raise HttpError(resp, content, uri=request.resumable_uri)
+        # Range is 'bytes=0-<last byte received>', and missing if nothing was
+        request.resumable_progress = int(resp['range'].rsplit('-', 1)[1]) + 1 if 'range' in resp else 0
+        return None
+
+    def _session_path(self, file_path):
+        """One session file per video and account, so channels don't share sessions."""
+        account = os.path.splitext(os.path.basename(self.token_file))[0]
+        return f"{file_path}.{account}.upload.json"
+
+    @staticmethod
+    def _load_session(session_path, file_path):
+        """Returns the saved upload session for this file, if it can be resumed."""
+        if not os.path.exists(session_path):
+            return None
+        try:
+            with open(session_path, 'r') as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(file_path)
+        if session.get('size') != stat.st_size or session.get('mtime') != stat.st_mtime or not session.get('uri'):
+            return None
+        return session
+
+    @staticmethod
+    def _save_session(session_path, file_path, file_size, request):
+        if not request.resumable_uri:
+            return
+        tmp_path = session_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'uri': request.resumable_uri,
+                'offset': request.resumable_progress,
+                'size': file_size,
+                'mtime': os.stat(file_path).st_mtime,
+            }, f)
+        os.replace(tmp_path, session_path)
+
+    @staticmethod
+    def channel_profiles():
+        """
+        Returns the channels to upload to, as dicts with 'name',
+        'credentials_file' and 'token_file'. Uses Config.YOUTUBE_CHANNELS,
+        or else the primary account plus the secondary one if
+        ENABLE_DUAL_UPLOAD is set. The first channel is the primary.
+        """
+        channels = getattr(Config, 'YOUTUBE_CHANNELS', None)
+        if channels:
+            return [dict(channel) for channel in channels]
+
+        channels = [{
+            'name': 'primary',
+            'credentials_file': Config.CREDENTIALS_FILE,
+            'token_file': Config.TOKEN_FILE,
+        }]
+        if getattr(Config, 'ENABLE_DUAL_UPLOAD', False):
+            channels.append({
+                'name': 'secondary',
+                'credentials_file': Config.SECOND_CREDENTIALS_FILE,
+                'token_file': Config.SECOND_TOKEN_FILE,
+            })
+        return channels
+
+    @staticmethod
+    def upload_to_channels(file_path, title, description, thumbnail_path=None, channels=None, clients=None):
+        """
+        Uploads a video to every channel at once, one thread per channel,
+        all reading the same local file. Each channel succeeds or fails on
+        its own.
+
+        Args:
+            channels: Channel profiles (default: channel_profiles())
+            clients: Already authenticated YouTubeServices by channel name,
+                     used instead of creating new ones
+
+        Returns:
+            dict of channel name to video ID (None where the channel has no
+            credentials and was skipped), in channel order
+
+        Raises:
+            QuotaExceededError if any channel is out of quota, or else
+            UploadError if any upload failed, after the other channels have
+            finished. Both carry the video IDs of the uploads that succeeded.
+        """
+        if channels is None:
+            channels = YouTubeService.channel_profiles()
+        clients = clients or {}
+        quota_exceeded = []
+        failed = []
+
+        def upload(channel):
+            name = channel['name']
+            try:
+                if name in clients:
+                    service = clients[name]
+                elif not os.path.exists(channel['token_file']) and not os.path.exists(channel['credentials_file']):
+                    print(f"Warning: {channel['credentials_file']} not found. Skipping {name} upload.")
+                    return None
+                else:
+                    service = YouTubeService(credentials_file=channel['credentials_file'],
+                                             token_file=channel['token_file'])
+                video_id = service.upload_video(file_path, title, description, thumbnail_path)
+                print(f"✓ {name} upload successful: https://youtu.be/{video_id}")
+                return video_id
+            except Exception as e:
+                print(f"✗ {name} upload failed: {e}")
+                if is_quota_error(e):
+                    quota_exceeded.append(name)
+                else:
+                    failed.append(name)
+                return None
+
+        if len(channels) > 1:
+            print(f"\n=== Uploading to {len(channels)} YouTube channels: "
+                  f"{', '.join(c['name'] for c in channels)} ===")
+        with ThreadPoolExecutor(max_workers=len(channels)) as pool:
+            video_ids = list(pool.map(upload, channels))
+        video_ids = {channel['name']: video_id for channel, video_id in zip(channels, video_ids)}
+        if quota_exceeded:
+            raise QuotaExceededError(quota_exceeded, video_ids)
+        if failed:
+            raise UploadError(failed, video_ids)
+        return video_ids
+
     @staticmethod
     def upload_to_both_accounts(file_path, title, description, thumbnail_path=None):
         """
         Upload video to both YouTube accounts.
         Returns dict with both video IDs.
+
+        Kept for existing callers; see upload_to_channels.
         """
-        results = {}
-        
-        # Check if dual upload is enabled
-        if not hasattr(Config, 'ENABLE_DUAL_UPLOAD') or not Config.ENABLE_DUAL_UPLOAD:
-            # Single upload only
-            service = YouTubeService()
-            video_id = service.upload_video(file_path, title, description, thumbnail_path)
-            results['primary'] = video_id
-            return results
-        
-        # Upload to primary account
-        print("\n=== Uploading to PRIMARY YouTube account ===")
         try:
-            primary_service = YouTubeService()
-            primary_id = primary_service.upload_video(file_path, title, description, thumbnail_path)
-            results['primary'] = primary_id
-            print(f"✓ Primary upload successful: https://youtu.be/{primary_id}")
-        except Exception as e:
-            print(f"✗ Primary upload failed: {e}")
-            results['primary'] = None
-        
-        # Upload to secondary account
-        print("\n=== Uploading to SECONDARY YouTube account ===")
-        try:
-            if not os.path.exists(Config.SECOND_CREDENTIALS_FILE):
-                print(f"Warning: {Config.SECOND_CREDENTIALS_FILE} not found. Skipping secondary upload.")
-                results['secondary'] = None
-            else:
-                secondary_service = YouTubeService(
-                    credentials_file=Config.SECOND_CREDENTIALS_FILE,
-                    token_file=Config.SECOND_TOKEN_FILE
-                )
-                secondary_id = secondary_service.upload_video(file_path, title, description, thumbnail_path)
-                results['secondary'] = secondary_id
-                print(f"✓ Secondary upload successful: https://youtu.be/{secondary_id}")
-        except Exception as e:
-            print(f"✗ Secondary upload failed: {e}")
-            results['secondary'] = None
-        
-        return results
+            return YouTubeService.upload_to_channels(file_path, title, description, thumbnail_path)
+        except UploadError as e:
+            return e.video_ids
@@ -0,0 +1,177 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import json
+import tempfile
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai_service import AIService, MERGE_PROMPT, FRAMES_PROMPT
+
+class TestChunkedAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.service = AIService.__new__(AIService)
+        self.service.last_usage = None
+        self.service.cache = None
+        self.service.model = MagicMock()
+        self.service.model.generate_content.return_value = MagicMock(
+            text=json.dumps({'title': 'Whole video', 'description': 'd', 'thumbnail_prompt': 't'}))
+
+    @patch('services.ai_service.Config')
+    @patch('utils.video_compressor.cut_segment')
+    @patch('utils.media_tools.probe', return_value={'keyframes': [0.0, 895.0, 1790.0, 2700.0]})
+    def test_long_video_is_analyzed_in_chunks_and_merged(self, mock_probe, mock_cut, mock_config):
+        mock_config.ANALYSIS_MODE = 'video'
+        mock_config.ANALYSIS_CHUNK_THRESHOLD_MINUTES = 30
+        mock_config.ANALYSIS_CHUNK_MINUTES = 15
+        mock_config.ANALYSIS_CHUNK_WORKERS = 2
+
+        def analyze_chunk(path, content_hash, prompt=None, media_plan=None):
+            return {'summary': f"summary of {os.path.basename(path)}"}
+        self.service._analyze_with_gemini = MagicMock(side_effect=analyze_chunk)
+
+        result = self.service.analyze_video('/tmp/long.mp4', media_plan={'duration': 3000.0},
+                                            content_hash='abc')
+
+        self.assertEqual(result['title'], 'Whole video')
+        self.assertEqual(mock_cut.call_count, 4)
+        self.assertEqual([c.args[2] for c in mock_cut.call_args_list], [0.0, 895.0, 1790.0, 2700.0])
+
+        # One text-only merge request, carrying every chunk's summary in order
+        merge_request = self.service.model.generate_content.call_args.args[0]
+        self.assertTrue(merge_request.startswith(MERGE_PROMPT))
+        parts = json.loads(merge_request[len(MERGE_PROMPT):])
+        self.assertEqual([p['summary'] for p in parts],
+                         [f"summary of long_chunk{i:03d}.mp4" for i in range(4)])
+        self.assertEqual(parts[1]['start'], '0:14:55')
+
+    @patch('services.ai_service.Config')
+    def test_short_video_is_analyzed_whole(self, mock_config):
+        mock_config.ANALYSIS_MODE = 'video'
+        mock_config.ANALYSIS_CHUNK_THRESHOLD_MINUTES = 30
+        self.service._analyze_with_gemini = MagicMock(return_value={'title': 'Short'})
+
+        result = self.service.analyze_video('/tmp/short.mp4', media_plan={'duration': 600.0},
+                                            content_hash='abc')
+
+        self.assertEqual(result['title'], 'Short')
+        self.service._analyze_with_gemini.assert_called_once()
+
+class TestFramesAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.tmp.name, 'video.mp4')
+        self.service = AIService.__new__(AIService)
+        self.service.model = MagicMock()
+        self.service.model.generate_content.return_value = MagicMock(
+            text=json.dumps({'title': 'Frames', 'description': 'd', 'thumbnail_prompt': 't'}))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fake_sample_frames(self, video_path, frames_dir, count=16, **kwargs):
+        os.makedirs(frames_dir)
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(frames_dir, f"scene_{i + 1:03d}.jpg"))
+            with open(paths[-1], 'wb') as f:
+                f.write(b'jpeg%d' % i)
+        self.sample_kwargs = dict(kwargs, count=count)
+        return paths
+
+    def analyze(self, audio_bytes):
+        def fake_extract_audio(video_path, audio_path, bitrate_k=32):
+            if audio_bytes is None:
+                return None
+            with open(audio_path, 'wb') as f:
+                f.write(audio_bytes)
+            return audio_path
+
+        with patch('utils.frame_sampler.sample_frames', side_effect=self.fake_sample_frames), \
+             patch('utils.frame_sampler.extract_audio', side_effect=fake_extract_audio):
+            result = self.service._analyze_frames(self.video_path, media_plan={'duration': 90.0})
+        return result, self.service.model.generate_content.call_args.args[0]
+
+    def test_frames_and_audio_are_sent_inline_and_cleaned_up(self):
+        result, parts = self.analyze(b'aac')
+        self.assertEqual(result['title'], 'Frames')
+        self.assertEqual([p['mime_type'] for p in parts[:-1]], ['image/jpeg'] * 3 + ['audio/aac'])
+        self.assertEqual(parts[0]['data'], b'jpeg0')
+        self.assertEqual(parts[-1], FRAMES_PROMPT)
+        self.assertEqual(self.sample_kwargs['duration'], 90.0)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    @patch('services.ai_service.Config')
+    def test_oversized_or_missing_audio_is_left_out(self, mock_config):
+        mock_config.FRAME_MAX_AUDIO_MB = 0
+        _, parts = self.analyze(b'aac')
+        self.assertEqual([p['mime_type'] for p in parts[:-1]], ['image/jpeg'] * 3)
+
+        _, parts = self.analyze(None)
+        self.assertEqual([p['mime_type'] for p in parts[:-1]], ['image/jpeg'] * 3)
+
+PROXY_SETTINGS = {'height': 360, 'fps': 5, 'video_bitrate_k': 300, 'audio_bitrate_k': 48}
+
+@patch.object(AIService, '_proxy_settings', return_value=PROXY_SETTINGS)
+@patch('services.ai_service.shared_poller')
+class TestAnalysisUpload(unittest.TestCase):
+    def setUp(self):
+        self.service = AIService.__new__(AIService)
+        self.service.model = MagicMock()
+        self.service.model.generate_content.return_value = MagicMock(
+            text=json.dumps({'title': 'T', 'description': 'd', 'thumbnail_prompt': 't'}))
+        self.service.file_pool = MagicMock()
+        self.service.file_pool.lookup.return_value = None
+        self.video_file = MagicMock()
+        self.video_file.state.name = 'ACTIVE'
+        self.service.file_pool.acquire.return_value = self.video_file
+
+    def analyze(self, mock_poller, size_mb):
+        mock_poller.return_value.wait.side_effect = lambda video_file: video_file
+        plan = {'size_mb': size_mb, 'needs_proxy': size_mb > 500, 'duration': 600.0}
+        return self.service._analyze_with_gemini('/tmp/video.mp4', 'abc', media_plan=plan)
+
+    @patch('os.path.getsize', return_value=100 * 1024 * 1024)
+    @patch('utils.video_compressor.compress_video')
+    @patch('utils.video_compressor.create_analysis_proxy', side_effect=lambda src, dst, **kwargs: dst)
+    def test_proxy_is_uploaded_under_its_own_pool_key(self, mock_proxy, mock_compress, mock_size, mock_poller,
+                                                       mock_settings):
+        self.assertEqual(self.analyze(mock_poller, 800)['title'], 'T')
+        mock_proxy.assert_called_once_with('/tmp/video.mp4', '/tmp/video_proxy.mp4', duration=600.0, **PROXY_SETTINGS)
+        mock_compress.assert_not_called()
+        self.service.file_pool.acquire.assert_called_once_with('/tmp/video_proxy.mp4', 'abc:proxy-360p5-300k-48k')
+        self.service.file_pool.release.assert_called_once_with('abc:proxy-360p5-300k-48k', delete=True)
+
+    @patch('os.path.getsize', return_value=400 * 1024 * 1024)
+    @patch('utils.video_compressor.compress_video', side_effect=lambda src, dst, **kwargs: dst)
+    @patch('utils.video_compressor.create_analysis_proxy', return_value=None)
+    def test_failed_proxy_falls_back_to_compression(self, mock_proxy, mock_compress, mock_size, mock_poller,
+                                                     mock_settings):
+        self.analyze(mock_poller, 800)
+        mock_compress.assert_called_once()
+        self.service.file_pool.acquire.assert_called_once_with('/tmp/video_compressed.mp4', 'abc:compressed')
+
+    @patch('os.remove')
+    @patch('os.path.exists', return_value=True)
+    @patch('os.path.getsize', side_effect=lambda path: (600 if path.endswith('_proxy.mp4') else 400) * 1024 * 1024)
+    @patch('utils.video_compressor.compress_video', side_effect=lambda src, dst, **kwargs: dst)
+    @patch('utils.video_compressor.create_analysis_proxy', side_effect=lambda src, dst, **kwargs: dst)
+    def test_oversized_proxy_falls_back_to_compression(self, mock_proxy, mock_compress, mock_size, mock_exists,
+                                                       mock_remove, mock_poller, mock_settings):
+        self.analyze(mock_poller, 5000)
+        mock_remove.assert_any_call('/tmp/video_proxy.mp4')
+        mock_compress.assert_called_once()
+        self.service.file_pool.acquire.assert_called_once_with('/tmp/video_compressed.mp4', 'abc:compressed')
+
+    @patch('utils.video_compressor.compress_video')
+    @patch('utils.video_compressor.create_analysis_proxy', return_value=None)
+    def test_failed_proxy_of_small_video_uses_the_original(self, mock_proxy, mock_compress, mock_poller,
+                                                          mock_settings):
+        self.analyze(mock_poller, 100)
+        mock_compress.assert_not_called()
+        self.service.file_pool.acquire.assert_called_once_with('/tmp/video.mp4', 'abc:original')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import tempfile
+import time
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.analysis_cache import AnalysisCache
+
+ANALYSIS = {
+    "title": "Test Video",
+    "description": "A test video description.",
+    "thumbnail_prompt": "A test prompt"
+}
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_changes_with_prompt_and_model(self):
+        base = AnalysisCache.key('abc', 'prompt', 'model')
+        self.assertEqual(base, AnalysisCache.key('abc', 'prompt', 'model'))
+        self.assertNotEqual(base, AnalysisCache.key('abc', 'prompt v2', 'model'))
+        self.assertNotEqual(base, AnalysisCache.key('abc', 'prompt', 'other-model'))
+        self.assertNotEqual(base, AnalysisCache.key('def', 'prompt', 'model'))
+
+    def test_round_trip_and_lru_eviction(self):
+        cache = AnalysisCache(self.tmp.name, max_entries=2)
+        cache.put('a', dict(ANALYSIS, extra='not cached'))
+        cache.put('b', ANALYSIS)
+        self.assertEqual(cache.get('a'), ANALYSIS)
+
+        # 'b' is now the least recently used entry
+        past = time.time() - 60
+        os.utime(os.path.join(self.tmp.name, 'b.json'), (past, past))
+        cache.put('c', ANALYSIS)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_purge_older_than(self):
+        cache = AnalysisCache(self.tmp.name)
+        cache.put('old', ANALYSIS)
+        cache.put('new', ANALYSIS)
+        past = time.time() - 10 * 86400
+        os.utime(os.path.join(self.tmp.name, 'old.json'), (past, past))
+
+        self.assertEqual(cache.purge(older_than_days=7), 1)
+        self.assertEqual([key for key, _, _, _ in cache.entries()], ['new'])
+        self.assertEqual(cache.purge(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import datetime
+import threading
+import tempfile
+import json
+import time
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.credentials import CredentialManager
+
+class FakeCredentials:
+    def __init__(self, expires_in, refresh_token='refresh'):
+        self.expiry = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + \
+            datetime.timedelta(seconds=expires_in)
+        self.refresh_token = refresh_token
+        self.refreshes = 0
+
+    @property
+    def valid(self):
+        return self.expiry > datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+    @property
+    def expired(self):
+        return not self.valid
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.expiry = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + \
+            datetime.timedelta(hours=1)
+
+    def to_json(self):
+        return json.dumps({'refreshes': self.refreshes})
+
+class TestCredentialManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.temp_dir.name, 'token.json')
+        with open(self.token_file, 'w') as f:
+            f.write('{}')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_token_is_loaded_once_and_refreshed_in_the_background(self):
+        creds = FakeCredentials(expires_in=-10)
+        manager = CredentialManager(scopes=['scope'], refresh_margin=0)
+        with patch('services.credentials.Credentials') as mock_credentials:
+            mock_credentials.from_authorized_user_file.return_value = creds
+            self.assertIs(manager.credentials(self.token_file), creds)
+            self.assertIs(manager.credentials(self.token_file), creds)
+        self.assertEqual(mock_credentials.from_authorized_user_file.call_count, 1)
+        self.assertEqual(creds.refreshes, 1)
+        with open(self.token_file) as f:
+            self.assertEqual(json.load(f), {'refreshes': 1})
+        self.assertFalse(os.path.exists(self.token_file + '.tmp'))
+
+        # A token about to expire is refreshed ahead of time without any API call
+        manager.refresh_margin = 3600 - 1
+        with manager._cond:
+            manager._cond.notify()
+        deadline = time.monotonic() + 5
+        while creds.refreshes < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(creds.refreshes, 2)
+
+    def test_clients_are_built_once_per_thread_from_one_discovery_document(self):
+        manager = CredentialManager(scopes=['scope'])
+        manager._creds[self.token_file] = FakeCredentials(expires_in=3600)
+
+        built = MagicMock(_rootDesc={'name': 'drive'})
+        with patch('googleapiclient.discovery.build', return_value=built) as mock_build, \
+             patch('googleapiclient.discovery.build_from_document',
+                   side_effect=lambda doc, http: MagicMock(doc=doc)) as mock_from_document:
+            client = manager.client('drive', 'v3', self.token_file)
+            client.files()
+            client.files()
+
+            other = []
+            thread = threading.Thread(target=lambda: other.append(manager.thread_client('drive', 'v3',
+                                                                                     self.token_file)))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(mock_build.call_count, 1)
+        self.assertEqual(built.files.call_count, 2)
+        mock_from_document.assert_called_once()
+        self.assertEqual(other[0].doc, {'name': 'drive'})
+        self.assertIsNot(other[0], built)
+
+if __name__ == '__main__':
+    unittest.main()
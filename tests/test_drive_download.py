@@ -0,0 +1,93 @@
+import unittest
+import tempfile
+import hashlib
+import threading
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.drive_download import ParallelDownloader, DownloadError, RangeNotSupported
+
+class _Response:
+    def __init__(self, status):
+        self.status = status
+
+class FakeHttp:
+    """Serves byte ranges of a blob, optionally failing after some requests."""
+
+    def __init__(self, data, fail_after=None, ignore_range=False):
+        self.data = data
+        self.fail_after = fail_after
+        self.ignore_range = ignore_range
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def request(self, uri, method, headers=None):
+        with self.lock:
+            self.requests.append(headers['Range'])
+            if self.fail_after is not None and len(self.requests) > self.fail_after:
+                raise ConnectionError("connection reset")
+        if self.ignore_range:
+            return _Response(200), self.data
+        start, end = headers['Range'][len('bytes='):].split('-')
+        return _Response(206), self.data[int(start):int(end) + 1]
+
+class TestParallelDownloader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, 'video.mp4')
+        self.data = os.urandom(10 * 1024 + 17)
+        self.md5 = hashlib.md5(self.data).hexdigest()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_downloader(self, http, md5=None, connections=3):
+        return ParallelDownloader('https://example/file', lambda: http, len(self.data),
+                                  md5_checksum=md5 or self.md5, file_id='abc',
+                                  chunk_size=1024, connections=connections, chunk_retries=0)
+
+    def test_download_reassembles_ranges(self):
+        http = FakeHttp(self.data)
+        self.make_downloader(http).download(self.output)
+        with open(self.output, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(len(http.requests), 11)
+        self.assertFalse(os.path.exists(self.output + '.part'))
+        self.assertFalse(os.path.exists(self.output + '.part.json'))
+
+    def test_interrupted_download_resumes_missing_chunks(self):
+        with self.assertRaises(ConnectionError):
+            self.make_downloader(FakeHttp(self.data, fail_after=4), connections=1).download(self.output)
+        self.assertTrue(os.path.exists(self.output + '.part'))
+
+        http = FakeHttp(self.data)
+        self.make_downloader(http).download(self.output)
+        self.assertEqual(len(http.requests), 7)
+        with open(self.output, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_server_ignoring_ranges_stops_after_one_request(self):
+        http = FakeHttp(self.data, ignore_range=True)
+        with self.assertRaises(RangeNotSupported):
+            self.make_downloader(http).download(self.output)
+        self.assertEqual(len(http.requests), 1)
+        self.assertFalse(os.path.exists(self.output + '.part'))
+        self.assertFalse(os.path.exists(self.output + '.part.json'))
+
+    def test_failed_chunk_cancels_the_rest(self):
+        http = FakeHttp(self.data, fail_after=2)
+        with self.assertRaises(ConnectionError):
+            self.make_downloader(http, connections=1).download(self.output)
+        self.assertEqual(len(http.requests), 3)
+
+    def test_checksum_mismatch_is_rejected(self):
+        with self.assertRaises(DownloadError):
+            self.make_downloader(FakeHttp(self.data), md5='0' * 32).download(self.output)
+        self.assertFalse(os.path.exists(self.output))
+        self.assertFalse(os.path.exists(self.output + '.part'))
+
+if __name__ == '__main__':
+    unittest.main()
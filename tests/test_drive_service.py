@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.drive_service import DriveService, FOLDER_MIME_TYPE
+from services.drive_download import RangeNotSupported
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self, http=None):
+        return self.result
+
+class FakeFiles:
+    def __init__(self, folders, page_size):
+        self.folders = folders
+        self.page_size = page_size
+        self.queries = []
+
+    def list(self, q, pageToken=None, **kwargs):
+        self.queries.append(q)
+        folder_id = q.split("'")[1]
+        items = [item for item in self.folders.get(folder_id, [])
+                 if item['mimeType'].startswith('video/') or
+                 (item['mimeType'] == FOLDER_MIME_TYPE and FOLDER_MIME_TYPE in q)]
+        start = int(pageToken or 0)
+        result = {'files': items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            result['nextPageToken'] = str(start + self.page_size)
+        return _Request(result)
+
+class FakeDrive:
+    def __init__(self, folders, page_size=10):
+        self._files = FakeFiles(folders, page_size)
+
+    def files(self):
+        return self._files
+
+def make_drive_service(folders, page_size=10):
+    drive_service = DriveService.__new__(DriveService)
+    drive_service.service = FakeDrive(folders, page_size)
+    return drive_service
+
+def video(file_id):
+    return {'id': file_id, 'name': f'{file_id}.mp4', 'mimeType': 'video/mp4'}
+
+class TestScanFolder(unittest.TestCase):
+    def test_scan_follows_every_page(self):
+        folders = {'root': [video(f'v{i}') for i in range(25)]}
+        drive_service = make_drive_service(folders, page_size=10)
+        with patch.object(DriveService, '_thread_http', return_value=None):
+            files = list(drive_service.scan_folder('root'))
+        self.assertEqual(len(files), 25)
+        self.assertIn("mimeType contains 'video/'", drive_service.service.files().queries[0])
+
+    def test_recursive_scan_descends_into_subfolders(self):
+        folders = {
+            'root': [video('a'), {'id': 'sub', 'name': 'sub', 'mimeType': FOLDER_MIME_TYPE}],
+            'sub': [video('b'), {'id': 'deeper', 'name': 'deeper', 'mimeType': FOLDER_MIME_TYPE}],
+            'deeper': [video('c')],
+        }
+        drive_service = make_drive_service(folders)
+        with patch.object(DriveService, '_thread_http', return_value=None):
+            files = list(drive_service.scan_folder('root', recursive=True, max_workers=2))
+        self.assertEqual(sorted(f['id'] for f in files), ['a', 'b', 'c'])
+
+class TestDownloadFile(unittest.TestCase):
+    def test_falls_back_to_single_download_when_ranges_are_ignored(self):
+        drive_service = make_drive_service({})
+        drive_service.service = MagicMock()
+        drive_service.credentials = MagicMock()
+        with patch('services.drive_service.ParallelDownloader') as mock_downloader, \
+             patch.object(DriveService, '_download_single', return_value='video.mp4') as mock_single:
+            mock_downloader.return_value.download.side_effect = RangeNotSupported("ignored")
+            result = drive_service.download_file('abc', 'video.mp4', size=100, md5_checksum='x')
+        self.assertEqual(result, 'video.mp4')
+        mock_single.assert_called_once_with('abc', 'video.mp4')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.drive_watcher import DriveChangeWatcher
+from services.drive_service import FOLDER_MIME_TYPE
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+class FakeChanges:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return _Request({'startPageToken': str(len(self.drive.log))})
+
+    def list(self, pageToken, pageSize=100, **kwargs):
+        start = int(pageToken)
+        end = min(start + pageSize, len(self.drive.log))
+        self.drive.list_calls += 1
+        result = {'changes': self.drive.log[start:end]}
+        if end < len(self.drive.log):
+            result['nextPageToken'] = str(end)
+        else:
+            result['newStartPageToken'] = str(end)
+        return _Request(result)
+
+class FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q, **kwargs):
+        parent = q.split("'")[1]
+        self.drive.folder_listings += 1
+        return _Request({'files': [f for f in self.drive.items.values()
+                                   if parent in f['parents'] and not f['trashed']]})
+
+class FakeDriveService:
+    """In-memory stand-in for the Drive v3 changes() and files() resources."""
+
+    def __init__(self):
+        self.log = []
+        self.items = {}
+        self.list_calls = 0
+        self.folder_listings = 0
+
+    def changes(self):
+        return FakeChanges(self)
+
+    def files(self):
+        return FakeFiles(self)
+
+    def add_file(self, file_id, name, parent, mime_type='video/mp4', md5='abc', trashed=False, log=True):
+        file = {
+            'id': file_id, 'name': name, 'mimeType': mime_type, 'md5Checksum': md5,
+            'parents': [parent], 'trashed': trashed
+        }
+        self.items[file_id] = file
+        if log:
+            self.log.append({'fileId': file_id, 'removed': False, 'file': dict(file)})
+
+    def add_folder(self, folder_id, parent, log=True):
+        self.add_file(folder_id, folder_id, parent, mime_type=FOLDER_MIME_TYPE, log=log)
+
+class TestDriveChangeWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.token_file = os.path.join(self.tmp.name, 'token.json')
+        self.drive = FakeDriveService()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_watcher(self, initial=None, recursive=False):
+        return DriveChangeWatcher(self.drive, 'folder', self.token_file,
+                                  initial_scan=lambda: list(initial or []),
+                                  min_interval=1, max_interval=8, recursive=recursive)
+
+    def test_emits_only_new_videos_in_folder(self):
+        self.drive.add_file('old', 'old.mp4', 'folder')
+        watcher = self.make_watcher(initial=[{'id': 'old', 'name': 'old.mp4'}])
+        self.assertEqual([f['id'] for f in watcher.poll()], ['old'])
+
+        self.drive.add_file('new', 'new.mp4', 'folder')
+        self.drive.add_file('other', 'other.mp4', 'elsewhere')
+        self.drive.add_file('doc', 'notes.txt', 'folder', mime_type='text/plain')
+        self.drive.add_file('trash', 'trash.mp4', 'folder', trashed=True)
+        self.drive.add_file('new', 'new.mp4', 'folder', md5='def')
+
+        files = watcher.poll()
+        self.assertEqual([f['id'] for f in files], ['new'])
+        self.assertEqual(files[0]['md5Checksum'], 'def')
+        self.assertEqual(watcher.poll(), [])
+
+    def test_recursive_watcher_follows_subfolders(self):
+        self.drive.add_folder('sub', 'folder', log=False)
+        self.drive.add_folder('deeper', 'sub', log=False)
+        self.drive.add_folder('outside', 'root', log=False)
+        self.drive.add_file('moved', 'moved.mp4', 'outside', log=False)
+        watcher = self.make_watcher(recursive=True)
+        watcher.poll()
+
+        self.drive.add_file('a', 'a.mp4', 'deeper')
+        self.drive.add_file('b', 'b.mp4', 'elsewhere')
+        self.assertEqual([f['id'] for f in watcher.poll()], ['a'])
+        listings = self.drive.folder_listings
+
+        # A folder moved into the tree brings the videos already in it
+        self.drive.add_folder('outside', 'sub')
+        self.drive.add_folder('new', 'folder')
+        self.drive.add_file('c', 'c.mp4', 'new')
+        self.assertEqual(sorted(f['id'] for f in watcher.poll()), ['c', 'moved'])
+
+        # Moving a folder out stops watching it and its subfolders
+        self.drive.add_folder('sub', 'root')
+        watcher.poll()
+        self.drive.add_file('d', 'd.mp4', 'deeper')
+        self.drive.add_file('e', 'e.mp4', 'new')
+        self.assertEqual([f['id'] for f in watcher.poll()], ['e'])
+        self.assertGreater(self.drive.folder_listings, listings)
+
+    def test_non_recursive_watcher_ignores_subfolders(self):
+        self.drive.add_folder('sub', 'folder', log=False)
+        watcher = self.make_watcher()
+        watcher.poll()
+        self.drive.add_file('a', 'a.mp4', 'sub')
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(self.drive.folder_listings, 0)
+
+    def test_page_token_persists_across_restarts(self):
+        watcher = self.make_watcher()
+        watcher.poll()
+        self.drive.add_file('a', 'a.mp4', 'folder')
+        self.assertEqual(len(watcher.poll()), 1)
+
+        self.drive.add_file('b', 'b.mp4', 'folder')
+        restarted = self.make_watcher()
+        restarted.poll()  # initial scan
+        self.assertEqual([f['id'] for f in restarted.poll()], ['b'])
+
+    def test_interval_backs_off_when_idle_and_resets_on_activity(self):
+        watcher = self.make_watcher()
+        watcher.poll()
+        intervals = []
+        for _ in range(5):
+            watcher.poll()
+            intervals.append(watcher.interval)
+        self.assertEqual(intervals, [4, 8, 8, 8, 8])
+
+        self.drive.add_file('a', 'a.mp4', 'folder')
+        watcher.poll()
+        self.assertEqual(watcher.interval, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import patch
+import subprocess
+import tempfile
+import shutil
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.frame_sampler import sample_frames, extract_audio, pick_scene_frames
+
+def scores_file(candidates):
+    lines = []
+    for i, (time, score) in enumerate(candidates):
+        lines += [f"frame:{i}    pts:{int(time * 1000)}  pts_time:{time}", f"lavfi.scene_score={score}"]
+    return '\n'.join(lines) + '\n'
+
+class FakeFFmpeg:
+    """Writes what each ffmpeg command would: the scene score log, a frame, or numbered frames."""
+
+    def __init__(self, candidates=(), uniform_frames=0):
+        self.candidates = candidates
+        self.uniform_frames = uniform_frames
+        self.commands = []
+
+    def __call__(self, cmd, timeout=None, **kwargs):
+        self.commands.append(cmd)
+        video_filter = cmd[cmd.index('-vf') + 1]
+        if 'metadata=print' in video_filter:
+            path = video_filter.split('file=', 1)[1].strip("'").replace('\\:', ':')
+            with open(path, 'w') as f:
+                f.write(scores_file(self.candidates))
+        elif cmd[-1].endswith('%03d.jpg'):
+            for i in range(self.uniform_frames):
+                open(cmd[-1] % (i + 1), 'wb').close()
+        else:
+            open(cmd[-1], 'wb').close()
+
+@patch('utils.media_tools.ffmpeg_path', return_value='ffmpeg')
+class TestSampleFrames(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.frames_dir = os.path.join(self.tmp, 'frames')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_pick_scene_frames_takes_the_strongest_change_per_window(self, mock_path):
+        candidates = [(5, 0.4), (10, 0.9), (20, 0.5), (300, 0.6), (600, 0.35), (990, 0.7), (1000, 0.8)]
+        self.assertEqual(pick_scene_frames(candidates, 1000, 4), [10, 300, 600, 1000])
+        self.assertEqual(pick_scene_frames([], 1000, 4), [])
+
+    def test_scene_frames_cover_the_whole_video(self, mock_path):
+        # Most scene changes are in the opening minutes
+        candidates = [(t, 0.5) for t in range(1, 120, 3)] + [(1900.0, 0.4), (3300.0, 0.6), (5000.0, 0.9)]
+        ffmpeg = FakeFFmpeg(candidates)
+        with patch('utils.media_tools.run_ffmpeg', side_effect=ffmpeg):
+            frames = sample_frames('in.mp4', self.frames_dir, count=4, duration=6000.0)
+
+        seeks = [float(cmd[cmd.index('-ss') + 1]) for cmd in ffmpeg.commands[1:]]
+        self.assertEqual(seeks, [1.0, 1900.0, 3300.0, 5000.0])
+        self.assertEqual([os.path.basename(f) for f in frames],
+                         ['scene_001.jpg', 'scene_002.jpg', 'scene_003.jpg', 'scene_004.jpg'])
+        self.assertFalse(os.path.exists(os.path.join(self.frames_dir, 'scene_scores.txt')))
+        # One decode for scene detection, then one fast seek per frame
+        self.assertEqual(ffmpeg.commands[0][-3:], ['-f', 'null', '-'])
+        self.assertEqual(len(ffmpeg.commands), 5)
+
+    def test_too_few_scene_changes_falls_back_to_uniform(self, mock_path):
+        ffmpeg = FakeFFmpeg([(10.0, 0.5)], uniform_frames=8)
+        with patch('utils.media_tools.run_ffmpeg', side_effect=ffmpeg):
+            frames = sample_frames('in.mp4', self.frames_dir, count=8, duration=800.0, width=320)
+
+        self.assertEqual(len(frames), 8)
+        uniform = ffmpeg.commands[-1]
+        self.assertEqual(uniform[uniform.index('-vf') + 1], "fps=0.010000:start_time=50.000,scale=320:-2")
+        self.assertEqual(uniform[uniform.index('-frames:v') + 1], '8')
+
+    def test_extract_audio_is_mono_and_missing_audio_returns_none(self, mock_path):
+        with patch('utils.media_tools.run_ffmpeg') as mock_run:
+            self.assertEqual(extract_audio('in.mp4', 'out.aac', bitrate_k=24), 'out.aac')
+        cmd = mock_run.call_args.args[0]
+        self.assertEqual(cmd[cmd.index('-ac') + 1], '1')
+        self.assertEqual(cmd[cmd.index('-b:a') + 1], '24k')
+        self.assertEqual(cmd[cmd.index('-map') + 1], '0:a:0')
+
+        with patch('utils.media_tools.run_ffmpeg', side_effect=subprocess.CalledProcessError(1, ['ffmpeg'])):
+            self.assertIsNone(extract_audio('silent.mp4', 'out.aac'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import MagicMock
+import tempfile
+import json
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.gemini_files import GeminiFilePool, shared_file_pool
+
+class FakeGemini:
+    """Minimal stand-in for the google.generativeai Files API."""
+
+    def __init__(self):
+        self.files = {}
+        self.uploads = 0
+
+    def _file(self, name):
+        video_file = MagicMock()
+        video_file.name = name
+        video_file.state.name = self.files[name]
+        return video_file
+
+    def upload_file(self, path):
+        self.uploads += 1
+        name = f"files/{self.uploads}"
+        self.files[name] = "ACTIVE"
+        return self._file(name)
+
+    def get_file(self, name):
+        if name not in self.files:
+            raise Exception("404 not found")
+        return self._file(name)
+
+    def delete_file(self, name):
+        self.files.pop(name, None)
+
+class TestGeminiFilePool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = os.path.join(self.tmp.name, 'pool.json')
+        self.video = os.path.join(self.tmp.name, 'video.mp4')
+        with open(self.video, 'wb') as f:
+            f.write(b'0' * 100)
+        self.client = FakeGemini()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_pool(self, **kwargs):
+        return GeminiFilePool(self.registry, client=self.client, **kwargs)
+
+    def test_retry_reuses_upload_until_released(self):
+        pool = self.make_pool()
+        first = pool.acquire(self.video, 'abc:original')
+        pool.release('abc:original', delete=False)
+
+        # A new process picks the upload up from the registry
+        pool = self.make_pool()
+        second = pool.acquire(self.video, 'abc:original')
+        self.assertEqual(first.name, second.name)
+        self.assertEqual(self.client.uploads, 1)
+
+        pool.release('abc:original')
+        self.assertEqual(self.client.files, {})
+        self.assertIsNone(pool.lookup('abc:original'))
+
+    def test_expired_files_are_uploaded_again(self):
+        pool = self.make_pool(ttl_seconds=0)
+        pool.acquire(self.video, 'abc:original')
+        pool.release('abc:original', delete=False)
+        pool.acquire(self.video, 'abc:original')
+        self.assertEqual(self.client.uploads, 2)
+
+    def test_idle_files_are_deleted_under_storage_pressure(self):
+        pool = self.make_pool(max_bytes=150)
+        old = pool.acquire(self.video, 'old:original')
+        pool.release('old:original', delete=False)
+        pool.acquire(self.video, 'new:original')
+        self.assertNotIn(old.name, self.client.files)
+        self.assertEqual(len(self.client.files), 1)
+
+    def test_services_share_one_pool_per_registry(self):
+        a = shared_file_pool(self.registry, client=self.client)
+        b = shared_file_pool(os.path.relpath(self.registry), client=self.client)
+        self.assertIs(a, b)
+
+        a.acquire(self.video, 'k1:original')
+        b.acquire(self.video, 'k2:original')
+        with open(self.registry) as f:
+            self.assertEqual(sorted(json.load(f)), ['k1:original', 'k2:original'])
+
+if __name__ == '__main__':
+    unittest.main()
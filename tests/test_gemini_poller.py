@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import MagicMock
+import threading
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.gemini_poller import GeminiPoller
+
+def make_file(name, state):
+    video_file = MagicMock()
+    video_file.name = name
+    video_file.state.name = state
+    return video_file
+
+class FakeGemini:
+    """Reports each file as PROCESSING for a set number of checks."""
+
+    def __init__(self, checks_until_done, final_state="ACTIVE"):
+        self.remaining = dict(checks_until_done)
+        self.final_state = final_state
+        self.lock = threading.Lock()
+        self.threads = set()
+
+    def get_file(self, name):
+        with self.lock:
+            self.threads.add(threading.get_ident())
+            self.remaining[name] -= 1
+            state = "PROCESSING" if self.remaining[name] > 0 else self.final_state
+        return make_file(name, state)
+
+class TestGeminiPoller(unittest.TestCase):
+    def test_many_files_resolve_on_one_thread(self):
+        client = FakeGemini({f"files/{i}": i % 3 + 1 for i in range(20)})
+        poller = GeminiPoller(client=client, initial_interval=0.01, max_interval=0.05)
+        done = []
+        futures = [poller.watch(make_file(f"files/{i}", "PROCESSING"), callback=done.append)
+                   for i in range(20)]
+
+        for future in futures:
+            self.assertEqual(future.result(timeout=5).state.name, "ACTIVE")
+        self.assertEqual(len(done), 20)
+        self.assertEqual(len(client.threads), 1)
+
+    def test_failed_state_is_returned(self):
+        client = FakeGemini({"files/x": 2}, final_state="FAILED")
+        poller = GeminiPoller(client=client, initial_interval=0.01)
+        result = poller.wait(make_file("files/x", "PROCESSING"))
+        self.assertEqual(result.state.name, "FAILED")
+
+    def test_timeout(self):
+        client = FakeGemini({"files/slow": 10 ** 6})
+        poller = GeminiPoller(client=client, initial_interval=0.01, max_interval=0.01, timeout=0.05)
+        with self.assertRaises(Exception):
+            poller.wait(make_file("files/slow", "PROCESSING"))
+
+    def test_already_active_file_resolves_immediately(self):
+        poller = GeminiPoller(client=FakeGemini({}))
+        video_file = make_file("files/ready", "ACTIVE")
+        self.assertIs(poller.wait(video_file), video_file)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import job_ledger
+from utils.job_ledger import JobLedger
+
+class TestJobLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'jobs.db')
+        self.file = {'id': '123', 'name': 'test_video.mp4', 'md5Checksum': 'abc'}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_done_files_are_skipped_after_restart(self):
+        ledger = JobLedger(self.db_path)
+        self.assertTrue(ledger.should_process(self.file))
+        ledger.mark(self.file, job_ledger.DONE)
+        self.assertFalse(ledger.should_process(self.file))
+        ledger.close()
+
+        ledger = JobLedger(self.db_path)
+        self.assertEqual(ledger.get_state(self.file), job_ledger.DONE)
+        self.assertFalse(ledger.should_process(self.file))
+
+        # Same file ID with new content is a new job
+        changed = dict(self.file, md5Checksum='def')
+        self.assertTrue(ledger.should_process(changed))
+        ledger.close()
+
+    def test_failed_files_give_up_after_max_attempts(self):
+        ledger = JobLedger(self.db_path, max_attempts=2)
+        ledger.mark(self.file, job_ledger.FAILED, error='boom')
+        self.assertTrue(ledger.should_process(self.file))
+        ledger.mark(self.file, job_ledger.DOWNLOADING)
+        ledger.mark(self.file, job_ledger.FAILED, error='boom')
+        self.assertFalse(ledger.should_process(self.file))
+        ledger.close()
+
+    def test_checkpoint_survives_restart(self):
+        ledger = JobLedger(self.db_path)
+        ledger.mark(self.file, job_ledger.UPLOADED)
+        ledger.save_checkpoint(self.file, {'video_ids': {'primary': 'VIDEO_ID_123'}})
+        ledger.close()
+
+        ledger = JobLedger(self.db_path)
+        self.assertEqual(ledger.load_checkpoint(self.file), {'video_ids': {'primary': 'VIDEO_ID_123'}})
+        self.assertEqual(ledger.get_state(self.file), job_ledger.UPLOADED)
+        self.assertIsNone(ledger.load_checkpoint(dict(self.file, id='456')))
+        ledger.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.media_plan import plan_media
+
+MB = 1024 * 1024
+
+class TestMediaPlan(unittest.TestCase):
+    def test_large_video_needs_proxy(self):
+        file = {'size': str(2000 * MB), 'videoMediaMetadata': {
+            'durationMillis': '3600000', 'width': 3840, 'height': 2160}}
+        plan = plan_media(file)
+        self.assertTrue(plan['needs_proxy'])
+        self.assertEqual(plan['duration'], 3600)
+        self.assertEqual(plan['reserve_bytes'], 2450 * MB)
+
+    def test_small_video_without_metadata(self):
+        plan = plan_media({'size': str(100 * MB)})
+        self.assertFalse(plan['needs_proxy'])
+        self.assertIsNone(plan['duration'])
+        self.assertEqual(plan['reserve_bytes'], 100 * MB)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import stat
+import tempfile
+import threading
+import subprocess
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import media_tools
+
+PROBE_OUTPUT = json.dumps({'format': {'duration': '12.5'}, 'streams': [{'codec_type': 'video'}]})
+PACKETS_OUTPUT = json.dumps({'packets': [
+    {'pts_time': '0.000000', 'flags': 'K__'},
+    {'pts_time': '0.033000', 'flags': '___'},
+    {'pts_time': '2.000000', 'flags': 'K__'},
+]})
+
+class TestMediaTools(unittest.TestCase):
+    def setUp(self):
+        media_tools._paths.clear()
+        media_tools.clear_cache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video = os.path.join(self.tmp.name, 'video.mp4')
+        with open(self.video, 'wb') as f:
+            f.write(b'video')
+
+    def tearDown(self):
+        media_tools._paths.clear()
+        media_tools.clear_cache()
+        self.tmp.cleanup()
+
+    def test_find_tool_prefers_config_then_env_then_path(self):
+        configured = os.path.join(self.tmp.name, 'ffmpeg-configured')
+        from_env = os.path.join(self.tmp.name, 'ffmpeg-env')
+        for path in (configured, from_env):
+            open(path, 'w').close()
+
+        with patch.object(media_tools.Config, 'FFMPEG_PATH', configured, create=True), \
+             patch.dict(os.environ, {'FFMPEG_PATH': from_env}):
+            self.assertEqual(media_tools.find_tool('ffmpeg'), configured)
+
+        media_tools._paths.clear()
+        with patch.object(media_tools.Config, 'FFMPEG_PATH', '', create=True), \
+             patch.dict(os.environ, {'FFMPEG_PATH': from_env}):
+            self.assertEqual(media_tools.find_tool('ffmpeg'), from_env)
+
+        media_tools._paths.clear()
+        with patch.object(media_tools.Config, 'FFMPEG_PATH', '', create=True), \
+             patch.dict(os.environ, {}, clear=True), \
+             patch('utils.media_tools.shutil.which', return_value=None):
+            with self.assertRaises(media_tools.MediaToolError):
+                media_tools.find_tool('ffmpeg')
+
+    @patch('utils.media_tools.find_tool', return_value='ffprobe')
+    @patch('utils.media_tools.subprocess.run')
+    def test_probe_runs_ffprobe_once_per_file_version(self, mock_run, mock_find):
+        mock_run.side_effect = lambda cmd, **kwargs: MagicMock(
+            stdout=PACKETS_OUTPUT if 'packet=pts_time,flags' in cmd else PROBE_OUTPUT)
+
+        self.assertEqual(media_tools.duration(self.video), 12.5)
+        media_tools.probe(self.video)
+        self.assertEqual(mock_run.call_count, 1)
+
+        # Keyframes are fetched on first request and kept with the probe
+        self.assertEqual(media_tools.probe(self.video, keyframes=True)['keyframes'], [0.0, 2.0])
+        media_tools.probe(self.video, keyframes=True)
+        self.assertEqual(mock_run.call_count, 2)
+
+        # A changed file is probed again
+        with open(self.video, 'ab') as f:
+            f.write(b' more')
+        media_tools.probe(self.video)
+        self.assertEqual(mock_run.call_count, 3)
+
+FAKE_FFMPEG = """#!/bin/sh
+# Reports progress like ffmpeg -progress pipe:1, then exits with $EXIT_CODE
+i=0
+while [ $i -lt "$REPORTS" ]; do
+  echo "frame=$((i * 10))"
+  echo "fps=25.0"
+  echo "out_time_us=$((i * 400000))"
+  echo "speed=1.5x"
+  echo "progress=continue"
+  i=$((i + 1))
+  sleep 0.05
+done
+echo "frame=$((i * 10))"
+echo "progress=end"
+echo "last line of the log" >&2
+if [ "$HANG" != 0 ]; then exec sleep "$HANG"; fi
+exit "$EXIT_CODE"
+"""
+
+class TestRunFFmpeg(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ffmpeg = os.path.join(self.tmp.name, 'ffmpeg')
+        with open(self.ffmpeg, 'w') as f:
+            f.write(FAKE_FFMPEG)
+        os.chmod(self.ffmpeg, os.stat(self.ffmpeg).st_mode | stat.S_IEXEC)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_fake(self, reports=3, hang=0, exit_code=0, **kwargs):
+        env = {'REPORTS': str(reports), 'HANG': str(hang), 'EXIT_CODE': str(exit_code)}
+        with patch.dict(os.environ, env):
+            media_tools.run_ffmpeg([self.ffmpeg, '-i', 'in.mp4', 'out.mp4'], **kwargs)
+
+    def test_progress_is_streamed_to_callback(self):
+        reports = []
+        self.run_fake(reports=3, progress=reports.append)
+
+        self.assertEqual([r['frame'] for r in reports], [0, 10, 20, 30])
+        self.assertEqual(reports[2]['out_time'], 0.8)
+        self.assertEqual(reports[2]['speed'], 1.5)
+        self.assertEqual(reports[2]['output'], 'out.mp4')
+        self.assertTrue(reports[-1]['done'])
+
+    def test_failure_keeps_log_tail(self):
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            self.run_fake(exit_code=1)
+        self.assertIn(b'last line of the log', ctx.exception.stderr)
+
+    def test_stalled_run_is_killed(self):
+        with self.assertRaises(media_tools.FFmpegStalled):
+            self.run_fake(hang=30, stall_timeout=1)
+
+    def test_cancel_event_stops_run(self):
+        cancel = threading.Event()
+        threading.Timer(0.5, cancel.set).start()
+        with self.assertRaises(media_tools.FFmpegCancelled):
+            self.run_fake(hang=30, stall_timeout=0, cancel_event=cancel)
+
+if __name__ == '__main__':
+    unittest.main()
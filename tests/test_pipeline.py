@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import threading
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline import Pipeline, Services
+
+class TestPipeline(unittest.TestCase):
+    def make_services(self):
+        services = Services(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        services.ai.analyze_video.return_value = {
+            "title": "Test Video",
+            "description": "A test video description.",
+            "thumbnail_prompt": "A test prompt"
+        }
+        services.youtube.upload_video.return_value = 'VIDEO_ID_123'
+        return services
+
+    def test_all_files_go_through_every_stage(self):
+        created = []
+        lock = threading.Lock()
+
+        def factory():
+            services = self.make_services()
+            with lock:
+                created.append(services)
+            return services
+
+        files = [{'id': str(i), 'name': f'video_{i}.mp4'} for i in range(5)]
+        workers = {'download': 2, 'analyze': 2, 'thumbnail': 1, 'upload': 3, 'log': 1}
+
+        with patch('os.remove'):
+            pipeline = Pipeline(factory, workers=workers, queue_size=1).start()
+            for file in files:
+                self.assertTrue(pipeline.submit(file))
+            pipeline.shutdown()
+
+        # One set of clients per worker thread
+        self.assertEqual(len(created), sum(workers.values()))
+        logged = sum(s.sheets.log_run.call_count for s in created)
+        uploaded = sum(s.youtube.upload_video.call_count for s in created)
+        self.assertEqual(logged, len(files))
+        self.assertEqual(uploaded, len(files))
+        self.assertFalse(pipeline.is_busy())
+
+    def test_duplicate_submissions_are_ignored(self):
+        pipeline = Pipeline(self.make_services, queue_size=5)
+        file = {'id': '1', 'name': 'video.mp4'}
+        self.assertTrue(pipeline.submit(file))
+        self.assertFalse(pipeline.submit(file))
+
+if __name__ == '__main__':
+    unittest.main()
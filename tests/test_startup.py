@@ -0,0 +1,35 @@
+import unittest
+import subprocess
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import benchmark_startup
+
+REQUIRED = ('config', 'googleapiclient', 'google_auth_httplib2', 'google_auth_oauthlib', 'google.generativeai')
+
+def dependencies_installed():
+    """Checked in a fresh interpreter, since other tests may stub these modules."""
+    code = ("import importlib.util, sys; "
+            f"sys.exit(0 if all(importlib.util.find_spec(m) for m in {REQUIRED!r}) else 1)")
+    try:
+        subprocess.run([sys.executable, '-c', code], cwd=benchmark_startup.ROOT, check=True, capture_output=True)
+    except subprocess.CalledProcessError:
+        return False
+    return True
+
+@unittest.skipUnless(dependencies_installed(), "needs the Google client libraries and config.py")
+class TestStartup(unittest.TestCase):
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        times = benchmark_startup.import_times('main')
+        self.assertIn('services.credentials', times)
+        self.assertEqual(benchmark_startup.lazy_modules_imported(times), [])
+
+    def test_import_is_within_budget(self):
+        seconds = benchmark_startup.startup_seconds('import main', runs=3)
+        self.assertLess(seconds, benchmark_startup.DEFAULT_BUDGET_SECONDS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import datetime
+import tempfile
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.upload_scheduler import UploadScheduler, UPLOAD_COST
+
+UTC = datetime.timezone.utc
+# 23:00 Pacific (PDT) on June 1st, and 01:00 the next day
+LATE = datetime.datetime(2026, 6, 2, 6, 0, tzinfo=UTC)
+NEXT_DAY = datetime.datetime(2026, 6, 2, 8, 0, tzinfo=UTC)
+
+def video(file_id, size=100, created='2026-06-01T00:00:00Z', name=None):
+    return {'id': file_id, 'md5Checksum': f'md5-{file_id}', 'size': str(size),
+            'createdTime': created, 'name': name or f'{file_id}.mp4'}
+
+class TestUploadScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'quota.db')
+        self.scheduler = UploadScheduler(self.db_path, ['primary', 'secondary'],
+                                         daily_limit=UPLOAD_COST * 2, priorities={'urgent': 10})
+
+    def tearDown(self):
+        self.scheduler.close()
+        self.tmp.cleanup()
+
+    def test_window_resets_at_pacific_midnight(self):
+        self.assertEqual(UploadScheduler.window(LATE), '2026-06-01')
+        self.assertEqual(UploadScheduler.window(NEXT_DAY), '2026-06-02')
+        self.assertEqual(UploadScheduler.seconds_until_reset(LATE), 3600)
+
+    def test_files_over_budget_wait_for_next_window(self):
+        files = [
+            video('big', size=900),
+            video('old', size=500, created='2026-01-01T00:00:00Z'),
+            video('new', size=500, created='2026-05-01T00:00:00Z'),
+            video('urgent', size=5000, name='URGENT interview.mp4'),
+        ]
+        ready, deferred = self.scheduler.schedule(files, now=LATE)
+
+        # Priority first, then smallest, then oldest
+        self.assertEqual([f['id'] for f in ready], ['urgent', 'old'])
+        self.assertEqual([f['id'] for f in deferred], ['new', 'big'])
+        self.assertEqual(self.scheduler.remaining(now=LATE), 0)
+
+        # Nothing more today, even across a restart
+        self.scheduler.close()
+        self.scheduler = UploadScheduler(self.db_path, ['primary', 'secondary'], daily_limit=UPLOAD_COST * 2)
+        self.assertEqual(self.scheduler.schedule([], now=LATE), ([], []))
+
+        ready, deferred = self.scheduler.schedule([], now=NEXT_DAY)
+        self.assertEqual([f['id'] for f in ready], ['new', 'big'])
+        self.assertEqual(deferred, [])
+        self.assertEqual(self.scheduler.deferred(), [])
+
+    def test_exhausted_channel_blocks_uploads_until_reset(self):
+        self.scheduler.exhaust('secondary', now=LATE)
+        self.assertFalse(self.scheduler.reserve(now=LATE))
+        self.assertEqual(self.scheduler.spent('primary', now=LATE), 0)
+
+        self.assertTrue(self.scheduler.reserve(now=NEXT_DAY))
+        self.scheduler.refund(now=NEXT_DAY)
+        self.assertEqual(self.scheduler.remaining(now=NEXT_DAY), UPLOAD_COST * 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,318 @@
+import unittest
+from unittest.mock import patch
+import json
+import subprocess
+import threading
+import platform
+import tempfile
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import video_compressor
+from utils.video_compressor import estimate_strategies, chunk_boundaries
+from benchmark_encoder import choose_profile
+
+MB = 1024 * 1024
+
+def probe_info(streams, size_mb, duration=100):
+    return {
+        'format': {'duration': str(duration), 'size': str(int(size_mb * MB)),
+                   'bit_rate': str(int(size_mb * MB * 8 / duration))},
+        'streams': streams,
+    }
+
+class TestEstimateStrategies(unittest.TestCase):
+    def test_pcm_audio_only_needs_audio_reencode(self):
+        # 4000 kbps H.264 with 8-channel 48 kHz 24-bit PCM (9216 kbps)
+        info = probe_info([
+            {'codec_type': 'video', 'codec_name': 'h264', 'bit_rate': '4000000'},
+            {'codec_type': 'audio', 'codec_name': 'pcm_s24le', 'sample_rate': '48000',
+             'channels': 8, 'bits_per_sample': 24},
+        ], size_mb=158)
+
+        estimates = dict(estimate_strategies(info))
+        self.assertNotIn('remux', estimates)
+        self.assertNotIn('drop_streams', estimates)
+        self.assertAlmostEqual(estimates['audio_only'], 4128 * 1000 / 8 * 100 * 1.02 / MB, places=3)
+
+    def test_extra_streams_are_dropped_and_video_bitrate_inferred(self):
+        info = probe_info([
+            {'codec_type': 'video', 'codec_name': 'h264'},
+            {'codec_type': 'audio', 'codec_name': 'aac', 'bit_rate': '128000'},
+            {'codec_type': 'audio', 'codec_name': 'aac', 'bit_rate': '128000'},
+            {'codec_type': 'subtitle', 'codec_name': 'mov_text', 'bit_rate': '1000'},
+        ], size_mb=100)
+
+        strategies = [name for name, _ in estimate_strategies(info)]
+        self.assertEqual(strategies, ['drop_streams', 'audio_only'])
+        # The video gets whatever the other streams don't account for
+        video_kbps = int(100 * MB * 8 / 100) / 1000 - 257
+        estimates = dict(estimate_strategies(info))
+        self.assertAlmostEqual(estimates['drop_streams'], (video_kbps + 128) * 1000 / 8 * 100 * 1.02 / MB, places=3)
+
+    def test_video_that_cannot_be_copied_needs_full_encode(self):
+        info = probe_info([
+            {'codec_type': 'video', 'codec_name': 'prores', 'bit_rate': '100000000'},
+            {'codec_type': 'audio', 'codec_name': 'aac', 'bit_rate': '128000'},
+        ], size_mb=1200)
+        self.assertEqual(estimate_strategies(info), [])
+
+class TestChunkBoundaries(unittest.TestCase):
+    def test_boundaries_move_back_to_keyframes(self):
+        keyframes = [0.0, 2.0, 598.0, 604.0, 1190.0, 1210.0]
+        self.assertEqual(chunk_boundaries(1500, 600, keyframes),
+                         [(0.0, 598.0), (598.0, 1190.0), (1190.0, 1500)])
+
+    def test_short_tail_is_merged(self):
+        self.assertEqual(chunk_boundaries(1300, 600), [(0.0, 600), (600, 1300)])
+
+class TestEncoderProfile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.profile_path = os.path.join(self.tmp.name, 'encoder_profile.json')
+        video_compressor._encoder_profile = None
+
+    def tearDown(self):
+        video_compressor._encoder_profile = None
+        self.tmp.cleanup()
+
+    def write_profile(self, **profile):
+        with open(self.profile_path, 'w') as f:
+            json.dump(profile, f)
+
+    def encode_cmd(self):
+        with patch.object(video_compressor.Config, 'ENCODER_PROFILE_FILE', self.profile_path, create=True), \
+             patch('utils.media_tools.ffmpeg_path', return_value='ffmpeg'):
+            return video_compressor._encode_cmd('in.mp4', 'out.mp4', 1000)
+
+    def test_profile_for_this_machine_sets_preset_and_threads(self):
+        self.write_profile(host=platform.node(), preset='veryfast', threads=4)
+        cmd = self.encode_cmd()
+        self.assertEqual(cmd[cmd.index('-preset') + 1], 'veryfast')
+        self.assertEqual(cmd[cmd.index('-threads') + 1], '4')
+
+    def test_profile_from_another_machine_is_ignored(self):
+        self.write_profile(host='some-other-host', preset='ultrafast', threads=4)
+        cmd = self.encode_cmd()
+        self.assertEqual(cmd[cmd.index('-preset') + 1], video_compressor.DEFAULT_PRESET)
+        self.assertNotIn('-threads', cmd)
+
+    def test_choose_profile_picks_fastest_preset_within_quality_tolerance(self):
+        def result(preset, threads, seconds_per_second, ssim, height=1080):
+            return {'preset': preset, 'threads': threads, 'height': height,
+                    'seconds_per_second': seconds_per_second, 'ssim': ssim}
+
+        results = [
+            result('medium', 0, 2.0, 0.990),
+            result('veryfast', 0, 0.6, 0.987),
+            result('veryfast', 8, 0.5, 0.987),
+            result('ultrafast', 0, 0.2, 0.950),
+            result('veryfast', 8, 0.1, 0.987, height=720),
+        ]
+        self.assertEqual(choose_profile(results, tolerance=0.005),
+                         {'preset': 'veryfast', 'threads': 8, 'seconds_per_second': 0.5})
+
+    def test_choose_profile_skips_presets_missing_the_highest_resolution(self):
+        results = [
+            {'preset': 'medium', 'threads': 0, 'height': 1080, 'seconds_per_second': 2.0, 'ssim': 0.990},
+            {'preset': 'veryfast', 'threads': 0, 'height': 720, 'seconds_per_second': 0.3, 'ssim': 0.990},
+        ]
+        self.assertEqual(choose_profile(results)['preset'], 'medium')
+        self.assertIsNone(choose_profile(results[1:2] + [dict(results[0], ssim=0.5)]))
+
+class RateControlConfig:
+    COMPRESS_WORKERS = 1
+    COMPRESS_RATE_SAMPLES = 3
+    COMPRESS_RATE_SAMPLE_SECONDS = 10
+    COMPRESS_TIMEOUT_FACTOR = 2.0
+
+# prores can't be stream-copied, so compress_video goes straight to a full encode
+PRORES = probe_info([
+    {'codec_type': 'video', 'codec_name': 'prores', 'bit_rate': '100000000'},
+    {'codec_type': 'audio', 'codec_name': 'aac', 'bit_rate': '128000'},
+], size_mb=7500, duration=600)
+
+@patch.object(video_compressor, 'Config', RateControlConfig)
+@patch.object(video_compressor, 'encoder_profile', return_value={})
+@patch('utils.media_tools.probe', return_value=PRORES)
+@patch('utils.media_tools.ffmpeg_path', return_value='ffmpeg')
+class TestRateControl(unittest.TestCase):
+    # 100 MB over 600 s, less audio and container overhead
+    TARGET_K = int(100 * 8192 * (1 - video_compressor.CONTAINER_OVERHEAD) / 600) - video_compressor.AUDIO_BITRATE_K
+
+    def compress(self, sample_ratio, output_sizes_mb):
+        """Runs compress_video with samples coming out at sample_ratio x the requested bitrate."""
+        sizes = list(output_sizes_mb)
+
+        def getsize(path):
+            if '.sample' in path:
+                return sample_ratio * self.TARGET_K * 1000 / 8 * 10
+            return (sizes.pop(0) if len(sizes) > 1 else sizes[0]) * MB
+
+        stats = {}
+        with patch('utils.media_tools.run_ffmpeg') as mock_run, \
+             patch('utils.video_compressor.os.path.getsize', side_effect=getsize), \
+             patch('utils.video_compressor.os.path.exists', return_value=False), \
+             patch('utils.video_compressor.time.time', side_effect=[1000.0, 1042.0]):
+            result = video_compressor.compress_video('in.mov', 'out.mp4', target_size_mb=100, stats=stats,
+                                                     progress=lambda info: None)
+        self.assertEqual(result, 'out.mp4')
+        return stats, [call.args[0] for call in mock_run.call_args_list]
+
+    @staticmethod
+    def bitrate(cmd):
+        return cmd[cmd.index('-b:v') + 1]
+
+    def test_calibration_is_clamped(self, mock_path, mock_probe, mock_profile):
+        stats, cmds = self.compress(5.0, [90])
+        self.assertEqual(self.bitrate(cmds[-1]), f'{int(self.TARGET_K / 2.0)}k')
+        self.assertEqual(len(cmds), 4)
+
+        stats, cmds = self.compress(0.1, [90])
+        self.assertEqual(self.bitrate(cmds[-1]), f'{int(self.TARGET_K / 0.8)}k')
+
+    def test_samples_are_spread_across_the_video(self, mock_path, mock_probe, mock_profile):
+        _, cmds = self.compress(1.0, [90])
+        offsets = [float(cmd[cmd.index('-ss') + 1]) for cmd in cmds[:3]]
+        self.assertEqual(offsets, [95.0, 295.0, 495.0])
+        self.assertTrue(all('-an' in cmd for cmd in cmds[:3]))
+
+    def test_oversized_output_gets_one_corrective_two_pass_encode(self, mock_path, mock_probe, mock_profile):
+        stats, cmds = self.compress(1.0, [120, 98])
+        corrected = int(self.TARGET_K * (100 / 120) * 0.97)
+        first_pass, second_pass = cmds[-2:]
+        self.assertEqual(first_pass[first_pass.index('-pass') + 1], '1')
+        self.assertEqual(second_pass[second_pass.index('-pass') + 1], '2')
+        self.assertEqual(self.bitrate(second_pass), f'{corrected}k')
+        self.assertEqual(stats['attempts'], 5)
+        self.assertEqual(stats['video_bitrate_k'], corrected)
+        self.assertEqual(stats['output_mb'], 98)
+
+    def test_stats_report_attempts_and_seconds(self, mock_path, mock_probe, mock_profile):
+        stats, cmds = self.compress(1.0, [90])
+        self.assertEqual(stats['strategy'], 'encode')
+        self.assertEqual(stats['attempts'], 4)
+        self.assertEqual(stats['encode_seconds'], 42.0)
+        self.assertEqual(stats['video_bitrate_k'], self.TARGET_K)
+        self.assertEqual(stats['output_mb'], 90)
+        self.assertNotIn('-pass', cmds[-1])
+
+class FakeSegmentFFmpeg:
+    """Acts out the split, segment, audio and concat ffmpeg runs of compress_segmented."""
+
+    def __init__(self, segments=3, concurrent=1):
+        self.segments = segments
+        self.barrier = threading.Barrier(concurrent, timeout=5)
+        self.calls = []
+        self.lock = threading.Lock()
+        self.concat_list = None
+
+    def __call__(self, cmd, timeout=None, **kwargs):
+        with self.lock:
+            self.calls.append((cmd, timeout))
+        output = cmd[-1]
+        if '-f' in cmd and cmd[cmd.index('-f') + 1] == 'segment':
+            for i in range(self.segments):
+                open(output % i, 'wb').close()
+        elif '-f' in cmd and cmd[cmd.index('-f') + 1] == 'concat':
+            with open(cmd[cmd.index('-i') + 1]) as f:
+                self.concat_list = f.read()
+        else:
+            if 'encoded_' in output:
+                self.barrier.wait()
+            open(output, 'wb').close()
+
+    def commands(self, kind):
+        if kind == 'encode':
+            return [(cmd, t) for cmd, t in self.calls if 'encoded_' in cmd[-1]]
+        if kind == 'audio':
+            return [(cmd, t) for cmd, t in self.calls if cmd[-1].endswith('audio.m4a')]
+        return [(cmd, t) for cmd, t in self.calls if '-f' in cmd and cmd[cmd.index('-f') + 1] == kind]
+
+@patch('utils.media_tools.ffmpeg_path', return_value='ffmpeg')
+class TestCompressSegmented(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # An apostrophe in the path has to be escaped in the concat list
+        self.output = os.path.join(self.tmp.name, "it's", 'out.mp4')
+        os.makedirs(os.path.dirname(self.output))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_segmented(self, streams, ffmpeg, workers=3):
+        with patch('utils.media_tools.probe', return_value={'streams': streams}), \
+             patch('utils.media_tools.run_ffmpeg', side_effect=ffmpeg), \
+             patch.object(video_compressor, 'encoder_profile', return_value={}):
+            return video_compressor.compress_segmented('in.mp4', self.output, 2000, 360.0, segment_seconds=120,
+                                                       workers=workers, timeout=1000)
+
+    def test_segments_are_encoded_in_parallel_and_audio_once(self, mock_path):
+        ffmpeg = FakeSegmentFFmpeg(segments=3, concurrent=3)
+        result = self.run_segmented([{'codec_type': 'video'}, {'codec_type': 'audio'}], ffmpeg)
+        self.assertEqual(result, self.output)
+
+        (split, split_timeout), = ffmpeg.commands('segment')
+        self.assertEqual(split[split.index('-map') + 1], '0:v:0')
+        self.assertEqual(split.count('-map'), 1)
+        self.assertEqual(split[split.index('-segment_time') + 1], '120')
+        self.assertEqual(split_timeout, 1000)
+
+        encodes = ffmpeg.commands('encode')
+        self.assertEqual(len(encodes), 3)
+        for cmd, timeout in encodes:
+            self.assertIn('-an', cmd)
+            self.assertEqual(timeout, max(120, 1000 * 120 / 360.0))
+
+        (audio, _), = ffmpeg.commands('audio')
+        self.assertEqual(audio[audio.index('-i') + 1], 'in.mp4')
+        self.assertEqual(audio[audio.index('-c:a') + 1], 'aac')
+
+        (concat, _), = ffmpeg.commands('concat')
+        self.assertEqual(concat[concat.index('-map', concat.index('-map') + 1) + 1], '1:a:0')
+        self.assertEqual(concat[concat.index('-c') + 1], 'copy')
+        escaped_dir = os.path.dirname(self.output).replace("'", "'\\''")
+        self.assertEqual(ffmpeg.concat_list.splitlines(),
+                         [f"file '{escaped_dir}/out.mp4.segments/encoded_{i:04d}.mp4'" for i in range(3)])
+        self.assertEqual([c for c, _ in ffmpeg.calls].index(concat), len(ffmpeg.calls) - 1)
+        self.assertFalse(os.path.exists(self.output + '.segments'))
+
+    def test_video_without_audio_is_joined_without_an_audio_track(self, mock_path):
+        ffmpeg = FakeSegmentFFmpeg(segments=2)
+        self.run_segmented([{'codec_type': 'video'}], ffmpeg, workers=1)
+        self.assertEqual(ffmpeg.commands('audio'), [])
+        (concat, _), = ffmpeg.commands('concat')
+        self.assertNotIn('-map', concat)
+
+class TestAnalysisProxy(unittest.TestCase):
+    @patch('utils.video_compressor.os.path.getsize', return_value=5 * MB)
+    @patch('utils.media_tools.duration', return_value=7200.0)
+    @patch('utils.media_tools.ffmpeg_path', return_value='ffmpeg')
+    @patch('utils.media_tools.run_ffmpeg')
+    def test_proxy_command_and_timeout_scaled_by_duration(self, mock_run, mock_path, mock_duration, mock_size):
+        result = video_compressor.create_analysis_proxy('in.mp4', 'proxy.mp4', height=360, fps=5,
+                                                        video_bitrate_k=300, audio_bitrate_k=48)
+        self.assertEqual(result, 'proxy.mp4')
+        cmd = mock_run.call_args.args[0]
+        self.assertEqual(cmd[cmd.index('-vf') + 1], "scale=-2:'min(360,ih)',fps=5")
+        self.assertEqual(cmd[cmd.index('-b:v') + 1], '300k')
+        self.assertEqual(cmd[cmd.index('-ac') + 1], '1')
+        self.assertEqual(cmd[cmd.index('-b:a') + 1], '48k')
+        self.assertEqual(cmd[-1], 'proxy.mp4')
+        timeout = mock_run.call_args.kwargs['timeout']
+        self.assertEqual(timeout, video_compressor._encode_timeout(7200.0))
+        self.assertGreater(timeout, 7200)
+
+    @patch('utils.media_tools.duration')
+    @patch('utils.media_tools.ffmpeg_path', return_value='ffmpeg')
+    @patch('utils.media_tools.run_ffmpeg', side_effect=subprocess.TimeoutExpired(['ffmpeg'], 600))
+    def test_known_duration_is_not_probed_and_failure_returns_none(self, mock_run, mock_path, mock_duration):
+        self.assertIsNone(video_compressor.create_analysis_proxy('in.mp4', 'proxy.mp4', duration=60.0))
+        mock_duration.assert_not_called()
+        self.assertEqual(mock_run.call_args.kwargs['timeout'], video_compressor._encode_timeout(60.0))
+
+if __name__ == '__main__':
+    unittest.main()
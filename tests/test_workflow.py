@@ -1,5 +1,6 @@
 import unittest
 from unittest.mock import MagicMock, patch
+import tempfile
 import sys
 import os
 
@@ -7,6 +8,9 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from main import process_file
+from config import Config
+from utils import job_ledger
+from utils.job_ledger import JobLedger
 
 class TestWorkflow(unittest.TestCase):
     def test_process_file_success(self):
@@ -40,5 +44,90 @@ class TestWorkflow(unittest.TestCase):
         youtube_service.upload_video.assert_called_once()
         sheets_service.log_run.assert_called_once()
 
+    def test_process_file_retry_resumes_after_last_completed_stage(self):
+        drive_service = MagicMock()
+        ai_service = MagicMock()
+        youtube_service = MagicMock()
+        sheets_service = MagicMock()
+
+        ai_service.analyze_video.return_value = {
+            "title": "Test Video",
+            "description": "A test video description.",
+            "thumbnail_prompt": "A test prompt"
+        }
+        youtube_service.upload_video.return_value = 'VIDEO_ID_123'
+        # Logging fails once after a successful upload
+        sheets_service.log_run.side_effect = [Exception("Sheets unavailable"), None]
+
+        file_data = {'id': '123', 'name': 'test_video.mp4'}
+
+        with patch('os.remove'), patch('os.path.exists', return_value=True), patch('time.sleep'):
+            process_file(file_data, drive_service, ai_service, youtube_service, sheets_service)
+
+        drive_service.download_file.assert_called_once()
+        ai_service.analyze_video.assert_called_once()
+        ai_service.generate_thumbnail.assert_called_once()
+        youtube_service.upload_video.assert_called_once()
+        self.assertEqual(sheets_service.log_run.call_count, 2)
+
+    def test_quota_exceeded_defers_without_burning_retries(self):
+        from services.youtube_service import HttpError
+
+        drive_service = MagicMock()
+        ai_service = MagicMock()
+        youtube_service = MagicMock()
+        sheets_service = MagicMock()
+        scheduler = MagicMock()
+
+        ai_service.analyze_video.return_value = {
+            "title": "Test Video",
+            "description": "A test video description.",
+            "thumbnail_prompt": "A test prompt"
+        }
+        youtube_service.upload_video.side_effect = HttpError(
+            MagicMock(status=403), b'{"error": {"errors": [{"reason": "quotaExceeded"}]}}')
+
+        file_data = {'id': '123', 'name': 'test_video.mp4'}
+
+        with patch('os.remove'), patch('time.sleep') as mock_sleep:
+            process_file(file_data, drive_service, ai_service, youtube_service, sheets_service,
+                         scheduler=scheduler)
+
+        youtube_service.upload_video.assert_called_once()
+        mock_sleep.assert_not_called()
+        sheets_service.log_run.assert_not_called()
+        scheduler.exhaust.assert_called_once_with('primary')
+        scheduler.defer.assert_called_once_with(file_data)
+        # The upload was attempted, so its quota is not refunded
+        scheduler.refund.assert_not_called()
+
+    def test_failed_upload_is_retried_and_never_marked_done(self):
+        drive_service = MagicMock()
+        ai_service = MagicMock()
+        youtube_service = MagicMock()
+        sheets_service = MagicMock()
+
+        ai_service.analyze_video.return_value = {
+            "title": "Test Video",
+            "description": "A test video description.",
+            "thumbnail_prompt": "A test prompt"
+        }
+        youtube_service.upload_video.side_effect = ConnectionResetError("connection reset")
+
+        file_data = {'id': '123', 'name': 'test_video.mp4'}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ledger = JobLedger(os.path.join(tmp, 'jobs.db'))
+            with patch('os.remove'), patch('time.sleep'):
+                process_file(file_data, drive_service, ai_service, youtube_service, sheets_service,
+                             ledger=ledger)
+            state = ledger.get_state(file_data)
+            ledger.close()
+
+        self.assertEqual(youtube_service.upload_video.call_count, Config.MAX_RETRIES + 1)
+        self.assertEqual(state, job_ledger.FAILED)
+        sheets_service.log_run.assert_not_called()
+        drive_service.move_file_to_folder.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
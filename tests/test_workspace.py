@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import threading
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.workspace import WorkspaceManager, WorkspaceFullError
+
+class _Usage:
+    def __init__(self, free):
+        self.free = free
+
+class TestWorkspaceManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'workspace')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_jobs_get_separate_directories(self):
+        workspace = WorkspaceManager(self.root)
+        a = workspace.acquire('a')
+        b = workspace.acquire('b')
+        self.assertNotEqual(a, b)
+        self.assertTrue(os.path.isdir(a))
+        workspace.release('a')
+        self.assertFalse(os.path.exists(a))
+
+    def test_admission_waits_for_released_space(self):
+        workspace = WorkspaceManager(self.root, min_free_bytes=100)
+        with patch('shutil.disk_usage', return_value=_Usage(1000)):
+            workspace.acquire('a', reserve_bytes=600)
+            self.assertFalse(workspace.can_admit(600))
+
+            admitted = threading.Event()
+            def second_job():
+                workspace.acquire('b', reserve_bytes=600)
+                admitted.set()
+            thread = threading.Thread(target=second_job)
+            thread.start()
+            self.assertFalse(admitted.wait(0.2))
+
+            workspace.release('a')
+            self.assertTrue(admitted.wait(5))
+            thread.join()
+
+    @unittest.skipUnless(hasattr(os.stat_result, 'st_blocks'), "needs allocated block counts")
+    def test_presized_download_still_counts_as_reserved(self):
+        workspace = WorkspaceManager(self.root)
+        free = 1024 ** 3
+        with patch('shutil.disk_usage', return_value=_Usage(free)):
+            job_dir = workspace.acquire('a', reserve_bytes=int(free * 0.6))
+            # A download pre-sizes its part file, which stays sparse until written
+            with open(os.path.join(job_dir, 'video.mp4.part'), 'wb') as f:
+                f.truncate(int(free * 0.6))
+            self.assertFalse(workspace.can_admit(int(free * 0.6)))
+
+    def test_job_that_can_never_fit_is_rejected(self):
+        workspace = WorkspaceManager(self.root, min_free_bytes=100)
+        with patch('shutil.disk_usage', return_value=_Usage(1000)):
+            with self.assertRaises(WorkspaceFullError):
+                workspace.acquire('huge', reserve_bytes=5000)
+
+    def test_cleanup_orphans_keeps_resumable_jobs(self):
+        for name in ('resumable', 'orphan'):
+            os.makedirs(os.path.join(self.root, name))
+        workspace = WorkspaceManager(self.root)
+        removed = workspace.cleanup_orphans(keep={'resumable'})
+        self.assertEqual(removed, ['orphan'])
+        self.assertTrue(os.path.isdir(os.path.join(self.root, 'resumable')))
+
+if __name__ == '__main__':
+    unittest.main()
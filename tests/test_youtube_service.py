@@ -0,0 +1,188 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import threading
+import tempfile
+import json
+import sys
+import os
+import httplib2
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.youtube_service import YouTubeService, HttpError, UploadError
+from config import Config
+
+CHANNELS = [
+    {'name': 'primary', 'credentials_file': 'credentials.json', 'token_file': 'token.json'},
+    {'name': 'gaming', 'credentials_file': 'credentials_gaming.json', 'token_file': 'token_gaming.json'},
+    {'name': 'clips', 'credentials_file': 'credentials_clips.json', 'token_file': 'token_clips.json'},
+]
+
+class TestUploadToChannels(unittest.TestCase):
+    @patch('services.youtube_service.os.path.exists', return_value=True)
+    @patch.object(YouTubeService, '__init__', autospec=True, return_value=None)
+    def test_channels_upload_concurrently_and_fail_independently(self, mock_init, mock_exists):
+        # Every upload waits until all three are in flight
+        barrier = threading.Barrier(3, timeout=5)
+        uploaded_by = {}
+
+        def upload_video(service, file_path, title, description, thumbnail_path=None):
+            barrier.wait()
+            token_file = service.token_file
+            if token_file == 'token_clips.json':
+                raise Exception("quota exceeded")
+            uploaded_by[token_file] = file_path
+            return f"id-{token_file}"
+
+        def init(service, credentials_file=None, token_file=None):
+            service.token_file = token_file
+        mock_init.side_effect = init
+
+        primary = YouTubeService.__new__(YouTubeService)
+        primary.token_file = 'token.json'
+
+        with patch.object(YouTubeService, 'upload_video', autospec=True, side_effect=upload_video), \
+             self.assertRaises(UploadError) as raised:
+            YouTubeService.upload_to_channels('video.mp4', 'Title', 'Description',
+                                              channels=CHANNELS, clients={'primary': primary})
+
+        # The failure is reported along with the uploads that did succeed
+        result = raised.exception.video_ids
+        self.assertEqual(raised.exception.channels, ['clips'])
+        self.assertEqual(result, {'primary': 'id-token.json', 'gaming': 'id-token_gaming.json', 'clips': None})
+        self.assertEqual(list(result), ['primary', 'gaming', 'clips'])
+        # The primary service passed in is reused; only the other channels authenticate
+        self.assertEqual(mock_init.call_count, 2)
+        self.assertEqual(set(uploaded_by.values()), {'video.mp4'})
+
+def fake_response(status, headers=None):
+    """An httplib2 response with a status and lowercased headers."""
+    return httplib2.Response(dict(headers or {}, status=status))
+
+class FakeUploadRequest:
+    """Resumable insert request that uploads 100 bytes in 4 chunks and can fail on chosen calls."""
+
+    def __init__(self, failures=(), crash_after=None, received=0, expired=False):
+        self.resumable_uri = None
+        self.resumable_progress = 0
+        self.failures = list(failures)
+        self.crash_after = crash_after
+        # Bytes the server has, which a status query reports
+        self.received = received
+        self.expired = expired
+        self.calls = 0
+        self.num_retries = []
+        self.status_queries = []
+        self.http = MagicMock()
+        self.http.request.side_effect = self.query_status
+
+    def query_status(self, uri, method='GET', body=None, headers=None):
+        self.status_queries.append((uri, method, headers))
+        if self.expired:
+            return fake_response(404), b'Not Found'
+        if self.received >= 100:
+            return fake_response(200), b'{"id": "VIDEO_ID"}'
+        headers = {'range': f'bytes=0-{self.received - 1}'} if self.received else {}
+        return fake_response(308, headers), b''
+
+    def postproc(self, resp, content):
+        return json.loads(content)
+
+    def next_chunk(self, num_retries=0):
+        self.calls += 1
+        self.num_retries.append(num_retries)
+        if self.failures:
+            failure = self.failures.pop(0)
+            if failure:
+                raise failure
+        if self.resumable_uri is None:
+            self.resumable_uri = 'https://upload.example/session-1'
+        self.received = self.resumable_progress = self.resumable_progress + 25
+        if self.crash_after and self.resumable_progress > self.crash_after:
+            raise KeyboardInterrupt()
+        if self.resumable_progress >= 100:
+            return None, {'id': 'VIDEO_ID'}
+        return MagicMock(progress=MagicMock(return_value=self.resumable_progress / 100)), None
+
+class TestResumableUpload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.video = os.path.join(self.tmp.name, 'video.mp4')
+        with open(self.video, 'wb') as f:
+            f.write(b'x' * 100)
+
+        self.service = YouTubeService.__new__(YouTubeService)
+        self.service.token_file = 'token.json'
+        self.service.service = MagicMock()
+        self.session_path = self.service._session_path(self.video)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def upload(self, *requests):
+        self.service.service.videos.return_value.insert.side_effect = requests
+        with patch('googleapiclient.http.MediaFileUpload'), patch('time.sleep'), \
+             patch.object(Config, 'YOUTUBE_UPLOAD_RETRIES', 2, create=True):
+            return self.service.upload_video(self.video, 'Title', 'Description')
+
+    def crash_midway(self):
+        with self.assertRaises(KeyboardInterrupt):
+            self.upload(FakeUploadRequest(crash_after=50))
+
+    def test_restart_resumes_saved_session(self):
+        self.crash_midway()
+        with open(self.session_path) as f:
+            session = json.load(f)
+        self.assertEqual(session['uri'], 'https://upload.example/session-1')
+        self.assertEqual(session['offset'], 50)
+
+        # The new request learns from the server where to carry on
+        request = FakeUploadRequest(received=75)
+        self.assertEqual(self.upload(request), 'VIDEO_ID')
+        self.assertEqual(request.status_queries, [('https://upload.example/session-1', 'PUT',
+                                                   {'Content-Length': '0', 'Content-Range': 'bytes */100'})])
+        self.assertEqual(request.calls, 1)
+        self.assertFalse(os.path.exists(self.session_path))
+
+    def test_resume_of_a_finished_upload_sends_nothing(self):
+        self.crash_midway()
+        request = FakeUploadRequest(received=100)
+        self.assertEqual(self.upload(request), 'VIDEO_ID')
+        self.assertEqual(request.calls, 0)
+
+    def test_expired_session_starts_again(self):
+        self.crash_midway()
+        expired, fresh = FakeUploadRequest(expired=True), FakeUploadRequest()
+        self.assertEqual(self.upload(expired, fresh), 'VIDEO_ID')
+        self.assertEqual(expired.calls, 0)
+        self.assertEqual(fresh.calls, 4)
+        self.assertEqual(fresh.status_queries, [])
+
+    def test_server_and_socket_errors_are_retried_per_chunk(self):
+        server_error = HttpError(fake_response(503), b'backend error')
+        request = FakeUploadRequest(failures=[None, server_error, ConnectionResetError(), None])
+
+        self.assertEqual(self.upload(request), 'VIDEO_ID')
+        self.assertEqual(request.calls, 6)
+        # Each retry first asks the server what it has; the library never retries on its own
+        self.assertEqual(len(request.status_queries), 2)
+        self.assertEqual(set(request.num_retries), {0})
+
+    def test_chunk_gives_up_after_configured_retries(self):
+        server_error = HttpError(fake_response(503), b'backend error')
+        request = FakeUploadRequest(failures=[None] + [server_error] * 3)
+
+        with self.assertRaises(HttpError):
+            self.upload(request)
+        # One attempt plus YOUTUBE_UPLOAD_RETRIES retries
+        self.assertEqual(request.calls, 4)
+
+    def test_client_errors_are_not_retried(self):
+        request = FakeUploadRequest(failures=[HttpError(fake_response(400), b'bad request')])
+        with self.assertRaises(HttpError):
+            self.upload(request)
+        self.assertEqual(request.calls, 1)
+
+if __name__ == '__main__':
+    unittest.main()
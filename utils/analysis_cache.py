@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+
+# Only these fields of an analysis are cached
+CACHED_FIELDS = ('title', 'description', 'thumbnail_prompt')
+
+
+class AnalysisCache:
+    """
+    On-disk cache of video analyses.
+
+    Entries are keyed by the video's content hash together with a hash of
+    the prompt and the model name, so changing either invalidates old
+    results. Each entry is a small JSON file; reading one bumps its mtime,
+    and the least recently used entries are evicted once the cache holds
+    more than max_entries files or max_bytes bytes.
+    """
+
+    def __init__(self, cache_dir, max_entries=1000, max_bytes=100 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(content_hash, prompt, model_name):
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"{content_hash}:{prompt_hash}:{model_name}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached analysis for a key, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry.get('analysis')
+
+    def put(self, key, analysis, **info):
+        """Stores an analysis. Extra keyword arguments are saved alongside it for inspection."""
+        entry = {
+            'analysis': {field: analysis[field] for field in CACHED_FIELDS if field in analysis},
+            'created_at': time.time(),
+        }
+        entry.update(info)
+
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def entries(self):
+        """Returns (key, size_bytes, last_used, entry) for every entry, least recently used first."""
+        results = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            results.append((name[:-len('.json')], stat.st_size, stat.st_mtime, entry))
+        results.sort(key=lambda item: item[2])
+        return results
+
+    def purge(self, older_than_days=None):
+        """Deletes all entries, or only those not used in older_than_days. Returns the count."""
+        cutoff = time.time() - older_than_days * 86400 if older_than_days is not None else None
+        removed = 0
+        with self._lock:
+            for key, _, last_used, _ in self.entries():
+                if cutoff is None or last_used < cutoff:
+                    self._remove(key)
+                    removed += 1
+        return removed
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = self.entries()
+            total_bytes = sum(size for _, size, _, _ in entries)
+            while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+                key, size, _, _ = entries.pop(0)
+                self._remove(key)
+                total_bytes -= size
+
+
+def main(argv=None):
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Inspect or purge the video analysis cache.")
+    parser.add_argument('--dir', default=getattr(Config, 'ANALYSIS_CACHE_DIR', 'analysis_cache'),
+                        help="Cache directory")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help="Show entry count and size")
+    subparsers.add_parser('list', help="List entries, least recently used first")
+    purge_parser = subparsers.add_parser('purge', help="Delete entries")
+    purge_parser.add_argument('--older-than', type=float, metavar='DAYS',
+                              help="Only delete entries not used in this many days")
+    args = parser.parse_args(argv)
+
+    cache = AnalysisCache(args.dir)
+
+    if args.command == 'stats':
+        entries = cache.entries()
+        total_mb = sum(size for _, size, _, _ in entries) / (1024 * 1024)
+        print(f"{len(entries)} entries, {total_mb:.2f} MB in {args.dir}")
+    elif args.command == 'list':
+        for key, size, last_used, entry in cache.entries():
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(last_used))
+            title = entry.get('analysis', {}).get('title', '')
+            source = entry.get('source', '')
+            print(f"{key[:12]}  {used}  {size:>6} B  {source}  {title}")
+    elif args.command == 'purge':
+        removed = cache.purge(older_than_days=args.older_than)
+        print(f"Removed {removed} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
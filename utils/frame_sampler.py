@@ -0,0 +1,164 @@
+import subprocess
+import os
+import re
+import glob
+from utils import media_tools
+
+
+def sample_frames(video_path, output_dir, count=16, mode='scene', scene_threshold=0.3,
+                  width=640, duration=None):
+    """
+    Extracts up to `count` representative JPEG frames from a video.
+
+    Args:
+        video_path: Path to input video
+        output_dir: Directory to write frames to (created if missing)
+        count: Maximum number of frames
+        mode: 'scene' splits the video into `count` equal windows and takes
+              the strongest scene change in each, 'uniform' spaces frames
+              evenly. Scene mode falls back to uniform if fewer than half
+              of the windows have a scene change.
+        scene_threshold: Scene change score (0-1) a frame needs in scene mode
+        width: Frame width in pixels
+        duration: Duration in seconds if already known (skips ffprobe)
+
+    Returns:
+        List of frame paths in time order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    if not duration:
+        duration = media_tools.duration(video_path)
+    if duration <= 0:
+        raise Exception(f"Could not determine duration of {video_path}")
+
+    if mode == 'scene':
+        candidates = _scene_changes(video_path, output_dir, scene_threshold, duration)
+        times = pick_scene_frames(candidates, duration, count)
+        if len(times) >= count // 2:
+            return [_extract_frame(video_path, os.path.join(output_dir, f"scene_{i + 1:03d}.jpg"), t, width)
+                    for i, t in enumerate(times)]
+        print(f"Only {len(times)} of {count} windows have a scene change. Sampling uniformly instead.")
+
+    # Sample the middle of each of `count` equal slices
+    sample_fps = count / duration
+    return _extract(video_path, output_dir, 'uniform', count,
+                    f"fps={sample_fps:.6f}:start_time={duration / count / 2:.3f},scale={width}:-2")
+
+
+def pick_scene_frames(candidates, duration, count):
+    """
+    Splits `duration` into `count` equal windows and picks the scene change
+    with the highest score in each, so the frames cover the whole video
+    rather than its busiest stretch.
+
+    Args:
+        candidates: (time, score) pairs for every detected scene change
+
+    Returns:
+        Sorted list of frame times in seconds, at most one per window
+    """
+    best = {}
+    for time, score in candidates:
+        window = min(count - 1, int(time / duration * count))
+        if window not in best or score > best[window][1]:
+            best[window] = (time, score)
+    return sorted(time for time, _ in best.values())
+
+
+def _scene_changes(video_path, output_dir, scene_threshold, duration):
+    """Decodes the whole video once and returns the (time, score) of every scene change."""
+    scores_path = os.path.join(output_dir, 'scene_scores.txt')
+    cmd = [
+        media_tools.ffmpeg_path(),
+        '-i', video_path,
+        '-vf', f"select='gt(scene,{scene_threshold})',metadata=print:file={_filter_path(scores_path)}",
+        '-an',
+        '-f', 'null',
+        '-'
+    ]
+    try:
+        # The scene filter can go a long time without selecting a frame, so no stall detection
+        media_tools.run_ffmpeg(cmd, timeout=max(1800, duration), stall_timeout=0)
+        with open(scores_path, 'r') as f:
+            lines = f.read().splitlines()
+    finally:
+        if os.path.exists(scores_path):
+            os.remove(scores_path)
+
+    candidates = []
+    time = None
+    for line in lines:
+        match = re.search(r'pts_time:([0-9.]+)', line)
+        if match:
+            time = float(match.group(1))
+        elif line.startswith('lavfi.scene_score=') and time is not None:
+            candidates.append((time, float(line.split('=', 1)[1])))
+            time = None
+    return candidates
+
+
+def _filter_path(path):
+    """Escapes a path for use as a filter option value."""
+    return "'" + path.replace('\\', '/').replace("'", r"'\''").replace(':', r'\:') + "'"
+
+
+def _extract_frame(video_path, output_path, time, width):
+    cmd = [
+        media_tools.ffmpeg_path(),
+        '-ss', f'{time:.3f}',
+        '-i', video_path,
+        '-frames:v', '1',
+        '-vf', f'scale={width}:-2',
+        '-q:v', '4',  # JPEG quality (2-31, lower is better)
+        '-an',
+        '-y',
+        output_path
+    ]
+    media_tools.run_ffmpeg(cmd, timeout=120)
+    return output_path
+
+
+def _extract(video_path, output_dir, prefix, count, video_filter):
+    pattern = os.path.join(output_dir, f"{prefix}_%03d.jpg")
+    cmd = [
+        media_tools.ffmpeg_path(),
+        '-i', video_path,
+        '-vf', video_filter,
+        '-vsync', 'vfr',  # One image per selected frame
+        '-frames:v', str(count),
+        '-q:v', '4',  # JPEG quality (2-31, lower is better)
+        '-an',
+        '-y',
+        pattern
+    ]
+    # Frames are written minutes apart on long videos, so no stall detection
+    media_tools.run_ffmpeg(cmd, timeout=1800, stall_timeout=0)
+    return sorted(glob.glob(os.path.join(output_dir, f"{prefix}_*.jpg")))
+
+
+def extract_audio(video_path, output_path, bitrate_k=32, timeout=1800):
+    """
+    Extracts the first audio track as mono AAC (ADTS).
+
+    Returns:
+        output_path if successful, None if the video has no audio or ffmpeg failed
+    """
+    cmd = [
+        media_tools.ffmpeg_path(),
+        '-i', video_path,
+        '-map', '0:a:0',
+        '-vn',
+        '-c:a', 'aac',
+        '-ac', '1',
+        '-b:a', f'{bitrate_k}k',
+        '-f', 'adts',
+        '-y',
+        output_path
+    ]
+    try:
+        media_tools.run_ffmpeg(cmd, timeout=timeout)
+        return output_path
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        print(f"No audio extracted from {video_path}: {e}")
+        return None
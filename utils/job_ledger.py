@@ -0,0 +1,142 @@
+import sqlite3
+import json
+import threading
+import datetime
+
+# Job states, in the order a file moves through the workflow
+DISCOVERED = 'discovered'
+DOWNLOADING = 'downloading'
+ANALYZED = 'analyzed'
+UPLOADED = 'uploaded'
+LOGGED = 'logged'
+DONE = 'done'
+FAILED = 'failed'
+
+STATES = (DISCOVERED, DOWNLOADING, ANALYZED, UPLOADED, LOGGED, DONE, FAILED)
+
+
+class JobLedger:
+    """
+    Persistent record of every Drive file the workflow has seen.
+
+    Jobs are keyed by Drive file ID and md5Checksum, so a file that is
+    replaced with new content in place gets processed again. The table is
+    mirrored in memory, which makes the per-file check in the poll loop a
+    dict lookup instead of a query.
+    """
+
+    def __init__(self, db_path, max_attempts=3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                file_id TEXT NOT NULL,
+                md5 TEXT NOT NULL,
+                name TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (file_id, md5)
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')]
+        if 'checkpoint' not in columns:
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN checkpoint TEXT')
+        self._conn.commit()
+
+        self._jobs = {}
+        for file_id, md5, state, attempts in self._conn.execute(
+                'SELECT file_id, md5, state, attempts FROM jobs'):
+            self._jobs[(file_id, md5)] = {'state': state, 'attempts': attempts}
+
+    @staticmethod
+    def key(file):
+        """Returns the ledger key for a Drive file resource."""
+        return (file['id'], file.get('md5Checksum') or '')
+
+    def get_state(self, file):
+        job = self._jobs.get(self.key(file))
+        return job['state'] if job else None
+
+    def should_process(self, file):
+        """
+        Returns False for files that are already done, or that have failed
+        max_attempts times with the same content.
+        """
+        job = self._jobs.get(self.key(file))
+        if job is None:
+            return True
+        if job['state'] == DONE:
+            return False
+        if job['state'] == FAILED and job['attempts'] >= self.max_attempts:
+            return False
+        return True
+
+    def active_file_ids(self):
+        """Returns the IDs of files with unfinished jobs that can still resume."""
+        return {
+            file_id for (file_id, _), job in self._jobs.items()
+            if job['state'] != DONE and not (job['state'] == FAILED and job['attempts'] >= self.max_attempts)
+        }
+
+    def mark(self, file, state, error=None):
+        """Records a state transition for a file."""
+        if state not in STATES:
+            raise ValueError(f"Unknown job state: {state}")
+
+        file_id, md5 = self.key(file)
+        now = datetime.datetime.now().isoformat()
+
+        with self._lock:
+            job = self._jobs.setdefault((file_id, md5), {'state': state, 'attempts': 0})
+            if state == FAILED:
+                job['attempts'] += 1
+            job['state'] = state
+
+            self._conn.execute("""
+                INSERT INTO jobs (file_id, md5, name, state, attempts, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (file_id, md5) DO UPDATE SET
+                    name = excluded.name,
+                    state = excluded.state,
+                    attempts = excluded.attempts,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+            """, (file_id, md5, file.get('name'), state, job['attempts'], error, now))
+            self._conn.commit()
+
+    def save_checkpoint(self, file, checkpoint):
+        """Stores the outputs of the stages a job has completed so far."""
+        file_id, md5 = self.key(file)
+        now = datetime.datetime.now().isoformat()
+
+        with self._lock:
+            job = self._jobs.setdefault((file_id, md5), {'state': DISCOVERED, 'attempts': 0})
+            self._conn.execute("""
+                INSERT INTO jobs (file_id, md5, name, state, attempts, checkpoint, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (file_id, md5) DO UPDATE SET
+                    checkpoint = excluded.checkpoint,
+                    updated_at = excluded.updated_at
+            """, (file_id, md5, file.get('name'), job['state'], job['attempts'],
+                  json.dumps(checkpoint), now))
+            self._conn.commit()
+
+    def load_checkpoint(self, file):
+        """Returns the saved checkpoint for a file, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT checkpoint FROM jobs WHERE file_id = ? AND md5 = ?', self.key(file)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,51 @@
+"""
+Plans how a video will be handled from its Drive listing metadata alone,
+before anything is downloaded.
+"""
+
+# Gemini rejects uploads above this size, so larger videos need a smaller copy
+GEMINI_UPLOAD_LIMIT_MB = 500
+# Size the compressed analysis copy is encoded to
+PROXY_TARGET_MB = 450
+
+
+def plan_media(file, upload_limit_mb=GEMINI_UPLOAD_LIMIT_MB, proxy_target_mb=PROXY_TARGET_MB,
+               analysis_proxy_kbps=None):
+    """
+    Builds a media plan from a Drive file resource (as returned by
+    DriveService.scan_folder).
+
+    analysis_proxy_kbps is the combined bitrate of the low-resolution
+    analysis proxy, if one is made for every video; its size is added to
+    the disk reservation.
+
+    Returns a dict with:
+        size_mb: Size of the original
+        duration: Duration in seconds, or None if Drive hasn't processed the video yet
+        width, height: Frame size, or None
+        needs_proxy: Whether a compressed copy is needed for analysis
+        reserve_bytes: Disk space the job needs (original plus any copy)
+    """
+    size_bytes = int(file.get('size') or 0)
+    size_mb = size_bytes / (1024 * 1024)
+
+    metadata = file.get('videoMediaMetadata') or {}
+    duration_ms = int(metadata.get('durationMillis') or 0)
+    duration = duration_ms / 1000 if duration_ms else None
+
+    needs_proxy = size_mb > upload_limit_mb
+
+    reserve_bytes = size_bytes
+    if needs_proxy:
+        reserve_bytes += proxy_target_mb * 1024 * 1024
+    if analysis_proxy_kbps and duration:
+        reserve_bytes += int(analysis_proxy_kbps * 1000 / 8 * duration)
+
+    return {
+        'size_mb': size_mb,
+        'duration': duration,
+        'width': metadata.get('width'),
+        'height': metadata.get('height'),
+        'needs_proxy': needs_proxy,
+        'reserve_bytes': reserve_bytes,
+    }
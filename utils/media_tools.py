@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import shutil
+import threading
+import subprocess
+from collections import OrderedDict, deque
+from config import Config
+
+# Number of probe results kept in memory
+PROBE_CACHE_SIZE = 256
+
+
+class MediaToolError(Exception):
+    pass
+
+
+class FFmpegCancelled(MediaToolError):
+    pass
+
+
+class FFmpegStalled(subprocess.TimeoutExpired):
+    """Raised when ffmpeg stops making progress. A TimeoutExpired, so existing handlers catch it."""
+
+    def __str__(self):
+        return f"Command '{self.cmd[0]}' made no progress for {self.timeout:.0f} seconds"
+
+
+_paths = {}
+_paths_lock = threading.Lock()
+
+
+def find_tool(name):
+    """
+    Returns the path to ffmpeg or ffprobe. Looks at Config (FFMPEG_PATH /
+    FFPROBE_PATH), then the environment variable of the same name, then
+    PATH. The result is cached for the life of the process.
+    """
+    with _paths_lock:
+        if name in _paths:
+            return _paths[name]
+
+        setting = f"{name.upper()}_PATH"
+        candidates = [getattr(Config, setting, None), os.environ.get(setting), shutil.which(name)]
+        for candidate in candidates:
+            if candidate and (os.path.isfile(candidate) or shutil.which(candidate)):
+                _paths[name] = candidate
+                return candidate
+
+    raise MediaToolError(f"{name} not found. Install it or set {setting} in config.py.")
+
+
+def ffmpeg_path():
+    return find_tool('ffmpeg')
+
+
+def ffprobe_path():
+    return find_tool('ffprobe')
+
+
+def check_versions():
+    """
+    Resolves ffmpeg and ffprobe and returns the first line of each one's
+    -version output. Raises MediaToolError if either is missing or broken.
+    """
+    versions = {}
+    for name in ('ffmpeg', 'ffprobe'):
+        path = find_tool(name)
+        try:
+            result = subprocess.run([path, '-version'], capture_output=True, text=True, timeout=10, check=True)
+        except (OSError, subprocess.SubprocessError) as e:
+            raise MediaToolError(f"{name} at {path} does not run: {e}")
+        versions[name] = result.stdout.splitlines()[0] if result.stdout else 'unknown version'
+    return versions
+
+
+_probe_cache = OrderedDict()
+_probe_lock = threading.Lock()
+
+
+def _cache_key(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def probe(path, keyframes=False):
+    """
+    Returns ffprobe's JSON description of a file ('format' and 'streams'),
+    from one ffprobe run per file version. With keyframes=True the result
+    also has 'keyframes', the video keyframe timestamps in seconds, read
+    from packet flags without decoding.
+
+    Results are memoized by path, mtime and size, so every caller shares
+    them until the file changes. Callers must not modify the result.
+    """
+    key = _cache_key(path)
+    with _probe_lock:
+        info = _probe_cache.get(key)
+        if info is not None:
+            _probe_cache.move_to_end(key)
+
+    if info is None:
+        cmd = [ffprobe_path(), '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60, check=True)
+        info = json.loads(result.stdout)
+
+    if keyframes and 'keyframes' not in info:
+        info = dict(info, keyframes=_keyframes(path))
+
+    with _probe_lock:
+        _probe_cache[key] = info
+        _probe_cache.move_to_end(key)
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    return info
+
+
+def _keyframes(path):
+    cmd = [
+        ffprobe_path(), '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-print_format', 'json',
+        path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=600, check=True)
+    packets = json.loads(result.stdout).get('packets', [])
+    return [float(p['pts_time']) for p in packets
+            if p.get('flags', '').startswith('K') and p.get('pts_time') not in (None, 'N/A')]
+
+
+def duration(path):
+    """Returns a file's duration in seconds, from the shared probe."""
+    return float(probe(path)['format']['duration'])
+
+
+def clear_cache():
+    with _probe_lock:
+        _probe_cache.clear()
+
+
+def run_ffmpeg(cmd, timeout=None, progress=None, cancel_event=None, stall_timeout=None):
+    """
+    Runs an ffmpeg command, reading its -progress output as it goes.
+
+    Args:
+        cmd: ffmpeg command line, starting with the ffmpeg path
+        timeout: Seconds before the run is killed, or None
+        progress: Optional callable, called with a dict for each progress
+                  report: 'frame', 'fps', 'speed' (x realtime), 'out_time'
+                  (seconds of output written), 'done' and 'output' (the
+                  last argument of cmd)
+        cancel_event: Optional threading.Event; ffmpeg is killed once it is set
+        stall_timeout: Seconds without the output advancing before ffmpeg is
+                       killed. Defaults to Config.FFMPEG_STALL_SECONDS; 0 disables.
+
+    Raises:
+        subprocess.CalledProcessError if ffmpeg fails (stderr holds the tail of its log),
+        subprocess.TimeoutExpired on timeout, FFmpegStalled (a TimeoutExpired)
+        on a stall and FFmpegCancelled on cancellation.
+    """
+    if stall_timeout is None:
+        stall_timeout = getattr(Config, 'FFMPEG_STALL_SECONDS', 120)
+    full_cmd = [cmd[0], '-nostats', '-progress', 'pipe:1', *cmd[1:]]
+    proc = subprocess.Popen(full_cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # Only the end of the log is kept, for error messages
+    stderr_tail = deque(maxlen=40)
+    started = time.monotonic()
+    state = {'advanced': started, 'position': None}
+
+    def read_stderr():
+        for line in proc.stderr:
+            stderr_tail.append(line)
+
+    def read_progress():
+        report = {}
+        for raw in proc.stdout:
+            key, _, value = raw.decode(errors='replace').strip().partition('=')
+            if key != 'progress':
+                report[key] = value
+                continue
+            info = _parse_progress(report, done=value == 'end', output=cmd[-1])
+            position = (info['frame'], info['out_time'])
+            if position != state['position']:
+                state['position'] = position
+                state['advanced'] = time.monotonic()
+            if progress:
+                try:
+                    progress(info)
+                except Exception as e:
+                    print(f"Progress callback failed: {e}")
+            report = {}
+
+    readers = [threading.Thread(target=read_stderr, daemon=True),
+               threading.Thread(target=read_progress, daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    error = None
+    try:
+        while proc.poll() is None:
+            now = time.monotonic()
+            if cancel_event is not None and cancel_event.is_set():
+                error = FFmpegCancelled(f"ffmpeg cancelled: {cmd[-1]}")
+            elif timeout and now - started > timeout:
+                error = subprocess.TimeoutExpired(cmd, timeout)
+            elif stall_timeout and now - state['advanced'] > stall_timeout:
+                error = FFmpegStalled(cmd, stall_timeout)
+            if error is not None:
+                proc.kill()
+                break
+            try:
+                proc.wait(timeout=0.5)
+            except subprocess.TimeoutExpired:
+                pass
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        for reader in readers:
+            reader.join(timeout=5)
+
+    stderr = b''.join(stderr_tail)
+    if error is not None:
+        if isinstance(error, subprocess.TimeoutExpired):
+            error.stderr = stderr
+        raise error
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+
+
+def _parse_progress(report, done, output):
+    def number(key, cast=float):
+        try:
+            return cast(report.get(key, '').rstrip('x'))
+        except ValueError:
+            return None
+
+    # out_time_us is in microseconds; older builds also put them in out_time_ms
+    out_time_us = number('out_time_us', int)
+    if out_time_us is None:
+        out_time_us = number('out_time_ms', int)
+    return {
+        'frame': number('frame', int),
+        'fps': number('fps'),
+        'speed': number('speed'),
+        'out_time': out_time_us / 1_000_000 if out_time_us is not None else None,
+        'done': done,
+        'output': output,
+    }
+
+
+def progress_printer(label, interval=10):
+    """Returns a progress callback that prints one line at most every `interval` seconds."""
+    last = [0.0]
+
+    def report(info):
+        now = time.monotonic()
+        if not info['done'] and now - last[0] < interval:
+            return
+        last[0] = now
+        out_time = f"{info['out_time']:.0f}s" if info['out_time'] is not None else '?'
+        speed = f"{info['speed']:.2f}x" if info['speed'] is not None else '?'
+        fps = f"{info['fps']:.1f}" if info['fps'] is not None else '?'
+        print(f"{label}: {out_time} encoded, {fps} fps, {speed} speed")
+
+    return report
@@ -0,0 +1,210 @@
+import sqlite3
+import json
+import threading
+import datetime
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    try:
+        PACIFIC = ZoneInfo('America/Los_Angeles')
+    except ZoneInfoNotFoundError:
+        PACIFIC = None
+except ImportError:
+    PACIFIC = None
+
+# YouTube Data API cost of each call, in quota units
+INSERT_COST = 1600
+THUMBNAIL_COST = 50
+UPLOAD_COST = INSERT_COST + THUMBNAIL_COST
+
+DEFAULT_DAILY_QUOTA = 10000
+
+
+def pacific_now(now=None):
+    """
+    Current time in US Pacific time, where YouTube quota windows start at
+    midnight. Falls back to UTC-8 where the time zone database is missing
+    (Windows without the tzdata package).
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    if PACIFIC is not None:
+        return now.astimezone(PACIFIC)
+    return now.astimezone(datetime.timezone(datetime.timedelta(hours=-8)))
+
+
+class UploadScheduler:
+    """
+    Keeps YouTube uploads within each channel's daily API quota.
+
+    Quota spent per channel is stored in SQLite per quota window (one
+    Pacific-time day). Before a file is processed, the scheduler reserves
+    the cost of uploading it to every channel. Files that don't fit in
+    what is left today are deferred, also in SQLite, until the next window
+    opens, instead of failing mid-upload and burning their retries.
+
+    Waiting files are ordered by priority (highest first), then size
+    (smallest first), then age (oldest first), so the daily budget goes
+    to the most important videos and gets through as many as possible.
+    """
+
+    def __init__(self, db_path, channels, daily_limit=DEFAULT_DAILY_QUOTA, upload_cost=UPLOAD_COST,
+                 priorities=None):
+        self.db_path = db_path
+        self.channels = list(channels)
+        self.daily_limit = daily_limit
+        self.upload_cost = upload_cost
+        # Keyword (matched case-insensitively in the file name) to priority
+        self.priorities = {k.lower(): v for k, v in (priorities or {}).items()}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS quota (
+                channel TEXT NOT NULL,
+                window TEXT NOT NULL,
+                units INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (channel, window)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS deferred (
+                file_id TEXT NOT NULL,
+                md5 TEXT NOT NULL,
+                file TEXT NOT NULL,
+                window TEXT NOT NULL,
+                PRIMARY KEY (file_id, md5)
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def window(now=None):
+        """Returns the quota window (Pacific date) for a time, as YYYY-MM-DD."""
+        return pacific_now(now).date().isoformat()
+
+    @staticmethod
+    def seconds_until_reset(now=None):
+        """Seconds until the next quota window opens (Pacific midnight)."""
+        local = pacific_now(now)
+        midnight = datetime.datetime.combine(local.date() + datetime.timedelta(days=1),
+                                             datetime.time(), tzinfo=local.tzinfo)
+        return (midnight - local).total_seconds()
+
+    def spent(self, channel, now=None):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT units FROM quota WHERE channel = ? AND window = ?', (channel, self.window(now))
+            ).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self, channel=None, now=None):
+        """Quota left today for a channel, or the least left on any channel."""
+        channels = [channel] if channel else self.channels
+        return min(self.daily_limit - self.spent(c, now) for c in channels)
+
+    def record(self, channel, units, now=None):
+        """Adds to (or, with negative units, refunds) a channel's spend for the current window."""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO quota (channel, window, units) VALUES (?, ?, MAX(0, ?))
+                ON CONFLICT (channel, window) DO UPDATE SET units = MAX(0, units + ?)
+            """, (channel, self.window(now), units, units))
+            self._conn.commit()
+
+    def exhaust(self, channel, now=None):
+        """Marks a channel's quota as used up for the rest of the window, e.g. after a quotaExceeded error."""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO quota (channel, window, units) VALUES (?, ?, ?)
+                ON CONFLICT (channel, window) DO UPDATE SET units = MAX(units, excluded.units)
+            """, (channel, self.window(now), self.daily_limit))
+            self._conn.commit()
+
+    def reserve(self, now=None):
+        """
+        Reserves one upload's cost on every channel. Returns False, reserving
+        nothing, if any channel doesn't have enough quota left.
+        """
+        if self.remaining(now=now) < self.upload_cost:
+            return False
+        for channel in self.channels:
+            self.record(channel, self.upload_cost, now)
+        return True
+
+    def refund(self, now=None):
+        """Returns a reservation for an upload that was never attempted."""
+        for channel in self.channels:
+            self.record(channel, -self.upload_cost, now)
+
+    def priority(self, file):
+        name = file.get('name', '').lower()
+        return max((p for keyword, p in self.priorities.items() if keyword in name), default=0)
+
+    def order(self, files):
+        """Sorts files by priority (highest first), then size (smallest first), then age (oldest first)."""
+        return sorted(files, key=lambda f: (-self.priority(f), int(f.get('size') or 0), f.get('createdTime') or ''))
+
+    def defer(self, file, now=None):
+        """Holds a file until the next quota window."""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO deferred (file_id, md5, file, window) VALUES (?, ?, ?, ?)
+                ON CONFLICT (file_id, md5) DO UPDATE SET file = excluded.file, window = excluded.window
+            """, (file['id'], file.get('md5Checksum') or '', json.dumps(file), self.window(now)))
+            self._conn.commit()
+
+    def deferred(self):
+        """Returns every deferred file."""
+        with self._lock:
+            rows = self._conn.execute('SELECT file FROM deferred').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def take_due(self, now=None):
+        """Removes and returns the files deferred in an earlier window."""
+        window = self.window(now)
+        with self._lock:
+            rows = self._conn.execute('SELECT file FROM deferred WHERE window < ?', (window,)).fetchall()
+            self._conn.execute('DELETE FROM deferred WHERE window < ?', (window,))
+            self._conn.commit()
+        return [json.loads(row[0]) for row in rows]
+
+    def schedule(self, files, keep=None, now=None):
+        """
+        Orders new files together with any whose deferral has ended, and
+        splits them into the ones to process now (with their upload cost
+        reserved) and the ones deferred to the next window.
+
+        keep, if given, filters out files that no longer need processing
+        (e.g. JobLedger.should_process), including previously deferred ones.
+
+        Returns:
+            (ready, deferred) lists of files
+        """
+        candidates = {}
+        for file in self.take_due(now) + list(files):
+            if keep is None or keep(file):
+                candidates[(file['id'], file.get('md5Checksum') or '')] = file
+
+        ready, deferred = [], []
+        for file in self.order(candidates.values()):
+            if not deferred and self.reserve(now):
+                self._undefer(file)
+                ready.append(file)
+            else:
+                self.defer(file, now)
+                deferred.append(file)
+        if deferred:
+            print(f"YouTube quota left today: {self.remaining(now=now)} units. Deferred {len(deferred)} "
+                  f"file(s) {self.seconds_until_reset(now) / 3600:.1f}h until the quota resets.")
+        return ready, deferred
+
+    def _undefer(self, file):
+        with self._lock:
+            self._conn.execute('DELETE FROM deferred WHERE file_id = ? AND md5 = ?',
+                               (file['id'], file.get('md5Checksum') or ''))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,74 +1,175 @@
 import subprocess
 import os
+import json
+import time
+import glob
+import shutil
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from utils import media_tools
 
-def compress_video(input_path, output_path, target_size_mb=450):
+# Audio bitrate of compressed videos, in kbps
+AUDIO_BITRATE_K = 128
+# Share of the file taken by the container (MP4 headers and indexes)
+CONTAINER_OVERHEAD = 0.02
+# compress_video never goes below this video bitrate, in kbps
+MIN_BITRATE_K = 500
+
+# Codecs that can be stream-copied into an MP4 without re-encoding
+MP4_VIDEO_CODECS = {'h264', 'hevc', 'av1', 'vp9', 'mpeg4'}
+MP4_AUDIO_CODECS = {'aac', 'mp3', 'ac3', 'eac3', 'alac', 'opus'}
+# Cheap strategies tried before a full re-encode, cheapest first
+STRATEGIES = ('remux', 'drop_streams', 'audio_only', 'encode')
+# Seconds of encoding per second of video assumed until a full encode has been timed
+DEFAULT_ENCODE_SECONDS_PER_SECOND = 1.0
+# x264 preset used when there is no encoder profile for this machine
+DEFAULT_PRESET = 'medium'
+
+_encode_seconds_per_second = None
+_encoder_profile = None
+_profile_lock = threading.Lock()
+
+def compress_video(input_path, output_path, target_size_mb=450, duration=None, stats=None,
+                   progress=None, cancel_event=None):
     """
     Compresses a video file to a target size using ffmpeg.
     
+    Cheaper strategies are tried first, using the ffprobe data to estimate
+    the size each would produce: a stream-copy remux with +faststart,
+    the same with extra streams dropped, and re-encoding only the audio
+    (e.g. downmixing a huge PCM track). The first one estimated to fit is
+    run, and a full re-encode happens only if none fits or they fail.
+    
+    For a full re-encode, the video bitrate is first calibrated by
+    encoding a few short samples spread across the video and comparing
+    what the encoder produced with what was asked for. The full encode then runs once at the corrected
+    bitrate. If it still comes out over target, one corrective two-pass
+    encode is made at a bitrate scaled down by the overshoot.
+    
     Args:
         input_path: Path to input video
         output_path: Path to save compressed video
         target_size_mb: Target file size in MB (default 450 MB to stay under 500 MB limit)
+        duration: Duration in seconds if already known
+        stats: Optional dict, filled in with 'strategy' (one of STRATEGIES),
+               'attempts' (ffmpeg encodes run), 'encode_seconds',
+               'video_bitrate_k', 'output_mb' and 'seconds_saved' (estimated
+               encode time avoided by a cheaper strategy)
+        progress: Optional callback for ffmpeg progress reports (see
+                  media_tools.run_ffmpeg); by default progress is printed
+        cancel_event: Optional threading.Event that stops compression when set
     
     Returns:
         output_path if successful, None if failed
     """
+    if stats is None:
+        stats = {}
+    stats.update({'strategy': None, 'attempts': 0, 'encode_seconds': 0.0, 'video_bitrate_k': None,
+                  'output_mb': None, 'seconds_saved': 0.0})
+    start_time = time.time()
+    if progress is None:
+        progress = media_tools.progress_printer("Compressing")
+    ffmpeg_args = {'progress': progress, 'cancel_event': cancel_event}
+
     try:
-        # FFmpeg installation path
-        ffmpeg_path = r"C:\Users\dkaough\AppData\Local\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0-full_build\bin\ffmpeg.exe"
-        ffprobe_path = r"C:\Users\dkaough\AppData\Local\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0-full_build\bin\ffprobe.exe"
-        
-        # Get input video duration
-        probe_cmd = [
-            ffprobe_path,
-            '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            input_path
-        ]
+        # Probe the input's duration and streams
+        info = media_tools.probe(input_path)
+        if not duration:
+            duration = float(info['format']['duration'])
         
-        result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30)
-        duration = float(result.stdout.strip())
+        # Allow encoding time in proportion to the video's length
+        timeout = _encode_timeout(duration)
+        
+        # Try the cheap strategies before re-encoding everything
+        if _run_cheap_strategy(input_path, output_path, target_size_mb, info, duration, timeout, stats,
+                               **ffmpeg_args):
+            stats['encode_seconds'] = time.time() - start_time
+            stats['seconds_saved'] = max(0.0, duration * _encode_speed() - stats['encode_seconds'])
+            print(f"Used '{stats['strategy']}' instead of a full re-encode. "
+                  f"Output size: {stats['output_mb']:.2f} MB, about {stats['seconds_saved']:.0f}s saved")
+            return output_path
+        stats['strategy'] = 'encode'
         
         # Calculate target bitrate (in kbps)
+        # Budget the whole file, leaving room for the audio track and container
         # Formula: (target_size_MB * 8192) / duration_seconds
-        target_bitrate = int((target_size_mb * 8192) / duration)
+        target_bitrate = int((target_size_mb * 8192 * (1 - CONTAINER_OVERHEAD)) / duration) - AUDIO_BITRATE_K
         
         # Ensure minimum quality
-        if target_bitrate < 500:
-            target_bitrate = 500
+        if target_bitrate < MIN_BITRATE_K:
+            print(f"Warning: {target_size_mb} MB is too small for {duration:.0f}s at minimum quality")
+            target_bitrate = MIN_BITRATE_K
         
         print(f"Compressing video: {input_path}")
         print(f"Duration: {duration:.2f}s, Target bitrate: {target_bitrate}k")
         
-        # Compress video with ffmpeg
-        compress_cmd = [
-            ffmpeg_path,
-            '-i', input_path,
-            '-c:v', 'libx264',  # H.264 codec
-            '-b:v', f'{target_bitrate}k',  # Video bitrate
-            '-c:a', 'aac',  # Audio codec
-            '-b:a', '128k',  # Audio bitrate
-            '-preset', 'medium',  # Encoding speed/quality balance
-            '-movflags', '+faststart',  # Optimize for streaming
-            '-y',  # Overwrite output file
-            output_path
-        ]
+        segment_seconds = getattr(Config, 'COMPRESS_SEGMENT_SECONDS', 120)
+        workers = getattr(Config, 'COMPRESS_WORKERS', 0) or os.cpu_count() or 1
+        segmented = workers > 1 and duration > segment_seconds * 2
+        
+        # 1. Calibrate the bitrate on short samples
+        sample_count = getattr(Config, 'COMPRESS_RATE_SAMPLES', 3)
+        sample_seconds = getattr(Config, 'COMPRESS_RATE_SAMPLE_SECONDS', 10)
+        if sample_count and duration >= sample_count * sample_seconds * 3:
+            ratio = _sample_bitrate_ratio(input_path, output_path, target_bitrate, duration,
+                                          sample_count, sample_seconds, cancel_event=cancel_event)
+            stats['attempts'] += sample_count
+            # Trust the samples only within reason; short samples are noisy
+            ratio = min(2.0, max(0.8, ratio))
+            target_bitrate = max(MIN_BITRATE_K, int(target_bitrate / ratio))
+            print(f"Samples came out at {ratio:.2f}x the requested bitrate. Using {target_bitrate}k")
         
+        # 2. Full encode
         print("Running ffmpeg compression...")
-        subprocess.run(compress_cmd, check=True, capture_output=True, timeout=600)
+        if segmented:
+            compress_segmented(input_path, output_path, target_bitrate, duration,
+                               segment_seconds=segment_seconds, workers=workers, timeout=timeout,
+                               **ffmpeg_args)
+        else:
+            media_tools.run_ffmpeg(_encode_cmd(input_path, output_path, target_bitrate),
+                                   timeout=timeout, **ffmpeg_args)
+        stats['attempts'] += 1
+        
+        # 3. One corrective pass if the result is still too big
+        output_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        if output_size_mb > target_size_mb:
+            corrected = max(MIN_BITRATE_K, int(target_bitrate * (target_size_mb / output_size_mb) * 0.97))
+            if corrected < target_bitrate:
+                print(f"Output is {output_size_mb:.2f} MB, over the {target_size_mb} MB target. "
+                      f"Re-encoding at {corrected}k...")
+                target_bitrate = corrected
+                if segmented:
+                    compress_segmented(input_path, output_path, target_bitrate, duration,
+                                       segment_seconds=segment_seconds, workers=workers, timeout=timeout,
+                                       **ffmpeg_args)
+                else:
+                    _encode_two_pass(input_path, output_path, target_bitrate, timeout, **ffmpeg_args)
+                stats['attempts'] += 1
         
         # Check output file size
         output_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        stats['video_bitrate_k'] = target_bitrate
+        stats['output_mb'] = output_size_mb
+        stats['encode_seconds'] = time.time() - start_time
+        _record_encode_speed(stats['encode_seconds'] / duration)
         print(f"Compression complete! Output size: {output_size_mb:.2f} MB")
+        print(f"Rate control: {stats['attempts']} encode attempts in {stats['encode_seconds']:.0f}s")
         
-        if output_size_mb > target_size_mb * 1.1:  # Allow 10% overage
+        if output_size_mb > target_size_mb:
             print(f"Warning: Output size ({output_size_mb:.2f} MB) exceeds target ({target_size_mb} MB)")
         
         return output_path
         
-    except subprocess.TimeoutExpired:
-        print("Error: FFmpeg compression timed out (>10 minutes)")
+    except media_tools.FFmpegStalled as e:
+        print(f"Error: FFmpeg compression stalled (no progress for {e.timeout:.0f} seconds)")
+        return None
+    except subprocess.TimeoutExpired as e:
+        print(f"Error: FFmpeg compression timed out (>{e.timeout:.0f} seconds)")
+        return None
+    except media_tools.FFmpegCancelled:
+        print(f"Compression of {input_path} cancelled")
         return None
     except subprocess.CalledProcessError as e:
         print(f"Error: FFmpeg failed: {e.stderr.decode() if e.stderr else str(e)}")
@@ -78,31 +179,466 @@ def compress_video(input_path, output_path, target_size_mb=450):
         return None
 
 
-def get_video_info(video_path):
+def _encode_timeout(duration):
+    """Seconds an encode of a video this long may take before it is given up on."""
+    return max(600, duration * getattr(Config, 'COMPRESS_TIMEOUT_FACTOR', 2.0))
+
+
+def estimate_strategies(info, duration=None):
     """
-    Gets video file information (duration, size, bitrate).
+    Estimates the output size of each cheap strategy from ffprobe data
+    (as returned by media_tools.probe).
     
     Returns:
-        dict with 'duration', 'size_mb', 'bitrate' or None if failed
+        List of (strategy, estimated_mb) for the strategies that can be
+        used on this file, cheapest first. A strategy is left out if its
+        streams can't be copied into an MP4 or their bitrates are unknown.
     """
+    streams = info.get('streams', [])
+    fmt = info.get('format', {})
+    duration = duration or float(fmt.get('duration') or 0)
+    if duration <= 0:
+        return []
+
+    video = [s for s in streams if s.get('codec_type') == 'video' and not _is_cover_art(s)]
+    audio = [s for s in streams if s.get('codec_type') == 'audio']
+    if not video:
+        return []
+    main_video = video[0]
+    main_audio = audio[0] if audio else None
+
+    def size_mb(kbps):
+        return kbps * 1000 / 8 * duration * (1 + CONTAINER_OVERHEAD) / (1024 * 1024)
+
+    video_kbps = _stream_kbps(main_video)
+    if video_kbps is None:
+        # Whatever the known streams don't account for is the video
+        total_kbps = int(fmt.get('bit_rate') or 0) / 1000
+        known = [_stream_kbps(s) for s in streams if s is not main_video]
+        if not total_kbps or None in known:
+            return []
+        video_kbps = total_kbps - sum(known)
+    audio_kbps = _stream_kbps(main_audio) if main_audio else 0
+
+    video_copyable = main_video.get('codec_name') in MP4_VIDEO_CODECS
+    audio_copyable = main_audio is None or main_audio.get('codec_name') in MP4_AUDIO_CODECS
+    if not video_copyable:
+        return []
+
+    estimates = []
+    if audio_copyable and all(s.get('codec_name') in MP4_VIDEO_CODECS | MP4_AUDIO_CODECS for s in streams):
+        estimates.append(('remux', int(fmt.get('size') or 0) / (1024 * 1024)))
+    if audio_copyable and audio_kbps is not None:
+        estimates.append(('drop_streams', size_mb(video_kbps + audio_kbps)))
+    if main_audio is not None:
+        estimates.append(('audio_only', size_mb(video_kbps + AUDIO_BITRATE_K)))
+    return estimates
+
+
+def _stream_kbps(stream):
+    """A stream's bitrate in kbps from its probe data, or None if unknown."""
+    if stream.get('bit_rate'):
+        return int(stream['bit_rate']) / 1000
+    # Uncompressed PCM often has no bit_rate but can be worked out
+    bits = stream.get('bits_per_sample') or stream.get('bits_per_raw_sample')
+    if stream.get('codec_name', '').startswith('pcm_') and bits and stream.get('sample_rate'):
+        return int(stream['sample_rate']) * int(stream.get('channels') or 1) * int(bits) / 1000
+    return None
+
+
+def _is_cover_art(stream):
+    return bool((stream.get('disposition') or {}).get('attached_pic'))
+
+
+def _strategy_cmd(strategy, input_path, output_path):
+    """Builds the ffmpeg command for one of the cheap strategies."""
+    cmd = [media_tools.ffmpeg_path(), '-i', input_path]
+    if strategy == 'remux':
+        cmd += ['-map', '0', '-c', 'copy']
+    elif strategy == 'drop_streams':
+        cmd += ['-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy']
+    elif strategy == 'audio_only':
+        cmd += [
+            '-map', '0:v:0',
+            '-map', '0:a:0',
+            '-c:v', 'copy',
+            '-c:a', 'aac',
+            '-ac', '2',  # Downmix to stereo
+            '-b:a', f'{AUDIO_BITRATE_K}k',
+        ]
+    else:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    cmd += ['-movflags', '+faststart', '-y', output_path]
+    return cmd
+
+
+def _run_cheap_strategy(input_path, output_path, target_size_mb, info, duration, timeout, stats,
+                        progress=None, cancel_event=None):
+    """
+    Runs the first cheap strategy estimated to fit target_size_mb. Moves
+    on to the next one if it fails or still comes out too big. Returns
+    True if one produced a small enough output.
+    """
+    for strategy, estimated_mb in estimate_strategies(info, duration):
+        if estimated_mb > target_size_mb:
+            continue
+        print(f"Trying '{strategy}' (estimated {estimated_mb:.2f} MB)...")
+        stats['attempts'] += 1
+        try:
+            media_tools.run_ffmpeg(_strategy_cmd(strategy, input_path, output_path), timeout=timeout,
+                                   progress=progress, cancel_event=cancel_event)
+        except subprocess.CalledProcessError as e:
+            print(f"'{strategy}' failed: {e.stderr.decode(errors='replace')[-500:] if e.stderr else e}")
+            continue
+
+        output_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        if output_size_mb <= target_size_mb:
+            stats['strategy'] = strategy
+            stats['output_mb'] = output_size_mb
+            return True
+        print(f"'{strategy}' produced {output_size_mb:.2f} MB, over the {target_size_mb} MB target")
+    return False
+
+
+def _record_encode_speed(seconds_per_second):
+    """Remembers how fast the last full encode ran, for estimating time saved."""
+    global _encode_seconds_per_second
+    _encode_seconds_per_second = seconds_per_second
+
+
+def _encode_speed():
+    """Seconds of encoding per second of video: measured, from the encoder profile, or assumed."""
+    if _encode_seconds_per_second is not None:
+        return _encode_seconds_per_second
+    return encoder_profile().get('seconds_per_second') or DEFAULT_ENCODE_SECONDS_PER_SECOND
+
+
+def encoder_profile():
+    """
+    Returns the encoder profile written by benchmark_encoder.py
+    (Config.ENCODER_PROFILE_FILE), or {} if there is none or it was made
+    on another machine. Read once per process.
+    """
+    global _encoder_profile
+    with _profile_lock:
+        if _encoder_profile is None:
+            _encoder_profile = _load_encoder_profile(getattr(Config, 'ENCODER_PROFILE_FILE', 'encoder_profile.json'))
+        return _encoder_profile
+
+
+def _load_encoder_profile(path):
+    if not path or not os.path.exists(path):
+        return {}
     try:
-        # FFmpeg installation path
-        ffprobe_path = r"C:\Users\dkaough\AppData\Local\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0-full_build\bin\ffprobe.exe"
-        
-        # Get duration
-        probe_cmd = [
-            ffprobe_path,
-            '-v', 'error',
-            '-show_entries', 'format=duration,size,bit_rate',
-            '-of', 'json',
-            video_path
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read encoder profile {path}: {e}")
+        return {}
+    if profile.get('host') != platform.node():
+        print(f"Warning: Encoder profile {path} was made on {profile.get('host')}. "
+              f"Run benchmark_encoder.py on this machine to tune it.")
+        return {}
+    return profile
+
+
+def _encode_cmd(input_path, output_path, target_bitrate, threads=None, faststart=True,
+                input_args=(), audio=True, extra_args=(), preset=None):
+    """
+    Builds the ffmpeg H.264 + AAC encode command used for compression.
+    The preset and thread count come from the encoder profile unless given.
+    """
+    profile = encoder_profile()
+    preset = preset or profile.get('preset', DEFAULT_PRESET)
+    if threads is None:
+        threads = profile.get('threads')
+    cmd = [media_tools.ffmpeg_path(), *input_args, '-i', input_path]
+    cmd += [
+        '-c:v', 'libx264',  # H.264 codec
+        '-b:v', f'{target_bitrate}k',  # Video bitrate
+        '-preset', preset,  # Encoding speed/quality balance
+    ]
+    if audio:
+        cmd += [
+            '-c:a', 'aac',  # Audio codec
+            '-b:a', f'{AUDIO_BITRATE_K}k',  # Audio bitrate
+        ]
+    else:
+        cmd += ['-an']
+    if threads:
+        cmd += ['-threads', str(threads)]
+    cmd += list(extra_args)
+    if faststart:
+        cmd += ['-movflags', '+faststart']  # Optimize for streaming
+    cmd += ['-y', output_path]  # Overwrite output file
+    return cmd
+
+
+def _sample_bitrate_ratio(input_path, output_path, target_bitrate, duration, sample_count, sample_seconds,
+                          cancel_event=None):
+    """
+    Encodes `sample_count` clips of `sample_seconds` spread evenly across
+    the video (video only) and returns how far the encoder's actual
+    bitrate was from target_bitrate, as actual / target.
+    """
+    ratios = []
+    for i in range(sample_count):
+        offset = duration * (i + 0.5) / sample_count - sample_seconds / 2
+        sample_path = f"{output_path}.sample{i}.mp4"
+        try:
+            cmd = _encode_cmd(input_path, sample_path, target_bitrate, faststart=False, audio=False,
+                              input_args=('-ss', f'{max(0, offset):.2f}', '-t', str(sample_seconds)))
+            media_tools.run_ffmpeg(cmd, timeout=max(120, sample_seconds * 10), cancel_event=cancel_event)
+            actual_kbps = os.path.getsize(sample_path) * 8 / 1000 / sample_seconds
+            ratios.append(actual_kbps / target_bitrate)
+        finally:
+            if os.path.exists(sample_path):
+                os.remove(sample_path)
+    return sum(ratios) / len(ratios)
+
+
+def _encode_two_pass(input_path, output_path, target_bitrate, timeout, progress=None, cancel_event=None):
+    """Two-pass encode, which holds the average bitrate much more tightly than one pass."""
+    passlog = f"{output_path}.passlog"
+    try:
+        first_pass = _encode_cmd(input_path, os.devnull, target_bitrate, faststart=False, audio=False,
+                                 extra_args=('-pass', '1', '-passlogfile', passlog, '-f', 'null'))
+        media_tools.run_ffmpeg(first_pass, timeout=timeout, progress=progress, cancel_event=cancel_event)
+        second_pass = _encode_cmd(input_path, output_path, target_bitrate,
+                                  extra_args=('-pass', '2', '-passlogfile', passlog))
+        media_tools.run_ffmpeg(second_pass, timeout=timeout, progress=progress, cancel_event=cancel_event)
+    finally:
+        for path in glob.glob(f"{glob.escape(passlog)}*"):
+            os.remove(path)
+
+
+def compress_segmented(input_path, output_path, target_bitrate, duration, segment_seconds=120,
+                       workers=None, timeout=None, progress=None, cancel_event=None):
+    """
+    Encodes a video in parallel segments.
+    
+    The video stream is split at keyframes into segments of roughly
+    `segment_seconds` (stream copy, no re-encode), the segments are encoded
+    by up to `workers` ffmpeg processes at once, and the results are joined
+    with the concat demuxer without re-encoding. The audio is encoded once
+    from the whole input, alongside the segments, and muxed into the joined
+    video: AAC encoded per segment would add priming samples at every
+    boundary, which can be heard as gaps or clicks. progress gets the
+    reports of every segment encode (told apart by their 'output').
+    
+    Raises subprocess.CalledProcessError or subprocess.TimeoutExpired on
+    failure, and media_tools.FFmpegCancelled if cancel_event is set.
+    """
+    workers = workers or os.cpu_count() or 1
+    timeout = timeout or _encode_timeout(duration)
+    has_audio = any(s.get('codec_type') == 'audio' for s in media_tools.probe(input_path).get('streams', []))
+    work_dir = f"{output_path}.segments"
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+    
+    try:
+        # 1. Split the video at keyframes without re-encoding
+        split_cmd = [
+            media_tools.ffmpeg_path(),
+            '-i', input_path,
+            '-map', '0:v:0',
+            '-c', 'copy',
+            '-f', 'segment',
+            '-segment_time', str(segment_seconds),
+            '-reset_timestamps', '1',
+            '-y',
+            os.path.join(work_dir, 'source_%04d.mkv')
+        ]
+        media_tools.run_ffmpeg(split_cmd, timeout=timeout, cancel_event=cancel_event)
+        sources = sorted(glob.glob(os.path.join(work_dir, 'source_*.mkv')))
+        print(f"Encoding {len(sources)} segments with {workers} parallel ffmpeg processes...")
+        
+        # 2. Encode segments in parallel, sharing the cores between processes
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        segment_timeout = max(120, timeout * segment_seconds / duration)
+        
+        def encode(source):
+            encoded = source.replace('source_', 'encoded_').replace('.mkv', '.mp4')
+            media_tools.run_ffmpeg(_encode_cmd(source, encoded, target_bitrate, threads=threads, faststart=False,
+                                               audio=False),
+                                   timeout=segment_timeout, progress=progress, cancel_event=cancel_event)
+            return encoded
+        
+        audio_path = os.path.join(work_dir, 'audio.m4a')
+        audio_cmd = [
+            media_tools.ffmpeg_path(),
+            '-i', input_path,
+            '-map', '0:a:0',
+            '-vn',
+            '-c:a', 'aac',
+            '-b:a', f'{AUDIO_BITRATE_K}k',
+            '-y',
+            audio_path
+        ]
+        
+        with ThreadPoolExecutor(max_workers=workers + 1 if has_audio else workers) as pool:
+            audio = pool.submit(media_tools.run_ffmpeg, audio_cmd, timeout=timeout,
+                                cancel_event=cancel_event) if has_audio else None
+            encoded = list(pool.map(encode, sources))
+            if audio is not None:
+                audio.result()
+        
+        # 3. Join the encoded segments losslessly and add the audio
+        list_path = os.path.join(work_dir, 'segments.txt')
+        with open(list_path, 'w') as f:
+            for path in encoded:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        
+        concat_cmd = [
+            media_tools.ffmpeg_path(),
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', list_path,
+        ]
+        if has_audio:
+            concat_cmd += ['-i', audio_path, '-map', '0:v:0', '-map', '1:a:0']
+        concat_cmd += [
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            '-y',
+            output_path
+        ]
+        media_tools.run_ffmpeg(concat_cmd, timeout=timeout, cancel_event=cancel_event)
+        return output_path
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def chunk_boundaries(duration, chunk_seconds, keyframes=None):
+    """
+    Splits a video of `duration` seconds into chunks of about
+    `chunk_seconds`. With keyframe timestamps (media_tools.probe with
+    keyframes=True), each boundary is moved back to the keyframe at or
+    before it, so the chunks can be cut without re-encoding. A final
+    chunk shorter than a quarter of chunk_seconds is merged into the one
+    before it.
+    
+    Returns:
+        List of (start, end) times in seconds
+    """
+    starts = [0.0]
+    nominal = chunk_seconds
+    while nominal < duration - chunk_seconds / 4:
+        start = nominal
+        if keyframes:
+            start = max((k for k in keyframes if k <= nominal), default=0.0)
+        if start > starts[-1]:
+            starts.append(start)
+        nominal += chunk_seconds
+    return list(zip(starts, starts[1:] + [duration]))
+
+
+def cut_segment(input_path, output_path, start, end=None, timeout=1800, cancel_event=None):
+    """
+    Copies the main video and audio streams between `start` and `end`
+    seconds into a new file, without re-encoding. Starts should be on a
+    keyframe (see chunk_boundaries).
+    
+    Raises subprocess.CalledProcessError or subprocess.TimeoutExpired on failure.
+    """
+    cmd = [media_tools.ffmpeg_path(), '-ss', f'{start:.3f}', '-i', input_path]
+    if end is not None:
+        cmd += ['-t', f'{end - start:.3f}']
+    cmd += [
+        '-map', '0:v:0',
+        '-map', '0:a:0?',
+        '-c', 'copy',
+        '-avoid_negative_ts', 'make_zero',
+        '-movflags', '+faststart',
+        '-y',
+        output_path
+    ]
+    media_tools.run_ffmpeg(cmd, timeout=timeout, cancel_event=cancel_event)
+    return output_path
+
+
+def create_analysis_proxy(input_path, output_path, height=360, fps=5, video_bitrate_k=300,
+                          audio_bitrate_k=48, timeout=None, duration=None, progress=None, cancel_event=None):
+    """
+    Creates a small, low-resolution copy of a video for AI analysis.
+    
+    The proxy is scaled down to `height` (never up), resampled to `fps`,
+    and gets mono low-bitrate audio, using a fast preset. It is only meant
+    for Gemini; the original is still what gets uploaded to YouTube.
+    
+    Args:
+        input_path: Path to input video
+        output_path: Path to save the proxy
+        height: Output height in pixels
+        fps: Output frame rate
+        video_bitrate_k: Video bitrate in kbps
+        audio_bitrate_k: Audio bitrate in kbps
+        timeout: Seconds before giving up on ffmpeg; by default scaled by
+                 duration like compress_video
+        duration: Duration in seconds if already known (probed otherwise)
+        progress: Optional callback for ffmpeg progress reports
+        cancel_event: Optional threading.Event that stops the encode when set
+    
+    Returns:
+        output_path if successful, None if failed
+    """
+    try:
+        if timeout is None:
+            timeout = _encode_timeout(duration or media_tools.duration(input_path))
+        proxy_cmd = [
+            media_tools.ffmpeg_path(),
+            '-i', input_path,
+            '-map', '0:v:0',  # First video stream
+            '-map', '0:a:0?',  # First audio stream, if there is one
+            '-vf', f"scale=-2:'min({height},ih)',fps={fps}",
+            '-c:v', 'libx264',
+            '-preset', 'veryfast',
+            '-b:v', f'{video_bitrate_k}k',
+            '-maxrate', f'{video_bitrate_k}k',
+            '-bufsize', f'{video_bitrate_k * 2}k',
+            '-c:a', 'aac',
+            '-ac', '1',  # Mono
+            '-b:a', f'{audio_bitrate_k}k',
+            '-movflags', '+faststart',
+            '-y',
+            output_path
         ]
         
-        result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30)
-        import json
-        data = json.loads(result.stdout)
+        print(f"Creating {height}p analysis proxy: {input_path}")
+        media_tools.run_ffmpeg(proxy_cmd, timeout=timeout, cancel_event=cancel_event,
+                               progress=progress or media_tools.progress_printer("Proxy"))
+        
+        output_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        print(f"Proxy complete! Output size: {output_size_mb:.2f} MB")
+        return output_path
         
-        format_data = data.get('format', {})
+    except media_tools.FFmpegStalled as e:
+        print(f"Error: FFmpeg proxy encode stalled (no progress for {e.timeout:.0f} seconds)")
+        return None
+    except subprocess.TimeoutExpired:
+        print(f"Error: FFmpeg proxy encode timed out (>{timeout:.0f} seconds)")
+        return None
+    except media_tools.FFmpegCancelled:
+        print(f"Analysis proxy of {input_path} cancelled")
+        return None
+    except subprocess.CalledProcessError as e:
+        print(f"Error: FFmpeg failed: {e.stderr.decode() if e.stderr else str(e)}")
+        return None
+    except Exception as e:
+        print(f"Error creating analysis proxy: {e}")
+        return None
+
+
+def get_video_info(video_path):
+    """
+    Gets video file information (duration, size, bitrate).
+    
+    Returns:
+        dict with 'duration', 'size_mb', 'bitrate' or None if failed
+    """
+    try:
+        format_data = media_tools.probe(video_path).get('format', {})
         
         return {
             'duration': float(format_data.get('duration', 0)),
@@ -0,0 +1,116 @@
+import os
+import time
+import shutil
+import threading
+
+
+class WorkspaceFullError(Exception):
+    pass
+
+
+def _dir_size(path):
+    """
+    Bytes the files under path take up on disk. Downloads pre-size their
+    .part files, which are sparse until written, so this counts allocated
+    blocks rather than apparent size where the platform reports them.
+    """
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                stat = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            blocks = getattr(stat, 'st_blocks', None)
+            total += blocks * 512 if blocks is not None else stat.st_size
+    return total
+
+
+class WorkspaceManager:
+    """
+    Gives each job its own scratch directory under root and keeps the disk
+    from filling up.
+
+    A job reserves the bytes it expects to write (the Drive size plus any
+    compressed copy) when it acquires its directory. A new job is only
+    admitted while free space, minus what admitted jobs have reserved but
+    not written yet, stays above min_free_bytes. Otherwise acquire() waits
+    for a running job to release its space.
+    """
+
+    def __init__(self, root, min_free_bytes=0):
+        self.root = os.path.abspath(root)
+        self.min_free_bytes = min_free_bytes
+        self._reserved = {}
+        self._cond = threading.Condition()
+        os.makedirs(self.root, exist_ok=True)
+
+    def job_dir(self, job_id):
+        return os.path.join(self.root, str(job_id))
+
+    def cleanup_orphans(self, keep=()):
+        """
+        Removes job directories left behind by earlier runs, except those
+        for job IDs in keep (jobs that can still resume).
+        """
+        keep = {str(job_id) for job_id in keep}
+        removed = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path) and name not in keep and name not in self._reserved:
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(name)
+        if removed:
+            print(f"Removed {len(removed)} orphaned job director{'y' if len(removed) == 1 else 'ies'}")
+        return removed
+
+    def available_bytes(self):
+        """Free space left after every admitted job writes what it reserved."""
+        free = shutil.disk_usage(self.root).free
+        outstanding = 0
+        for job_id, reserved in self._reserved.items():
+            outstanding += max(0, reserved - _dir_size(self.job_dir(job_id)))
+        return free - outstanding
+
+    def can_admit(self, reserve_bytes):
+        return self.available_bytes() - reserve_bytes >= self.min_free_bytes
+
+    def acquire(self, job_id, reserve_bytes=0, timeout=None):
+        """
+        Reserves space for a job and returns its directory. Blocks until
+        enough space is free. Raises WorkspaceFullError if the job can
+        never fit, or if timeout expires first.
+        """
+        job_id = str(job_id)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            if job_id in self._reserved:
+                return self.job_dir(job_id)
+
+            while not self.can_admit(reserve_bytes):
+                if not self._reserved:
+                    # Nothing else will free up space for us
+                    raise WorkspaceFullError(
+                        f"Not enough disk space for job {job_id}: needs "
+                        f"{reserve_bytes / (1024 * 1024):.0f} MB plus "
+                        f"{self.min_free_bytes / (1024 * 1024):.0f} MB free")
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise WorkspaceFullError(f"Timed out waiting for disk space for job {job_id}")
+                print(f"Waiting for disk space for job {job_id}...")
+                # Re-check periodically too, in case space is freed outside the workflow
+                self._cond.wait(timeout=30 if deadline is None else max(0, min(30, deadline - time.monotonic())))
+
+            self._reserved[job_id] = reserve_bytes
+
+        path = self.job_dir(job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def release(self, job_id, remove=True):
+        """Frees a job's reservation and, by default, deletes its directory."""
+        job_id = str(job_id)
+        with self._cond:
+            self._reserved.pop(job_id, None)
+            if remove:
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+            self._cond.notify_all()